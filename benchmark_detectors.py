@@ -0,0 +1,116 @@
+"""
+Face detector benchmark
+Reports per-frame latency and recall of each detector backend on a local
+labeled image set, to pick the fastest detector that meets an accuracy bar
+
+Dataset layout:
+    data_dir/labels.csv   with rows: filename,x,y,w,h  (one row per face)
+    data_dir/<filename>   the images
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from face_detectors import BACKENDS, create_face_detector
+from face_tracker import EmotionTracker
+
+IOU_THRESHOLD = 0.5
+
+
+def load_labels(data_dir):
+    """Read ground-truth boxes grouped by image filename"""
+    labels = defaultdict(list)
+    with open(os.path.join(data_dir, 'labels.csv'), newline='') as f:
+        for row in csv.reader(f):
+            if not row or row[0] == 'filename':
+                continue
+            labels[row[0]].append(tuple(int(v) for v in row[1:5]))
+    return labels
+
+
+def count_matches(truth, detected):
+    """Number of ground-truth boxes matched one-to-one by a detection"""
+    used = set()
+    matched = 0
+    for box in truth:
+        best, best_iou = None, IOU_THRESHOLD
+        for i, det in enumerate(detected):
+            score = EmotionTracker.iou(box, tuple(det))
+            if i not in used and score >= best_iou:
+                best, best_iou = i, score
+        if best is not None:
+            used.add(best)
+            matched += 1
+    return matched
+
+
+def benchmark_backend(detector, images, labels, repeats):
+    """Latency and accuracy of one backend over the dataset"""
+    latencies = []
+    truth_total = matched_total = detected_total = 0
+
+    for filename, frame in images:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            faces = detector.detect(frame=frame, gray=gray)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        truth = labels[filename]
+        truth_total += len(truth)
+        detected_total += len(faces)
+        matched_total += count_matches(truth, faces)
+
+    return {
+        'mean_ms': float(np.mean(latencies)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'recall': matched_total / truth_total if truth_total else 0.0,
+        'precision': matched_total / detected_total if detected_total else 0.0
+    }
+
+
+def main():
+    """Run the detector benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark face detector backends')
+    parser.add_argument('data_dir', help='Directory with labels.csv and images')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS),
+                        help='Backends to compare (default: all)')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per image')
+    args = parser.parse_args()
+
+    labels = load_labels(args.data_dir)
+    images = []
+    for filename in labels:
+        frame = cv2.imread(os.path.join(args.data_dir, filename))
+        if frame is None:
+            print(f"Warning: could not read {filename}")
+            continue
+        images.append((filename, frame))
+
+    print("=" * 60)
+    print("Face Emotion Detection - Face Detector Benchmark")
+    print("=" * 60)
+    print(f"Images: {len(images)}, faces: {sum(len(labels[f]) for f, _ in images)}\n")
+    print(f"{'Backend':<8} {'Mean (ms)':>10} {'P95 (ms)':>10} {'Recall':>8} {'Precision':>10}")
+
+    for name in args.backends:
+        try:
+            detector = create_face_detector(name)
+        except (FileNotFoundError, ValueError, cv2.error) as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+        result = benchmark_backend(detector, images, labels, args.repeats)
+        print(f"{name:<8} {result['mean_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+              f"{result['recall']:>8.3f} {result['precision']:>10.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Overlay rendering benchmark
+Compares per-face drawing of the probability panel with the cached,
+single-pass renderer in EmotionDetector.draw_emotions
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from emotion_detector import EmotionDetector
+
+FRAME_SIZE = (480, 640)
+ITERATIONS = 500
+FACE_COUNTS = [1, 4, 8]
+
+
+def draw_per_face(detector, frame, detections):
+    """Reference: the original per-face drawing that repaints the whole panel"""
+    for (x, y, w, h, emotion, confidence, all_predictions) in detections:
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        label = f"{emotion}: {confidence*100:.1f}%"
+        cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+        bar_height = 20
+        bar_width = 200
+        start_x = frame.shape[1] - bar_width - 20
+        start_y = 50
+        for i, (emotion_name, prob) in enumerate(zip(detector.emotions, all_predictions)):
+            top = start_y + i * (bar_height + 5)
+            cv2.rectangle(frame, (start_x, top), (start_x + bar_width, top + bar_height),
+                          (50, 50, 50), -1)
+            color = (0, 255, 0) if emotion_name == emotion else (100, 100, 255)
+            cv2.rectangle(frame, (start_x, top), (start_x + int(bar_width * prob), top + bar_height),
+                          color, -1)
+            cv2.putText(frame, f"{emotion_name}: {prob*100:.1f}%", (start_x + 5, top + 15),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return frame
+
+
+def make_detections(detector, count, rng):
+    """Random face boxes with random probability vectors"""
+    detections = []
+    for i in range(count):
+        predictions = rng.dirichlet(np.ones(len(detector.emotions)))
+        idx = int(np.argmax(predictions))
+        x = 20 + (i % 4) * 90
+        y = 60 + (i // 4) * 150
+        detections.append((x, y, 80, 100, detector.emotions[idx], predictions[idx], predictions))
+    return detections
+
+
+def time_renderer(render, frame, detections):
+    """Average milliseconds per frame for a renderer"""
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        render(frame.copy(), detections)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def main():
+    """Run the overlay benchmark"""
+    print("=" * 60)
+    print("Face Emotion Detection - Overlay Rendering Benchmark")
+    print("=" * 60)
+
+    detector = EmotionDetector(lazy=True)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, size=FRAME_SIZE + (3,), dtype=np.uint8)
+
+    print(f"{'Faces':>6} {'Per-face (ms)':>15} {'Cached (ms)':>13} {'Speedup':>9}")
+    for count in FACE_COUNTS:
+        detections = make_detections(detector, count, rng)
+        legacy = time_renderer(lambda f, d: draw_per_face(detector, f, d), frame, detections)
+        cached = time_renderer(detector.draw_emotions, frame, detections)
+        print(f"{count:>6} {legacy:>15.3f} {cached:>13.3f} {legacy / cached:>8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Startup-time benchmark for the web interface
+Launches web_app.py and measures time to first request and time to first inference
+"""
+
+import json
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVER_URL = 'http://localhost:5000'
+TIMEOUT = 300  # Seconds to wait for the model before giving up
+
+
+def poll(path):
+    """Return (status, body) for a GET request, or (None, None) if the server is down"""
+    try:
+        with urllib.request.urlopen(SERVER_URL + path, timeout=2) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return None, None
+
+
+def run_benchmark():
+    """Start the server and time its startup milestones"""
+    start = time.time()
+    server = subprocess.Popen([sys.executable, 'web_app.py'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    first_request = None
+    ready = None
+    server_times = {}
+
+    try:
+        while time.time() - start < TIMEOUT:
+            if server.poll() is not None:
+                print("Error: server exited during startup")
+                return None
+
+            status, body = poll('/api/ready')
+            if status is not None and first_request is None:
+                first_request = time.time() - start
+            if status == 200:
+                ready = time.time() - start
+                server_times = json.loads(body).get('startup', {})
+                break
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'first_request': first_request,
+        'first_inference': ready,
+        'server': server_times
+    }
+
+
+def main():
+    """Run the startup benchmark and print the results"""
+    print("=" * 60)
+    print("Face Emotion Detection - Startup Benchmark")
+    print("=" * 60)
+
+    results = run_benchmark()
+    if results is None:
+        return 1
+
+    def fmt(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+
+    print(f"Time to first request:   {fmt(results['first_request'])}")
+    print(f"Time to first inference: {fmt(results['first_inference'])}")
+    print("\nServer-reported (since process start):")
+    for name, value in results['server'].items():
+        print(f"  {name}: {fmt(value)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""
+Convert a trained Keras model to the fast-loading model format
+Usage: python convert_model.py emotion_model_best.h5 emotion_model_best.fast
+"""
+
+import sys
+from emotion_detector import convert_to_fast_model
+
+
+def main():
+    """Convert the model given on the command line"""
+    if len(sys.argv) != 3:
+        print("Usage: python convert_model.py <model.h5> <output_dir>")
+        return 1
+    
+    convert_to_fast_model(sys.argv[1], sys.argv[2])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
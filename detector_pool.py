@@ -0,0 +1,150 @@
+"""
+Pool of EmotionDetector instances for concurrent request handling
+Each pooled detector has its own face detector (cascade) and its own Keras
+model instance, so threads that check out different detectors never share
+a CascadeClassifier or a model. Model weights are loaded once and copied into
+the other instances so every member gives identical predictions.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from emotion_detector import EmotionDetector
+
+
+class PoolExhausted(Exception):
+    """
+    No detector became free within the checkout timeout
+    Deliberately not a TimeoutError, which concurrent.futures also raises
+    when waiting for a job's result times out
+    """
+
+
+class DetectorPool:
+    """
+    Fixed-size pool of EmotionDetectors with checkout/return semantics
+
+        with pool.checkout(timeout=5) as detector:
+            faces, gray = detector.detect_faces(frame)
+
+    checkout() blocks until a detector is free and raises PoolExhausted when
+    none becomes free within timeout. acquire()/release() do the same for
+    holders that outlive a with block (e.g. streaming responses). Wait and
+    hold times are recorded for stats().
+    """
+
+    def __init__(self, size=4, model_path=None, **detector_options):
+        """
+        size: number of detectors (concurrent users)
+        model_path, detector_options: passed to every EmotionDetector
+        """
+        if size < 1:
+            raise ValueError("Detector pool size must be at least 1")
+        self.size = size
+        self.detectors = [EmotionDetector(model_path=model_path, lazy=True, **detector_options)
+                          for _ in range(size)]
+        self.emotions = self.detectors[0].emotions
+        self.idle = queue.LifoQueue()
+        for detector in self.detectors:
+            self.idle.put(detector)
+
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_times = deque(maxlen=1000)
+        self.hold_times = deque(maxlen=1000)
+        self.acquired_at = {}
+
+    @contextmanager
+    def exclusive(self):
+        """Hold every detector for the duration of the with block"""
+        held = [self.acquire() for _ in range(self.size)]
+        try:
+            yield
+        finally:
+            for detector in held:
+                self.release(detector)
+
+    def initialize(self):
+        """Load the model once and give every other detector its own copy"""
+        from tensorflow.keras.models import clone_model
+
+        # No detector may be in use while its model is replaced
+        with self.exclusive():
+            first = self.detectors[0]
+            first.initialize_model()
+            weights = first.model.get_weights()
+            for detector in self.detectors[1:]:
+                # Clone the loaded graph rather than rebuilding the default architecture,
+                # so variants and sweep winners load into matching layers
+                detector.model = clone_model(first.model)
+                detector.model.set_weights(weights)
+
+    def warm_up(self):
+        """Run one inference on every model so graph tracing happens before real requests"""
+        blank = [np.zeros((48, 48), dtype=np.uint8)]
+        with self.exclusive():
+            for detector in self.detectors:
+                detector.predict_emotions_batch(blank)
+
+    def acquire(self, timeout=None):
+        """
+        Take a detector out of the pool; it must be handed back with release()
+        Raises PoolExhausted when none becomes free within timeout
+        """
+        start = time.perf_counter()
+        try:
+            detector = self.idle.get(timeout=timeout)
+        except queue.Empty:
+            with self.lock:
+                self.timeouts += 1
+            raise PoolExhausted(f"No free detector within {timeout}s") from None
+
+        acquired = time.perf_counter()
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.wait_times.append(acquired - start)
+            self.acquired_at[id(detector)] = acquired
+        return detector
+
+    def release(self, detector):
+        """Return a detector taken with acquire()"""
+        with self.lock:
+            self.in_use -= 1
+            self.hold_times.append(time.perf_counter() - self.acquired_at.pop(id(detector)))
+        self.idle.put(detector)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow a detector for the duration of the with block"""
+        detector = self.acquire(timeout)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def stats(self):
+        """Checkout counts and wait/hold times in milliseconds"""
+        def summary(values):
+            if not values:
+                return {'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+            values = np.asarray(values) * 1000
+            return {'mean_ms': float(values.mean()),
+                    'p95_ms': float(np.percentile(values, 95)),
+                    'max_ms': float(values.max())}
+
+        with self.lock:
+            counts = {'size': self.size, 'in_use': self.in_use, 'peak_in_use': self.peak_in_use,
+                      'checkouts': self.checkouts, 'timeouts': self.timeouts}
+            wait_times = list(self.wait_times)
+            hold_times = list(self.hold_times)
+        return dict(counts, wait=summary(wait_times), hold=summary(hold_times))
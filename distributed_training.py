@@ -0,0 +1,248 @@
+"""
+Data-parallel multi-worker training
+Runs several Keras workers (local processes and/or other hosts) under
+tf.distribute.MultiWorkerMirroredStrategy. Every worker reads its own subset
+of the training shards (see shard_dataset.py; with fewer shards than workers,
+its own subset of their batches) and gradients are all-reduced after each
+step, so a many-core machine is used by several independent TensorFlow
+runtimes instead of one.
+
+Local, 4 worker processes:
+    python distributed_training.py shards --workers 4
+
+Several hosts (run once per host, same --cluster on all, different --index):
+    python distributed_training.py shards --cluster host1:23456,host2:23456 --index 0
+
+Scaling efficiency against a single worker:
+    python distributed_training.py shards --workers 4 --scaling-test 200
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from shard_dataset import ShardedDataset
+
+
+def free_ports(count):
+    """Reserve count free localhost ports for the worker cluster"""
+    sockets = []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(('localhost', 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def worker_partition(num_shards, pipeline_id, num_pipelines):
+    """
+    (shard_indices, batch_offset, batch_stride) read by one worker's input pipeline
+    Shards are dealt round-robin; with fewer shards than workers every worker
+    reads all shards and keeps every num_pipelines-th batch instead.
+    """
+    if num_shards < num_pipelines:
+        return list(range(num_shards)), pipeline_id, num_pipelines
+    return list(range(pipeline_id, num_shards, num_pipelines)), 0, 1
+
+
+def steps_per_epoch(dataset, batch_size, num_pipelines):
+    """Steps every worker can run per epoch (the smallest partition decides)"""
+    return min(dataset.num_batches(batch_size, *worker_partition(len(dataset.shards), i, num_pipelines))
+               for i in range(num_pipelines))
+
+
+def make_dataset_fn(data_dir, batch_size, num_classes, datagen=None, seed=42, shuffle=True):
+    """
+    Build a dataset_fn for strategy.distribute_datasets_from_function
+    batch_size is per worker; each worker repeats its own partition forever
+    (reshuffled every epoch when shuffle=True). seed must be the same on every
+    worker: batch-split partitions rely on all workers shuffling alike.
+    """
+    import tensorflow as tf
+
+    def dataset_fn(input_context):
+        dataset = ShardedDataset(data_dir)
+        shards, batch_offset, batch_stride = worker_partition(
+            len(dataset.shards), input_context.input_pipeline_id, input_context.num_input_pipelines)
+
+        def generate():
+            epoch = 0
+            while True:
+                for images, labels in dataset.batches(batch_size, epoch, seed, shard_indices=shards,
+                                                      shuffle=shuffle, batch_offset=batch_offset,
+                                                      batch_stride=batch_stride):
+                    images = images.astype('float32')
+                    if datagen is not None:
+                        for i in range(len(images)):
+                            images[i] = datagen.random_transform(images[i])
+                    yield images, tf.keras.utils.to_categorical(labels, num_classes)
+                epoch += 1
+
+        signature = (tf.TensorSpec((None, 48, 48, 1), tf.float32),
+                     tf.TensorSpec((None, num_classes), tf.float32))
+        return tf.data.Dataset.from_generator(generate, output_signature=signature).prefetch(2)
+
+    return dataset_fn
+
+
+def run_worker(cluster, index, shard_dir, epochs=50, batch_size=64, use_augmentation=True,
+               threads=None, max_steps=None, result_path=None):
+    """
+    Train as worker `index` of `cluster` (a list of host:port strings)
+    batch_size is per worker; the global batch is batch_size * len(cluster).
+    max_steps limits training to one short epoch (used by the scaling test).
+    Worker 0 is the chief: it writes the best model, the final model and the result file.
+    """
+    os.environ['TF_CONFIG'] = json.dumps({'cluster': {'worker': cluster},
+                                          'task': {'type': 'worker', 'index': index}})
+    import tensorflow as tf
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 4))
+
+    from train_model import EmotionModelTrainer
+
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    trainer = EmotionModelTrainer(strategy=strategy)
+    num_workers = strategy.num_replicas_in_sync
+    num_classes = len(trainer.emotions)
+    is_chief = index == 0
+
+    train_dir = os.path.join(shard_dir, 'train')
+    val_dir = os.path.join(shard_dir, 'val')
+    datagen = trainer.create_augmentation() if use_augmentation else None
+    train_data = strategy.distribute_datasets_from_function(
+        make_dataset_fn(train_dir, batch_size, num_classes, datagen))
+    steps = steps_per_epoch(ShardedDataset(train_dir), batch_size, num_workers)
+
+    fit_options = {}
+    if max_steps:
+        steps, epochs = min(steps, max_steps), 1
+        callbacks = []
+    else:
+        val_data = strategy.distribute_datasets_from_function(
+            make_dataset_fn(val_dir, batch_size, num_classes, shuffle=False))
+        fit_options = {'validation_data': val_data,
+                       'validation_steps': steps_per_epoch(ShardedDataset(val_dir), batch_size, num_workers)}
+        # Non-chief workers must save too (the save is collective) but to a scratch path
+        best_path = 'emotion_model_best.h5' if is_chief else os.path.join(
+            tempfile.mkdtemp(), 'emotion_model_best.h5')
+        callbacks = trainer.create_callbacks(best_path)
+
+    if is_chief:
+        print(f"\nDistributed training: {num_workers} workers, {steps} steps/epoch, "
+              f"global batch {batch_size * num_workers}")
+
+    start = time.perf_counter()
+    trainer.history = trainer.model.fit(train_data, epochs=epochs, steps_per_epoch=steps,
+                                        callbacks=callbacks, verbose=1 if is_chief else 0,
+                                        **fit_options)
+    elapsed = time.perf_counter() - start
+
+    if not max_steps:
+        final_path = 'emotion_model_final.h5' if is_chief else os.path.join(
+            tempfile.mkdtemp(), 'emotion_model_final.h5')
+        trainer.save_model(final_path)
+        if is_chief:
+            trainer.plot_training_history()
+
+    if is_chief and result_path:
+        epochs_run = len(trainer.history.history['loss'])
+        samples = steps * epochs_run * batch_size * num_workers
+        with open(result_path, 'w') as f:
+            json.dump({'workers': num_workers, 'steps': steps * epochs_run, 'seconds': elapsed,
+                       'samples_per_second': samples / elapsed}, f)
+
+
+def launch_local(shard_dir, workers, epochs=50, batch_size=64, use_augmentation=True,
+                 max_steps=None):
+    """
+    Run `workers` worker processes on this machine and return the chief's result
+    CPU cores are divided evenly between the workers
+    """
+    cluster = [f'localhost:{port}' for port in free_ports(workers)]
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    result_path = os.path.join(tempfile.mkdtemp(), 'result.json')
+
+    ctx = mp.get_context('spawn')
+    processes = [ctx.Process(target=run_worker,
+                             args=(cluster, index, shard_dir, epochs, batch_size, use_augmentation,
+                                   threads, max_steps, result_path if index == 0 else None))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Workers {failed} exited with an error")
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def scaling_test(shard_dir, workers, steps=200, batch_size=64):
+    """
+    Measure throughput with 1 and with `workers` workers (same per-worker
+    batch) and report scaling efficiency = speedup / workers
+    """
+    single = launch_local(shard_dir, 1, batch_size=batch_size, use_augmentation=False, max_steps=steps)
+    multi = launch_local(shard_dir, workers, batch_size=batch_size, use_augmentation=False, max_steps=steps)
+    speedup = multi['samples_per_second'] / single['samples_per_second']
+    report = {'single': single, 'multi': multi, 'speedup': speedup,
+              'efficiency': speedup / workers}
+
+    print("=" * 60)
+    print("Scaling efficiency")
+    print("=" * 60)
+    print(f"{'Workers':>8} {'Samples/s':>12} {'Seconds':>10}")
+    for result in (single, multi):
+        print(f"{result['workers']:>8} {result['samples_per_second']:>12.1f} {result['seconds']:>10.1f}")
+    print(f"Speedup: {speedup:.2f}x, efficiency: {report['efficiency'] * 100:.0f}%")
+    return report
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Data-parallel emotion model training')
+    parser.add_argument('shard_dir', help='Directory with train/ and val/ shard directories')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() // 4 or 1,
+                        help='Local worker processes')
+    parser.add_argument('--cluster', help='Comma-separated host:port list for multi-host training')
+    parser.add_argument('--index', type=int, default=0, help="This host's position in --cluster")
+    parser.add_argument('--threads', type=int, help='Intra-op threads per worker (multi-host)')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=64, help='Per-worker batch size')
+    parser.add_argument('--no-augmentation', action='store_true')
+    parser.add_argument('--scaling-test', type=int, metavar='STEPS',
+                        help='Only measure scaling efficiency over this many steps')
+    parser.add_argument('--report', help='Write the scaling report as JSON to this path')
+    args = parser.parse_args()
+
+    if args.scaling_test:
+        report = scaling_test(args.shard_dir, args.workers, args.scaling_test, args.batch_size)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+        return 0
+
+    if args.cluster:
+        run_worker(args.cluster.split(','), args.index, args.shard_dir, args.epochs, args.batch_size,
+                   not args.no_augmentation, args.threads)
+    else:
+        result = launch_local(args.shard_dir, args.workers, args.epochs, args.batch_size,
+                              not args.no_augmentation)
+        print(f"Trained on {result['workers']} workers: {result['samples_per_second']:.1f} samples/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,76 +4,157 @@ Uses device camera to detect and analyze facial emotions
 Based on Kaggle Human Face Emotions Dataset
 """
 
+import argparse
 import cv2
 import numpy as np
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Dense, Dropout, Flatten, BatchNormalization
-from tensorflow.keras.preprocessing.image import img_to_array
 import os
+import json
+import signal
+import threading
+import time
+from face_detectors import create_face_detector
+from face_tracker import EmotionTracker
+from frame_pipeline import FramePipeline
+from media_writer import MediaWriter
+from emotion_statistics import EmotionStatistics
+from prediction_cache import PredictionCache
+from result_sinks import JsonlSink, MetricsSink, RecordingSink, UdpPublishSink
+
+# TensorFlow is imported lazily in create_model/load_model so that importing
+# this module (e.g. from the web app) stays fast
+
+# Fast model format: a directory holding the weights of the create_model()
+# architecture as one flat float32 .npy (memory-mapped on load) plus a manifest
+FAST_MODEL_FORMAT = 1
+FAST_MODEL_ARCHITECTURE = 'emotion_cnn_v1'
+FAST_MODEL_MANIFEST = 'manifest.json'
+FAST_MODEL_WEIGHTS = 'weights.npy'
+
+# Architecture variants of create_model(): conv filter multiplier and dense layer sizes.
+# Fast models record their variant in the manifest and are rebuilt with it on load.
+MODEL_VARIANTS = {
+    'standard': {'width': 1.0, 'dense': (512, 256)},
+    'small': {'width': 0.5, 'dense': (256, 128)},
+    'wide': {'width': 1.5, 'dense': (768, 384)},
+}
+
+# Probability panel layout used by draw_emotions
+PANEL_BAR_WIDTH = 200
+PANEL_BAR_HEIGHT = 20
+
+# Weight arrays already mapped in this process, keyed by (path, mtime)
+_fast_weights_cache = {}
+_fast_weights_lock = threading.Lock()
+
 
 class EmotionDetector:
     """Class to handle emotion detection from facial images"""
     
-    def __init__(self, model_path=None):
-        """Initialize the emotion detector"""
+    def __init__(self, model_path=None, lazy=False, cache_size=0, face_detector='haar',
+                 face_detector_options=None):
+        """
+        Initialize the emotion detector
+        With lazy=True the model is not built until initialize_model() is called
+        With cache_size > 0 predictions are cached by a perceptual hash of the face crop
+        face_detector selects the backend ('haar', 'lbp', 'yunet', 'res10'),
+        configured by face_detector_options
+        """
         self.emotions = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
         self.model = None
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.model_path = model_path
+        self.cache = PredictionCache(max_size=cache_size) if cache_size > 0 else None
+        self._panel_cache = {}
+        self._buffers = threading.local()
+        self.face_detector = create_face_detector(face_detector, **(face_detector_options or {}))
         
-        # Load or create model
-        if model_path and os.path.exists(model_path):
-            self.load_model(model_path)
+        if not lazy:
+            self.initialize_model()
+    
+    def initialize_model(self):
+        """Load the model from model_path, or build an untrained one"""
+        if self.model_path and os.path.exists(self.model_path):
+            self.load_model(self.model_path)
         else:
             self.model = self.create_model()
             print("Warning: Using untrained model. For best results, train the model first.")
+        return self.model
     
-    def create_model(self):
+    def create_model(self, compile=True, variant='standard', learning_rate=None):
         """
         Create CNN model for emotion detection
         Architecture based on common FER (Facial Expression Recognition) models
+        Pass compile=False for inference-only models
+        variant selects the layer sizes from MODEL_VARIANTS; learning_rate
+        overrides Adam's default
         """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Conv2D, MaxPooling2D, Dense, Dropout, Flatten, BatchNormalization
+        from tensorflow.keras.layers import Rescaling
+        
+        if variant not in MODEL_VARIANTS:
+            raise ValueError(f"Unknown model variant '{variant}'. Choose from: {', '.join(MODEL_VARIANTS)}")
+        width = MODEL_VARIANTS[variant]['width']
+        dense1, dense2 = MODEL_VARIANTS[variant]['dense']
+        
+        def filters(n):
+            return max(8, int(n * width))
+        
         model = Sequential()
         
+        # Normalization is part of the model so uint8 crops can be fed directly
+        model.add(Rescaling(1.0 / 255, input_shape=(48, 48, 1)))
+        
         # First Convolutional Block
-        model.add(Conv2D(32, (3, 3), activation='relu', input_shape=(48, 48, 1)))
+        model.add(Conv2D(filters(32), (3, 3), activation='relu'))
         model.add(BatchNormalization())
-        model.add(Conv2D(64, (3, 3), activation='relu'))
+        model.add(Conv2D(filters(64), (3, 3), activation='relu'))
         model.add(BatchNormalization())
         model.add(MaxPooling2D(pool_size=(2, 2)))
         model.add(Dropout(0.25))
         
         # Second Convolutional Block
-        model.add(Conv2D(128, (3, 3), activation='relu'))
+        model.add(Conv2D(filters(128), (3, 3), activation='relu'))
         model.add(BatchNormalization())
-        model.add(Conv2D(128, (3, 3), activation='relu'))
+        model.add(Conv2D(filters(128), (3, 3), activation='relu'))
         model.add(BatchNormalization())
         model.add(MaxPooling2D(pool_size=(2, 2)))
         model.add(Dropout(0.25))
         
         # Third Convolutional Block
-        model.add(Conv2D(256, (3, 3), activation='relu'))
+        model.add(Conv2D(filters(256), (3, 3), activation='relu'))
         model.add(BatchNormalization())
         model.add(MaxPooling2D(pool_size=(2, 2)))
         model.add(Dropout(0.25))
         
         # Fully Connected Layers
         model.add(Flatten())
-        model.add(Dense(512, activation='relu'))
+        model.add(Dense(dense1, activation='relu'))
         model.add(BatchNormalization())
         model.add(Dropout(0.5))
-        model.add(Dense(256, activation='relu'))
+        model.add(Dense(dense2, activation='relu'))
         model.add(BatchNormalization())
         model.add(Dropout(0.5))
         model.add(Dense(7, activation='softmax'))
         
-        model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        if compile:
+            optimizer = 'adam'
+            if learning_rate is not None:
+                from tensorflow.keras.optimizers import Adam
+                optimizer = Adam(learning_rate=learning_rate)
+            model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
         
         return model
     
     def load_model(self, model_path):
-        """Load a pre-trained model"""
-        from tensorflow.keras.models import load_model
-        self.model = load_model(model_path)
+        """Load a pre-trained model (Keras file or fast-loading model directory)"""
+        if is_fast_model(model_path):
+            variant, weights = load_fast_weights(model_path)
+            model = self.create_model(compile=False, variant=variant)
+            model.set_weights(weights)
+            self.model = model
+        else:
+            from tensorflow.keras.models import load_model
+            self.model = load_model(model_path)
         print(f"Model loaded from {model_path}")
     
     def save_model(self, model_path):
@@ -82,115 +163,236 @@ class EmotionDetector:
             self.model.save(model_path)
             print(f"Model saved to {model_path}")
     
-    def detect_faces(self, frame):
-        """Detect faces in the given frame"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    def detect_faces(self, frame, gray=None):
+        """
+        Detect faces in the given frame
+        gray may be a preallocated buffer of the frame's size to convert into
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        faces = self.face_detector.detect(frame=frame, gray=gray)
         return faces, gray
     
+    def detect_faces_gray(self, gray):
+        """Detect faces in an already grayscale frame"""
+        return self.face_detector.detect(gray=gray)
+    
+    @property
+    def model_rescales(self):
+        """Whether the model normalizes uint8 input itself (Rescaling first layer)"""
+        return type(self.model.layers[0]).__name__ == 'Rescaling'
+    
+    def batch_buffers(self, size):
+        """
+        Per-thread preallocated uint8 crop batch and float32 input batch,
+        grown only when a larger batch is needed
+        """
+        buffers = self._buffers
+        if getattr(buffers, 'batch', None) is None or buffers.batch.shape[0] < size:
+            capacity = max(size, 8)
+            buffers.batch = np.empty((capacity, 48, 48, 1), dtype=np.uint8)
+            buffers.scaled = np.empty((capacity, 48, 48, 1), dtype=np.float32)
+        return buffers.batch, buffers.scaled
+    
     def predict_emotion(self, face_img):
         """Predict emotion from a face image"""
-        if self.model is None:
-            return None, []
+        return self.predict_emotions_batch([face_img])[0]
+    
+    def predict_emotions_batch(self, face_imgs):
+        """
+        Predict emotions for several face images with a single model call
+        Returns a list of (emotion, predictions) tuples in input order
+        """
+        if self.model is None or len(face_imgs) == 0:
+            return [(None, []) for _ in face_imgs]
+        
+        # Resize straight into the preallocated batch
+        count = len(face_imgs)
+        batch, scaled = self.batch_buffers(count)
+        for i, face_img in enumerate(face_imgs):
+            cv2.resize(face_img, (48, 48), dst=batch[i, :, :, 0])
         
-        # Preprocess the face image
-        face_img = cv2.resize(face_img, (48, 48))
-        face_img = face_img.astype('float32') / 255.0
-        face_img = img_to_array(face_img)
-        face_img = np.expand_dims(face_img, axis=0)
+        predictions = [None] * count
+        keys = [None] * count
         
-        # Predict emotion
-        predictions = self.model.predict(face_img, verbose=0)
-        emotion_idx = np.argmax(predictions[0])
-        emotion = self.emotions[emotion_idx]
-        confidence = predictions[0][emotion_idx]
+        # Serve near-duplicate crops from the cache
+        if self.cache is not None:
+            for i in range(count):
+                keys[i] = self.cache.key(batch[i, :, :, 0])
+                predictions[i] = self.cache.get(keys[i])
         
-        return emotion, predictions[0]
+        missing = [i for i, p in enumerate(predictions) if p is None]
+        if missing:
+            # Move cache misses to the front of the batch (j <= i, so nothing is overwritten early)
+            for j, i in enumerate(missing):
+                if j != i:
+                    batch[j] = batch[i]
+            inputs = batch[:len(missing)]
+            if not self.model_rescales:
+                # Models saved before normalization moved into the network
+                inputs = np.multiply(inputs, 1.0 / 255, out=scaled[:len(missing)], casting='unsafe')
+            
+            results = self.model(inputs, training=False).numpy()
+            for i, p in zip(missing, results):
+                predictions[i] = p
+                if self.cache is not None:
+                    self.cache.put(keys[i], p)
+        
+        return [(self.emotions[np.argmax(p)], p) for p in predictions]
     
     def draw_emotion_info(self, frame, x, y, w, h, emotion, confidence, all_predictions):
         """Draw emotion information on the frame"""
-        # Draw rectangle around face
-        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        return self.draw_emotions(frame, [(x, y, w, h, emotion, confidence, all_predictions)])
+    
+    def draw_emotions(self, frame, detections):
+        """
+        Draw boxes and labels for all faces and the probability panel in one pass
+        detections: list of (x, y, w, h, emotion, confidence, all_predictions);
+        the panel shows the last face, as repeated per-face drawing used to
+        """
+        for (x, y, w, h, emotion, confidence, _) in detections:
+            # Draw rectangle around face
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            
+            # Draw emotion label
+            label = f"{emotion}: {confidence*100:.1f}%"
+            cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
         
-        # Draw emotion label
-        label = f"{emotion}: {confidence*100:.1f}%"
-        cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        if not detections:
+            return frame
         
         # Draw emotion probabilities bar chart on the side
-        bar_height = 20
-        bar_width = 200
-        start_x = frame.shape[1] - bar_width - 20
+        _, _, _, _, emotion, _, all_predictions = detections[-1]
+        template, bar_mask, text_mask, value_x = self.get_panel_template(frame.shape)
+        start_x = frame.shape[1] - PANEL_BAR_WIDTH - 20
         start_y = 50
+        if start_x < 0 or start_y + template.shape[0] > frame.shape[0]:
+            return frame
         
+        # Reuse a per-thread work buffer for composing the panel
+        panel = getattr(self._buffers, 'panel', None)
+        if panel is None or panel.shape != template.shape:
+            panel = self._buffers.panel = np.empty_like(template)
+        np.copyto(panel, template)
         for i, (emotion_name, prob) in enumerate(zip(self.emotions, all_predictions)):
-            # Background bar
-            cv2.rectangle(frame, (start_x, start_y + i * (bar_height + 5)), 
-                         (start_x + bar_width, start_y + i * (bar_height + 5) + bar_height), 
-                         (50, 50, 50), -1)
-            
             # Probability bar
-            bar_fill = int(bar_width * prob)
+            top = i * (PANEL_BAR_HEIGHT + 5)
+            bar_fill = int(PANEL_BAR_WIDTH * prob)
             color = (0, 255, 0) if emotion_name == emotion else (100, 100, 255)
-            cv2.rectangle(frame, (start_x, start_y + i * (bar_height + 5)), 
-                         (start_x + bar_fill, start_y + i * (bar_height + 5) + bar_height), 
-                         color, -1)
-            
-            # Emotion name and percentage
-            text = f"{emotion_name}: {prob*100:.1f}%"
-            cv2.putText(frame, text, (start_x + 5, start_y + i * (bar_height + 5) + 15), 
+            panel[top:top + PANEL_BAR_HEIGHT, :max(bar_fill, 0)] = color
+        
+        # Emotion names (pre-rendered) and percentages
+        panel[text_mask] = 255
+        for i, prob in enumerate(all_predictions):
+            cv2.putText(panel, f"{prob*100:.1f}%", (value_x[i], i * (PANEL_BAR_HEIGHT + 5) + 15),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
+        roi = frame[start_y:start_y + panel.shape[0], start_x:start_x + panel.shape[1]]
+        np.copyto(roi, panel, where=bar_mask)
+        
         return frame
     
-    def run_realtime_detection(self):
-        """Run real-time emotion detection from camera"""
-        print("Starting camera... Press 'q' to quit")
-        cap = cv2.VideoCapture(0)
+    def get_panel_template(self, frame_shape):
+        """
+        Pre-render the static parts of the probability panel (bar backgrounds
+        and emotion names) once per frame size
+        """
+        key = tuple(frame_shape[:2])
+        if key in self._panel_cache:
+            return self._panel_cache[key]
+        
+        height = len(self.emotions) * (PANEL_BAR_HEIGHT + 5) - 5
+        panel = np.zeros((height, PANEL_BAR_WIDTH, 3), dtype=np.uint8)
+        bar_mask = np.zeros((height, PANEL_BAR_WIDTH, 1), dtype=bool)
+        text_layer = np.zeros((height, PANEL_BAR_WIDTH), dtype=np.uint8)
+        value_x = []
+        
+        for i, emotion_name in enumerate(self.emotions):
+            top = i * (PANEL_BAR_HEIGHT + 5)
+            panel[top:top + PANEL_BAR_HEIGHT] = (50, 50, 50)
+            bar_mask[top:top + PANEL_BAR_HEIGHT] = True
+            
+            name = f"{emotion_name}: "
+            cv2.putText(text_layer, name, (5, top + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 255, 1)
+            (text_width, _), _ = cv2.getTextSize(name, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            value_x.append(5 + text_width)
+        
+        text_mask = text_layer > 0
+        panel[text_mask] = 255
+        
+        self._panel_cache[key] = (panel, bar_mask, text_mask, value_x)
+        return self._panel_cache[key]
+    
+    def open_camera(self, camera=0):
+        """Open a camera (or video file) configured for realtime detection, or return None"""
+        cap = cv2.VideoCapture(camera)
         
         if not cap.isOpened():
             print("Error: Could not open camera")
-            return
+            return None
         
         # Set camera properties for better performance
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv2.CAP_PROP_FPS, 30)
+        return cap
+    
+    def record_statistics(self, statistics, result):
+        """Add the faces of one pipeline result to an EmotionStatistics"""
+        if result.faces:
+            statistics.update([emotion for _, _, emotion, _ in result.faces],
+                              [float(np.max(p)) for _, _, _, p in result.faces],
+                              [p for _, _, _, p in result.faces])
+    
+    def run_realtime_detection(self, smoothing=True, pipelined=False, headless=False, sinks=None, camera=0):
+        """
+        Run real-time emotion detection from camera
+        With smoothing=True faces are tracked, their probabilities smoothed
+        over time and unchanged faces skip re-inference
+        With pipelined=True detection, inference and drawing of consecutive
+        frames run concurrently (see frame_pipeline.FramePipeline)
+        With headless=True no window is opened; results go to sinks instead
+        (see run_headless)
+        """
+        if headless:
+            return self.run_headless(sinks, smoothing=smoothing, pipelined=pipelined, camera=camera)
+        
+        tracker = EmotionTracker(self) if smoothing else EmotionTracker(self, smoothing=0, max_staleness=0)
+        
+        print("Starting camera... Press 'q' to quit")
+        cap = self.open_camera(camera)
+        if cap is None:
+            return
         
         print("Camera started successfully!")
         print("Controls:")
         print("  'q' - Quit")
         print("  's' - Save screenshot")
+        print("  'r' - Start/stop recording")
         
+        pipeline = FramePipeline(self, tracker=tracker, render=self.render_realtime_frame,
+                                 threaded=pipelined).start()
+        # Snapshots and recordings are written in the background
+        writer = MediaWriter()
+        statistics = EmotionStatistics(self.emotions)
         frame_count = 0
         
         while True:
-            ret, frame = cap.read()
+            ret, captured = cap.read()
             if not ret:
                 print("Error: Could not read frame")
                 break
             
             frame_count += 1
             
-            # Detect faces
-            faces, gray = self.detect_faces(frame)
-            
-            # Process each face
-            for (x, y, w, h) in faces:
-                face_roi = gray[y:y+h, x:x+w]
-                
-                # Predict emotion
-                emotion, predictions = self.predict_emotion(face_roi)
-                
-                if emotion:
-                    confidence = np.max(predictions)
-                    # Draw emotion information
-                    frame = self.draw_emotion_info(frame, x, y, w, h, emotion, confidence, predictions)
-            
-            # Add title and instructions
-            cv2.putText(frame, "Face Emotion Detection - Real-time", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            cv2.putText(frame, f"Faces detected: {len(faces)}", (10, frame.shape[0] - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            # Detect faces, predict and draw (possibly overlapped with other frames)
+            pipeline.submit(captured)
+            results = pipeline.drain()
+            if not results:
+                continue
+            frame = results[-1].output
+            for result in results:
+                writer.record(result.output)
+                self.record_statistics(statistics, result)
             
             # Display the frame
             cv2.imshow('Face Emotion Detection', frame)
@@ -201,18 +403,267 @@ class EmotionDetector:
                 print("Quitting...")
                 break
             elif key == ord('s'):
-                screenshot_path = f"emotion_screenshot_{frame_count}.png"
-                cv2.imwrite(screenshot_path, frame)
-                print(f"Screenshot saved: {screenshot_path}")
+                screenshot_path = writer.snapshot(frame, f"emotion_screenshot_{frame_count}.png")
+                if screenshot_path:
+                    print(f"Saving screenshot: {screenshot_path}")
+                else:
+                    print("Screenshot skipped: writer is busy")
+            elif key == ord('r'):
+                if writer.recording:
+                    writer.stop_recording()
+                    print("Recording stopped")
+                else:
+                    writer.start_recording(fps=cap.get(cv2.CAP_PROP_FPS) or 30)
+                    print("Recording started")
         
         # Cleanup
+        writer.close()
+        pipeline.stop()
         cap.release()
         cv2.destroyAllWindows()
         print("Camera stopped")
+        print(f"Model calls: {tracker.inferences}, skipped: {tracker.skipped}")
+        
+        stats = pipeline.stats()
+        print(f"Throughput: {stats['fps']:.1f} FPS, latency: {stats['latency']['mean_ms']:.1f} ms mean, "
+              f"{stats['latency']['max_ms']:.1f} ms max")
+        
+        self.print_statistics(statistics.snapshot())
+        
+        media = writer.stats()
+        if media['segments']:
+            print(f"Recorded {media['written']} frames ({media['dropped']} dropped) to: "
+                  f"{', '.join(media['segments'])}")
+    
+    def run_headless(self, sinks=None, smoothing=True, pipelined=True, camera=0,
+                     max_frames=None, duration=None):
+        """
+        Run the realtime loop without a display, for headless inference hosts
+        Every completed frame is passed to each sink (see result_sinks);
+        frames are only drawn if a sink needs them. Runs until the camera
+        ends, max_frames or duration is reached, or SIGINT/SIGTERM arrives,
+        then prints a throughput report and returns the pipeline stats.
+        """
+        sinks = list(sinks or [])
+        tracker = EmotionTracker(self) if smoothing else EmotionTracker(self, smoothing=0, max_staleness=0)
+        
+        cap = self.open_camera(camera)
+        if cap is None:
+            return None
+        
+        # Skip drawing entirely unless a sink consumes annotated frames
+        render = self.render_realtime_frame if any(sink.needs_frames for sink in sinks) else None
+        pipeline = FramePipeline(self, tracker=tracker, render=render, threaded=pipelined)
+        statistics = EmotionStatistics(self.emotions)
+        
+        stop = threading.Event()
+        
+        def request_stop(signum, frame):
+            print(f"\nReceived {signal.Signals(signum).name}, stopping...")
+            stop.set()
+        
+        previous_handlers = {}
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                previous_handlers[signum] = signal.signal(signum, request_stop)
+            except ValueError:
+                # Not the main thread; rely on max_frames/duration or the camera ending
+                break
+        
+        for sink in sinks:
+            sink.start(self, statistics, pipeline)
+        pipeline.start()
+        print(f"Headless detection running with {len(sinks)} sink(s). Press Ctrl+C to stop")
+        
+        def deliver(results):
+            for result in results:
+                self.record_statistics(statistics, result)
+                for sink in sinks:
+                    sink.handle(result)
+        
+        captured = 0
+        started = time.perf_counter()
+        try:
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    print("Camera stream ended")
+                    break
+                captured += 1
+                pipeline.submit(frame)
+                deliver(pipeline.drain())
+                
+                if max_frames and captured >= max_frames:
+                    break
+                if duration and time.perf_counter() - started >= duration:
+                    break
+        finally:
+            # Flush frames still in flight so sinks see every processed frame
+            pipeline.stop()
+            deliver(pipeline.drain())
+            elapsed = time.perf_counter() - started
+            cap.release()
+            for sink in sinks:
+                try:
+                    sink.close()
+                except Exception as e:
+                    print(f"Error closing {type(sink).__name__}: {e}")
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        
+        stats = pipeline.stats()
+        print("\nHeadless throughput report")
+        print(f"  Frames: {captured} captured, {stats['frames']} processed in {elapsed:.1f}s "
+              f"({captured / elapsed if elapsed > 0 else 0.0:.1f} FPS)")
+        print(f"  Latency: {stats['latency']['mean_ms']:.1f} ms mean, "
+              f"{stats['latency']['p95_ms']:.1f} ms p95, {stats['latency']['max_ms']:.1f} ms max")
+        for stage, times in stats['stages'].items():
+            print(f"  {stage:>7}: {times['mean_ms']:.1f} ms mean, {times['max_ms']:.1f} ms max")
+        print(f"  Model calls: {tracker.inferences}, skipped: {tracker.skipped}")
+        self.print_statistics(statistics.snapshot())
+        return stats
+    
+    def print_statistics(self, snapshot):
+        """Print a per-emotion summary of a statistics snapshot"""
+        if snapshot.total == 0:
+            return
+        percentages = snapshot.percentages()
+        confidences = snapshot.mean_confidence()
+        print(f"\nDetections: {snapshot.total} in {snapshot.frames} frames")
+        for emotion, count in snapshot.counts_dict().items():
+            print(f"  {emotion:>8}: {count:>6} ({percentages[emotion]:5.1f}%), "
+                  f"mean confidence {confidences[emotion]:.2f}")
+        rolling = snapshot.rolling()
+        print(f"Last {rolling['seconds']:.0f}s: {rolling['detections_per_second']:.1f} detections/s")
+    
+    def render_realtime_frame(self, frame, faces):
+        """Draw emotions, title and face count for the realtime window"""
+        detections = [(x, y, w, h, emotion, np.max(predictions), predictions)
+                      for _, (x, y, w, h), emotion, predictions in faces]
+        
+        # Draw emotion information
+        frame = self.draw_emotions(frame, detections)
+        
+        # Add title and instructions
+        cv2.putText(frame, "Face Emotion Detection - Real-time", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        cv2.putText(frame, f"Faces detected: {len(faces)}", (10, frame.shape[0] - 10), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        return frame
+
+
+def is_fast_model(path):
+    """Check whether path is a fast-loading model directory"""
+    return os.path.isfile(os.path.join(path, FAST_MODEL_MANIFEST))
+
+
+def model_variant(model):
+    """Name of the MODEL_VARIANTS entry whose architecture matches model's weights"""
+    actual = [w.shape for w in model.get_weights()]
+    detector = EmotionDetector(lazy=True)
+    for variant in MODEL_VARIANTS:
+        reference = detector.create_model(compile=False, variant=variant)
+        if [w.shape for w in reference.get_weights()] == actual:
+            return variant
+    raise ValueError("Model architecture does not match any EmotionDetector.create_model() variant")
+
+
+def export_fast_model(model, output_path, emotions=None, variant=None):
+    """
+    Write a model's weights in the fast-loading format
+    variant names the create_model() variant that built the model; it is
+    detected from the weight shapes when not given
+    Optimizer and compile state are not stored
+    """
+    if variant is None:
+        variant = model_variant(model)
+    elif variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Choose from: {', '.join(MODEL_VARIANTS)}")
+    weights = model.get_weights()
+    os.makedirs(output_path, exist_ok=True)
+    
+    entries = []
+    offset = 0
+    for w in weights:
+        entries.append({'shape': list(w.shape), 'offset': offset})
+        offset += int(w.size)
+    
+    flat = np.concatenate([w.astype('float32').ravel() for w in weights])
+    np.save(os.path.join(output_path, FAST_MODEL_WEIGHTS), flat)
+    
+    manifest = {
+        'format': FAST_MODEL_FORMAT,
+        'architecture': FAST_MODEL_ARCHITECTURE,
+        'variant': variant,
+        'emotions': emotions,
+        'weights': entries
+    }
+    with open(os.path.join(output_path, FAST_MODEL_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    print(f"Fast model exported to {output_path}")
+
+
+def load_fast_weights(path):
+    """
+    Return (variant, weight arrays) for a fast model; the arrays are
+    memory-mapped and cached
+    """
+    weights_path = os.path.join(path, FAST_MODEL_WEIGHTS)
+    key = (os.path.abspath(path), os.path.getmtime(weights_path))
+    
+    with _fast_weights_lock:
+        if key in _fast_weights_cache:
+            return _fast_weights_cache[key]
+        
+        with open(os.path.join(path, FAST_MODEL_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FAST_MODEL_FORMAT:
+            raise ValueError(f"Unsupported fast model format: {manifest.get('format')}")
+        if manifest.get('architecture') != FAST_MODEL_ARCHITECTURE:
+            raise ValueError(f"Unknown model architecture: {manifest.get('architecture')}")
+        # Models exported before variants were recorded are always 'standard'
+        variant = manifest.get('variant', 'standard')
+        if variant not in MODEL_VARIANTS:
+            raise ValueError(f"Unknown model variant: {variant}")
+        
+        flat = np.load(weights_path, mmap_mode='r')
+        weights = []
+        for entry in manifest['weights']:
+            size = int(np.prod(entry['shape']))
+            weights.append(flat[entry['offset']:entry['offset'] + size].reshape(entry['shape']))
+        
+        _fast_weights_cache[key] = (variant, weights)
+        return variant, weights
+
+
+def convert_to_fast_model(model_path, output_path):
+    """Convert a saved Keras model (e.g. emotion_model_best.h5) to the fast format"""
+    from tensorflow.keras.models import load_model
+    model = load_model(model_path, compile=False)
+    
+    # The variant is detected from the weight shapes so the fast loader rebuilds the same graph
+    export_fast_model(model, output_path)
+
 
 
 def main():
     """Main function to run the emotion detector"""
+    parser = argparse.ArgumentParser(description='Real-time face emotion detection')
+    parser.add_argument('--camera', default='0', help='Camera index or video file (default: 0)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Overlap detection, inference and drawing of consecutive frames')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without a display window; results go to the sinks below')
+    parser.add_argument('--jsonl', metavar='PATH', help='Headless: append per-frame results to a JSONL file')
+    parser.add_argument('--metrics', metavar='PATH', help='Headless: periodically write statistics to a JSON file')
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help='Seconds between metrics writes')
+    parser.add_argument('--record', metavar='DIR', help='Headless: record annotated video segments to DIR')
+    parser.add_argument('--publish', metavar='HOST:PORT', help='Headless: send per-frame results as UDP JSON')
+    parser.add_argument('--duration', type=float, help='Headless: stop after this many seconds')
+    args = parser.parse_args()
+    camera = int(args.camera) if args.camera.isdigit() else args.camera
+    
     print("=" * 60)
     print("Real-time Face Emotion Detection System")
     print("Based on Kaggle Human Face Emotions Dataset")
@@ -222,8 +673,22 @@ def main():
     # Initialize detector
     detector = EmotionDetector()
     
-    # Run real-time detection
-    detector.run_realtime_detection()
+    if not args.headless:
+        # Run real-time detection
+        detector.run_realtime_detection(pipelined=args.pipelined, camera=camera)
+        return
+    
+    sinks = []
+    if args.jsonl:
+        sinks.append(JsonlSink(args.jsonl))
+    if args.metrics:
+        sinks.append(MetricsSink(args.metrics, interval=args.metrics_interval))
+    if args.record:
+        sinks.append(RecordingSink(args.record))
+    if args.publish:
+        host, port = args.publish.rsplit(':', 1)
+        sinks.append(UdpPublishSink(host, port))
+    detector.run_headless(sinks, pipelined=args.pipelined, camera=camera, duration=args.duration)
 
 
 if __name__ == "__main__":
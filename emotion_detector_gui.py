@@ -10,6 +10,16 @@ from PIL import Image, ImageTk
 import threading
 import numpy as np
 from emotion_detector import EmotionDetector
+from face_tracker import EmotionTracker
+from media_writer import MediaWriter
+from emotion_statistics import EmotionStatistics
+
+# Display size of the video label and refresh interval of the display loop (~60 Hz)
+DISPLAY_SIZE = (640, 480)
+DISPLAY_INTERVAL_MS = 16
+
+# Refresh interval of the statistics panel (~7 Hz)
+STATS_INTERVAL_MS = 150
 
 
 class EmotionDetectorGUI:
@@ -24,17 +34,30 @@ class EmotionDetectorGUI:
         
         # Initialize detector
         self.detector = EmotionDetector()
+        self.tracker = EmotionTracker(self.detector)
+        
+        # Screenshots and recordings are written by a background thread
+        self.media_writer = MediaWriter()
         
         # Camera variables
         self.cap = None
         self.is_running = False
         self.current_frame = None
         
-        # Statistics
-        self.emotion_counts = {emotion: 0 for emotion in self.detector.emotions}
-        self.total_detections = 0
+        # Latest processed frame handed from the worker to the display loop
+        self.frame_lock = threading.Lock()
+        self.frame_seq = 0
+        self.displayed_seq = 0
+        self.photo = None
+        self.render_job = None
+        self.gray_buffer = None
+        
+        # Statistics, updated by the worker once per frame and shown by statistics_loop
+        self.statistics = EmotionStatistics(self.detector.emotions)
+        self.label_texts = {}
         
         self.setup_ui()
+        self.statistics_loop()
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -101,6 +124,14 @@ class EmotionDetectorGUI:
                                      width=15)
         screenshot_button.pack(pady=5)
         
+        self.record_button = tk.Button(control_frame, text="Start Recording", 
+                                       command=self.toggle_recording, 
+                                       font=('Arial', 10),
+                                       bg='#8e44ad', fg='white', 
+                                       activebackground='#9b59b6',
+                                       width=15)
+        self.record_button.pack(pady=5)
+        
         reset_stats_button = tk.Button(control_frame, text="Reset Statistics", 
                                        command=self.reset_statistics, 
                                        font=('Arial', 10),
@@ -181,17 +212,22 @@ class EmotionDetectorGUI:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
             
             self.is_running = True
+            self.tracker.reset()
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Camera running...")
             
-            # Start video thread
+            # Start video thread and the main-thread display loop
             self.video_thread = threading.Thread(target=self.update_frame, daemon=True)
             self.video_thread.start()
+            self.render_job = self.root.after(DISPLAY_INTERVAL_MS, self.render_loop)
     
     def stop_camera(self):
         """Stop the camera"""
         self.is_running = False
+        if self.render_job is not None:
+            self.root.after_cancel(self.render_job)
+            self.render_job = None
         if self.cap:
             self.cap.release()
         
@@ -201,94 +237,147 @@ class EmotionDetectorGUI:
         
         # Clear video label
         self.video_label.config(image='')
+        self.photo = None
     
     def update_frame(self):
-        """Update video frame continuously"""
+        """Capture and process frames, publishing only the latest one for display"""
         while self.is_running:
             if self.cap and self.cap.isOpened():
                 ret, frame = self.cap.read()
                 if ret:
                     # Process frame
                     processed_frame = self.process_frame(frame)
-                    self.current_frame = processed_frame
                     
-                    # Convert to PhotoImage
-                    frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(frame_rgb)
+                    # Publish; an undisplayed older frame is simply replaced
+                    with self.frame_lock:
+                        self.current_frame = processed_frame
+                        self.frame_seq += 1
                     
-                    # Resize to fit the label
-                    img = img.resize((640, 480), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(image=img)
-                    
-                    # Update label
-                    self.video_label.config(image=photo)
-                    self.video_label.image = photo
+                    # Queued for the recording without blocking; dropped if the disk lags
+                    self.media_writer.record(processed_frame)
     
-    def process_frame(self, frame):
-        """Process frame for emotion detection"""
-        faces, gray = self.detector.detect_faces(frame)
+    def render_loop(self):
+        """Display the latest published frame; runs on the Tk main thread"""
+        if not self.is_running:
+            return
         
-        for (x, y, w, h) in faces:
-            face_roi = gray[y:y+h, x:x+w]
+        with self.frame_lock:
+            frame = self.current_frame
+            seq = self.frame_seq
+        
+        if frame is not None and seq != self.displayed_seq:
+            self.displayed_seq = seq
+            
+            # Convert to PIL image
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            img = Image.fromarray(frame_rgb)
+            
+            # Resize to fit the label only when needed, with a cheap filter
+            if img.size != DISPLAY_SIZE:
+                img = img.resize(DISPLAY_SIZE, Image.Resampling.BILINEAR)
             
-            # Predict emotion
-            emotion, predictions = self.detector.predict_emotion(face_roi)
+            # Reuse the PhotoImage instead of allocating one per frame
+            if self.photo is None:
+                self.photo = ImageTk.PhotoImage(image=img)
+                self.video_label.config(image=self.photo)
+            else:
+                self.photo.paste(img)
+        
+        self.render_job = self.root.after(DISPLAY_INTERVAL_MS, self.render_loop)
+    
+    def process_frame(self, frame):
+        """Process frame for emotion detection"""
+        # Reuse one grayscale buffer across frames
+        if self.gray_buffer is None or self.gray_buffer.shape != frame.shape[:2]:
+            self.gray_buffer = np.empty(frame.shape[:2], dtype=np.uint8)
+        faces, gray = self.detector.detect_faces(frame, gray=self.gray_buffer)
+        
+        # Predict smoothed emotions per tracked face
+        drawn = []
+        for track, emotion, predictions in self.tracker.update(faces, gray):
+            x, y, w, h = track.box
             
             if emotion:
                 confidence = np.max(predictions)
                 
-                # Update statistics
-                self.emotion_counts[emotion] += 1
-                self.total_detections += 1
-                
-                # Draw on frame
-                frame = self.detector.draw_emotion_info(frame, x, y, w, h, emotion, confidence, predictions)
-                
-                # Update GUI labels
-                self.root.after(0, self.update_emotion_labels, emotion, confidence)
+                drawn.append((x, y, w, h, emotion, confidence, predictions))
+        
+        # Update the statistics model; widgets are refreshed by statistics_loop
+        if drawn:
+            self.statistics.update([d[4] for d in drawn], [d[5] for d in drawn], [d[6] for d in drawn])
         
-        return frame
+        # Draw all faces on frame in one pass
+        return self.detector.draw_emotions(frame, drawn)
+    
+    def set_label_text(self, label, text):
+        """Update a label only if its text actually changed"""
+        if self.label_texts.get(label) != text:
+            self.label_texts[label] = text
+            label.config(text=text)
     
-    def update_emotion_labels(self, emotion, confidence):
-        """Update emotion labels in GUI"""
-        self.current_emotion_label.config(text=f"Current Emotion: {emotion}")
-        self.confidence_label.config(text=f"Confidence: {confidence*100:.1f}%")
+    def update_statistics_labels(self):
+        """Push a snapshot of the statistics model to the widgets in one batch"""
+        snapshot = self.statistics.snapshot()
+        counts = snapshot.counts_dict()
+        total = snapshot.total
+        emotion, confidence = snapshot.latest()
+        
+        if emotion is None:
+            self.set_label_text(self.current_emotion_label, "Current Emotion: --")
+            self.set_label_text(self.confidence_label, "Confidence: --")
+        else:
+            self.set_label_text(self.current_emotion_label, f"Current Emotion: {emotion}")
+            self.set_label_text(self.confidence_label, f"Confidence: {confidence*100:.1f}%")
         
-        # Update statistics
         for emo in self.detector.emotions:
-            count = self.emotion_counts[emo]
-            percentage = (count / self.total_detections * 100) if self.total_detections > 0 else 0
-            self.stats_labels[emo].config(text=f"{count} ({percentage:.1f}%)")
+            count = counts[emo]
+            percentage = (count / total * 100) if total > 0 else 0
+            self.set_label_text(self.stats_labels[emo], f"{count} ({percentage:.1f}%)")
         
-        self.total_label.config(text=f"Total Detections: {self.total_detections}")
+        self.set_label_text(self.total_label, f"Total Detections: {total}")
+    
+    def statistics_loop(self):
+        """Refresh the statistics widgets at a fixed low rate on the main thread"""
+        self.update_statistics_labels()
+        self.root.after(STATS_INTERVAL_MS, self.statistics_loop)
     
     def save_screenshot(self):
-        """Save current frame as screenshot"""
-        if self.current_frame is not None:
+        """Save current frame as screenshot (written in the background)"""
+        with self.frame_lock:
+            frame = self.current_frame
+        if frame is not None:
             import time
-            filename = f"emotion_screenshot_{int(time.time())}.png"
-            cv2.imwrite(filename, self.current_frame)
+            filename = self.media_writer.snapshot(frame, f"emotion_screenshot_{int(time.time())}.png")
+            if filename is None:
+                messagebox.showwarning("Warning", "Still saving earlier screenshots. Try again.")
+                return
             self.status_label.config(text=f"Screenshot saved: {filename}")
             messagebox.showinfo("Success", f"Screenshot saved as {filename}")
         else:
             messagebox.showwarning("Warning", "No frame to save. Start the camera first.")
     
+    def toggle_recording(self):
+        """Start or stop recording the annotated video"""
+        if self.media_writer.recording:
+            self.media_writer.stop_recording()
+            self.record_button.config(text="Start Recording")
+            self.status_label.config(text="Recording stopped")
+        else:
+            self.media_writer.start_recording(fps=(self.cap.get(cv2.CAP_PROP_FPS) if self.cap else 0) or 30)
+            self.record_button.config(text="Stop Recording")
+            self.status_label.config(text="Recording...")
+    
     def reset_statistics(self):
         """Reset emotion statistics"""
-        self.emotion_counts = {emotion: 0 for emotion in self.detector.emotions}
-        self.total_detections = 0
-        
-        for emo in self.detector.emotions:
-            self.stats_labels[emo].config(text="0 (0.0%)")
+        self.statistics.reset()
         
-        self.total_label.config(text="Total Detections: 0")
-        self.current_emotion_label.config(text="Current Emotion: --")
-        self.confidence_label.config(text="Confidence: --")
+        self.update_statistics_labels()
         self.status_label.config(text="Statistics reset")
     
     def on_closing(self):
         """Handle window closing"""
         self.stop_camera()
+        self.media_writer.close()
         self.root.destroy()
 
 
@@ -0,0 +1,176 @@
+"""
+Debounced emotion-change events
+A per-face state machine turns per-frame (smoothed) predictions into a sparse
+event stream: a face appears, its dominant emotion changes and stays changed
+for a hold time, or it disappears. Events are delivered to callbacks and to
+per-subscriber queues (e.g. server-sent events clients), and the most recent
+ones are kept so reconnecting clients can catch up.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+
+class FaceState:
+    """Debounce state of one tracked face"""
+
+    def __init__(self, face_id, emotion, confidence, box, now):
+        self.face_id = face_id
+        self.emotion = emotion          # Stable (last reported) emotion
+        self.confidence = confidence
+        self.box = box
+        self.candidate = None           # Differing emotion waiting out the hold time
+        self.candidate_since = None
+        self.first_seen = now
+        self.last_seen = now
+
+
+class EmotionEventStream:
+    """
+    Emit 'appear', 'change' and 'disappear' events for tracked faces
+
+    update() is called once per frame with every visible face. A change is
+    reported only after the new dominant emotion has been observed without
+    interruption for hold_time seconds; a face is reported gone after it has
+    not been seen for disappear_after seconds.
+    """
+
+    def __init__(self, hold_time=1.0, disappear_after=1.0, history=256, subscriber_queue=256):
+        self.hold_time = hold_time
+        self.disappear_after = disappear_after
+        self.subscriber_queue = subscriber_queue
+        self.faces = {}
+        self.recent = deque(maxlen=history)
+        self.callbacks = []
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+
+    def add_callback(self, callback):
+        """Call callback(event) for every event (from the thread calling update)"""
+        self.callbacks.append(callback)
+
+    def subscribe(self):
+        """Return a queue that receives every future event"""
+        subscriber = queue.Queue(maxsize=self.subscriber_queue)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Stop delivering events to a subscriber queue"""
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def events_since(self, seq):
+        """Recent events with a sequence number greater than seq"""
+        with self.lock:
+            return [event for event in self.recent if event['seq'] > seq]
+
+    def make_event(self, event_type, state, now, previous=None):
+        """Build an event dictionary for a face"""
+        return {
+            'seq': next(self.seq),
+            'type': event_type,
+            'face_id': state.face_id,
+            'emotion': state.emotion,
+            'previous': previous,
+            'confidence': state.confidence,
+            'box': state.box,
+            'duration': now - state.first_seen,
+            'timestamp': time.time()
+        }
+
+    def update(self, faces, now=None):
+        """
+        Feed one frame of faces as (face_id, emotion, confidence, (x, y, w, h))
+        tuples and return the events it produced
+        """
+        now = time.monotonic() if now is None else now
+        events = []
+        with self.lock:
+            for face_id, emotion, confidence, box in faces:
+                box = tuple(int(v) for v in box)
+                state = self.faces.get(face_id)
+                if state is None:
+                    state = self.faces[face_id] = FaceState(face_id, emotion, float(confidence), box, now)
+                    events.append(self.make_event('appear', state, now))
+                    continue
+
+                state.last_seen = now
+                state.box = box
+                if emotion == state.emotion:
+                    state.confidence = float(confidence)
+                    state.candidate = None
+                elif emotion != state.candidate:
+                    state.candidate, state.candidate_since = emotion, now
+                elif now - state.candidate_since >= self.hold_time:
+                    previous = state.emotion
+                    state.emotion, state.confidence = emotion, float(confidence)
+                    state.candidate = None
+                    events.append(self.make_event('change', state, now, previous))
+
+            events.extend(self.expire(now))
+            self.publish(events)
+        self.run_callbacks(events)
+        return events
+
+    def expire(self, now, everything=False, face_ids=None):
+        """
+        Remove faces not seen recently (or all of face_ids, or every face)
+        and return their 'disappear' events
+        """
+        events = []
+        for face_id, state in list(self.faces.items()):
+            if (everything or (face_ids is not None and face_id in face_ids)
+                    or now - state.last_seen >= self.disappear_after):
+                del self.faces[face_id]
+                events.append(self.make_event('disappear', state, now))
+        return events
+
+    def expire_stale(self):
+        """
+        Report faces not seen for disappear_after seconds; call periodically so
+        faces of a source that stopped calling update() still disappear
+        """
+        with self.lock:
+            events = self.expire(time.monotonic())
+            self.publish(events)
+        self.run_callbacks(events)
+        return events
+
+    def clear(self, face_ids=None):
+        """
+        Report tracked faces as gone (e.g. when the camera stops)
+        With face_ids only those faces are cleared (e.g. one client disconnecting)
+        """
+        with self.lock:
+            events = self.expire(time.monotonic(), everything=face_ids is None,
+                                 face_ids=None if face_ids is None else set(face_ids))
+            self.publish(events)
+        self.run_callbacks(events)
+        return events
+
+    def publish(self, events):
+        """Record events and hand them to subscriber queues (lock held)"""
+        for event in events:
+            self.recent.append(event)
+            for subscriber in self.subscribers:
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # A slow consumer loses its oldest event rather than blocking the stream
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+                    subscriber.put_nowait(event)
+
+    def run_callbacks(self, events):
+        """Deliver events to the registered callbacks (lock not held)"""
+        for event in events:
+            for callback in self.callbacks:
+                callback(event)
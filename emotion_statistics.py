@@ -0,0 +1,207 @@
+"""
+Array-backed emotion statistics
+Counts, probability sums, per-class confidence histograms, per-second
+buckets for windowed rates and a short detection history, all held in numpy
+arrays. Writers update them in bulk once per frame; every update publishes a
+new immutable state, so readers take snapshots without locking and never
+observe a half-applied frame or a half-applied reset.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+class StatisticsSnapshot:
+    """Immutable view of the statistics at one point in time"""
+
+    def __init__(self, emotions, bins, window, history, bucket_seconds):
+        n = len(emotions)
+        self.emotions = emotions
+        self.bucket_seconds = bucket_seconds
+        self.started = time.time()
+        self.frames = 0                                     # Frames with at least one face
+        self.counts = np.zeros(n, dtype=np.int64)           # Detections per dominant emotion
+        self.confidence_sums = np.zeros(n)                  # Sum of confidences per dominant emotion
+        self.probability_sums = np.zeros(n)                 # Sum of full probability vectors
+        self.histograms = np.zeros((n, bins), dtype=np.int64)
+        # Ring of per-second buckets for rolling windows
+        self.bucket_ids = np.full(window, -1, dtype=np.int64)
+        self.bucket_counts = np.zeros((window, n), dtype=np.int64)
+        self.bucket_confidences = np.zeros((window, n))
+        self.bucket_frames = np.zeros(window, dtype=np.int64)
+        # Ring of the most recent detections
+        self.history_emotion = np.full(history, -1, dtype=np.int64)
+        self.history_confidence = np.zeros(history)
+        self.history_time = np.zeros(history)
+        self.history_next = 0
+
+    def copy(self):
+        """Copy for copy-on-write updates"""
+        clone = object.__new__(StatisticsSnapshot)
+        for name, value in self.__dict__.items():
+            setattr(clone, name, value.copy() if isinstance(value, np.ndarray) else value)
+        return clone
+
+    @property
+    def total(self):
+        """Total number of detections"""
+        return int(self.counts.sum())
+
+    def counts_dict(self):
+        """Detections per emotion"""
+        return {emotion: int(count) for emotion, count in zip(self.emotions, self.counts)}
+
+    def percentages(self):
+        """Share of detections per emotion in percent"""
+        total = self.total
+        return {emotion: (float(count) / total * 100 if total else 0.0)
+                for emotion, count in zip(self.emotions, self.counts)}
+
+    def mean_confidence(self):
+        """Mean confidence per dominant emotion since the last reset"""
+        means = np.divide(self.confidence_sums, self.counts, out=np.zeros(len(self.emotions)),
+                          where=self.counts > 0)
+        return dict(zip(self.emotions, means.tolist()))
+
+    def mean_probabilities(self):
+        """Mean probability of each emotion over all detections"""
+        total = self.total
+        means = self.probability_sums / total if total else np.zeros(len(self.emotions))
+        return dict(zip(self.emotions, means.tolist()))
+
+    def rolling(self, seconds=None, now=None):
+        """Counts, mean confidence and per-second rates over the last `seconds`"""
+        window = len(self.bucket_ids)
+        seconds = min(seconds or window * self.bucket_seconds, window * self.bucket_seconds)
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        live = (self.bucket_ids > current - seconds / self.bucket_seconds) & (self.bucket_ids >= 0)
+
+        counts = self.bucket_counts[live].sum(axis=0)
+        confidences = self.bucket_confidences[live].sum(axis=0)
+        frames = int(self.bucket_frames[live].sum())
+        means = np.divide(confidences, counts, out=np.zeros(len(self.emotions)), where=counts > 0)
+        return {
+            'seconds': seconds,
+            'counts': dict(zip(self.emotions, counts.tolist())),
+            'mean_confidence': dict(zip(self.emotions, means.tolist())),
+            'detections_per_second': float(counts.sum()) / seconds,
+            'frames_per_second': frames / seconds,
+            'rates': dict(zip(self.emotions, (counts / seconds).tolist()))
+        }
+
+    def confidence_histograms(self):
+        """Per-emotion histogram of confidences over equal-width bins in [0, 1]"""
+        return {emotion: row.tolist() for emotion, row in zip(self.emotions, self.histograms)}
+
+    def history(self, limit=None):
+        """Most recent detections, oldest first"""
+        size = len(self.history_emotion)
+        order = (np.arange(size) + self.history_next) % size
+        items = [{'emotion': self.emotions[self.history_emotion[i]],
+                  'confidence': float(self.history_confidence[i]),
+                  'timestamp': datetime.fromtimestamp(self.history_time[i]).isoformat()}
+                 for i in order if self.history_emotion[i] >= 0]
+        return items[-limit:] if limit else items
+
+    def latest(self):
+        """(emotion, confidence) of the most recent detection, or (None, None)"""
+        index = (self.history_next - 1) % len(self.history_emotion)
+        if self.history_emotion[index] < 0:
+            return None, None
+        return self.emotions[self.history_emotion[index]], float(self.history_confidence[index])
+
+    def as_dict(self, history=20, window=None):
+        """JSON-serializable summary"""
+        return {
+            'stats': self.counts_dict(),
+            'total': self.total,
+            'frames': self.frames,
+            'percentages': self.percentages(),
+            'mean_confidence': self.mean_confidence(),
+            'mean_probabilities': self.mean_probabilities(),
+            'rolling': self.rolling(window),
+            'confidence_histograms': self.confidence_histograms(),
+            'history': self.history(history)
+        }
+
+
+class EmotionStatistics:
+    """
+    Shared statistics engine for the web app, GUI and CLI
+
+    update() records all faces of one frame at once; snapshot() returns the
+    latest published StatisticsSnapshot without taking a lock. Writers are
+    serialized by a lock so concurrent streams and reset() cannot interleave.
+    """
+
+    def __init__(self, emotions, window_seconds=60, bucket_seconds=1, histogram_bins=10, history=100):
+        self.emotions = list(emotions)
+        self.index = {emotion: i for i, emotion in enumerate(self.emotions)}
+        self.bins = histogram_bins
+        self.window = max(1, int(window_seconds // bucket_seconds))
+        self.history_size = history
+        self.bucket_seconds = bucket_seconds
+        self.write_lock = threading.Lock()
+        self.state = self.empty()
+
+    def empty(self):
+        """A fresh, zeroed state"""
+        return StatisticsSnapshot(self.emotions, self.bins, self.window, self.history_size,
+                                  self.bucket_seconds)
+
+    def snapshot(self):
+        """Latest published statistics (never modified afterwards)"""
+        return self.state
+
+    def update(self, emotions, confidences, probabilities=None, now=None):
+        """
+        Record one frame of detections
+        emotions: emotion names or class indices; confidences: matching values;
+        probabilities: optional (N, classes) array of full predictions
+        """
+        if len(emotions) == 0:
+            return
+        now = time.time() if now is None else now
+        classes = np.fromiter((self.index[e] if isinstance(e, str) else int(e) for e in emotions),
+                              dtype=np.int64, count=len(emotions))
+        confidences = np.asarray(confidences, dtype=np.float64)
+        bins = np.minimum((confidences * self.bins).astype(np.int64), self.bins - 1)
+        bucket = int(now // self.bucket_seconds)
+
+        with self.write_lock:
+            state = self.state.copy()
+            state.frames += 1
+            np.add.at(state.counts, classes, 1)
+            np.add.at(state.confidence_sums, classes, confidences)
+            np.add.at(state.histograms, (classes, bins), 1)
+            if probabilities is not None:
+                state.probability_sums += np.asarray(probabilities, dtype=np.float64).reshape(
+                    len(classes), -1).sum(axis=0)
+            else:
+                np.add.at(state.probability_sums, classes, confidences)
+
+            slot = bucket % self.window
+            if state.bucket_ids[slot] != bucket:
+                state.bucket_ids[slot] = bucket
+                state.bucket_counts[slot] = 0
+                state.bucket_confidences[slot] = 0
+                state.bucket_frames[slot] = 0
+            np.add.at(state.bucket_counts[slot], classes, 1)
+            np.add.at(state.bucket_confidences[slot], classes, confidences)
+            state.bucket_frames[slot] += 1
+
+            positions = (state.history_next + np.arange(len(classes))) % self.history_size
+            state.history_emotion[positions] = classes
+            state.history_confidence[positions] = confidences
+            state.history_time[positions] = now
+            state.history_next = int((state.history_next + len(classes)) % self.history_size)
+
+            self.state = state
+
+    def reset(self):
+        """Start over from zero"""
+        with self.write_lock:
+            self.state = self.empty()
@@ -0,0 +1,248 @@
+"""
+Face-crop preprocessing cache for raw-photo datasets
+Runs face detection once per photo (in parallel worker processes) and stores
+aligned 48x48 grayscale crops with their source boxes in memory-mappable
+shards keyed by the SHA-1 of the file contents. Later runs only process new
+or modified files; unchanged files (same size and mtime, or same content
+hash) are never detected again.
+
+Cache layout:
+    cache_dir/index.json                 file -> content hash, hash -> shard position
+    cache_dir/crops-00000-images.npy     uint8 (N, 48, 48) crops
+    cache_dir/crops-00000-boxes.npy      int32 (N, 4) source boxes (x, y, w, h)
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from shard_dataset import ShardWriter
+
+CACHE_INDEX = 'index.json'
+CACHE_FORMAT = 1
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Per-process state of the detection workers
+_worker = {}
+
+
+def file_hash(path):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def align_face(gray, box, eye_cascade=None, margin=0.1, max_angle=20):
+    """
+    Crop a face to 48x48, rotated so the eyes are level when both eyes are found
+    The crop is a square around the box, enlarged by margin on each side
+    """
+    x, y, w, h = (int(v) for v in box)
+    cx, cy = x + w / 2, y + h / 2
+
+    angle = 0.0
+    if eye_cascade is not None:
+        upper = gray[y:y + h // 2, x:x + w]
+        eyes = eye_cascade.detectMultiScale(upper, scaleFactor=1.1, minNeighbors=5,
+                                            minSize=(max(w // 10, 5), max(w // 10, 5)))
+        if len(eyes) >= 2:
+            # The two largest detections, ordered left to right
+            eyes = sorted(sorted(eyes, key=lambda e: e[2] * e[3], reverse=True)[:2], key=lambda e: e[0])
+            (lx, ly, lw, lh), (rx, ry, rw, rh) = eyes
+            dy = (ry + rh / 2) - (ly + lh / 2)
+            dx = (rx + rw / 2) - (lx + lw / 2)
+            angle = float(np.degrees(np.arctan2(dy, dx)))
+            if abs(angle) > max_angle:
+                angle = 0.0
+
+    # Rotate about the face centre and map the enlarged square to 48x48 in one warp
+    side = max(w, h) * (1 + 2 * margin)
+    scale = 48.0 / side
+    matrix = cv2.getRotationMatrix2D((cx, cy), angle, scale)
+    matrix[0, 2] += 24 - cx
+    matrix[1, 2] += 24 - cy
+    return cv2.warpAffine(gray, matrix, (48, 48), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def _init_worker(face_detector, face_detector_options, align):
+    """Create one detector (and eye cascade) per worker process"""
+    from emotion_detector import EmotionDetector
+    _worker['detector'] = EmotionDetector(lazy=True, face_detector=face_detector,
+                                          face_detector_options=face_detector_options)
+    _worker['eyes'] = (cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+                       if align else None)
+
+
+def _process_file(path):
+    """Detect and crop all faces in one photo; returns (path, crops, boxes) or (path, None, None)"""
+    frame = cv2.imread(path)
+    if frame is None:
+        return path, None, None
+    faces, gray = _worker['detector'].detect_faces(frame)
+    crops = np.empty((len(faces), 48, 48), dtype=np.uint8)
+    for i, box in enumerate(faces):
+        crops[i] = align_face(gray, box, _worker['eyes'])
+    return path, crops, np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+
+class FaceCropCache:
+    """Detect-once cache of face crops for a directory of raw photos"""
+
+    def __init__(self, cache_dir, face_detector='haar', face_detector_options=None, align=True):
+        self.cache_dir = cache_dir
+        self.face_detector = face_detector
+        self.face_detector_options = face_detector_options
+        self.align = align
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.index_path = os.path.join(cache_dir, CACHE_INDEX)
+        self.files = {}     # path -> {'hash', 'size', 'mtime_ns'}
+        self.entries = {}   # hash -> {'shard', 'start', 'count'}
+        self.num_shards = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if index.get('format') == CACHE_FORMAT:
+                self.files = index['files']
+                self.entries = index['entries']
+                self.num_shards = index['shards']
+        self._shards = {}
+
+    def save_index(self):
+        """Atomically write the index"""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': CACHE_FORMAT, 'shards': self.num_shards,
+                       'files': self.files, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def lookup(self, path):
+        """Content hash of a file if its crops are cached, else None"""
+        stat = os.stat(path)
+        known = self.files.get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['hash'] if known['hash'] in self.entries else None
+
+        # Modified, moved or new: the content hash may still be cached (e.g. a copy)
+        digest = file_hash(path)
+        self.files[path] = {'hash': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        return digest if digest in self.entries else None
+
+    def write_shard(self, crops_list, boxes_list):
+        """Save buffered crops as the next shard"""
+        name = os.path.join(self.cache_dir, f'crops-{self.num_shards:05d}')
+        np.save(f'{name}-images.npy', np.concatenate(crops_list) if crops_list
+                else np.empty((0, 48, 48), dtype=np.uint8))
+        np.save(f'{name}-boxes.npy', np.concatenate(boxes_list) if boxes_list
+                else np.empty((0, 4), dtype=np.int32))
+        self.num_shards += 1
+
+    def update(self, paths, processes=None, chunk_size=16, shard_size=5000):
+        """
+        Detect faces in every path that is not cached yet and append the
+        crops as new shards of about shard_size crops; returns the number of
+        files processed
+        The index is saved after every shard, so an interrupted run keeps the
+        work already flushed and resumes with the remaining files
+        """
+        pending = [path for path in paths if self.lookup(path) is None]
+        if not pending:
+            self.save_index()
+            return 0
+
+        print(f"Detecting faces in {len(pending)} new or changed files "
+              f"({len(paths) - len(pending)} cached)")
+        crops_list, boxes_list = [], []
+        new_entries = {}
+        start = 0
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(self.face_detector, self.face_detector_options,
+                                           self.align)) as pool:
+            for path, crops, boxes in pool.map(_process_file, pending, chunksize=chunk_size):
+                digest = self.files[path]['hash']
+                if crops is None:
+                    print(f"Warning: could not read {path}")
+                    del self.files[path]
+                    continue
+                if digest not in self.entries and digest not in new_entries:
+                    new_entries[digest] = {'shard': self.num_shards, 'start': start, 'count': len(crops)}
+                    crops_list.append(crops)
+                    boxes_list.append(boxes)
+                    start += len(crops)
+
+                if start >= shard_size or len(new_entries) >= shard_size:
+                    # Entries become visible only once their shard is on disk
+                    self.write_shard(crops_list, boxes_list)
+                    self.entries.update(new_entries)
+                    self.save_index()
+                    crops_list, boxes_list, new_entries = [], [], {}
+                    start = 0
+
+        if new_entries:
+            self.write_shard(crops_list, boxes_list)
+            self.entries.update(new_entries)
+        self.save_index()
+        return len(pending)
+
+    def load_shard(self, shard):
+        """Memory-map one crop shard"""
+        if shard not in self._shards:
+            name = os.path.join(self.cache_dir, f'crops-{shard:05d}')
+            self._shards[shard] = (np.load(f'{name}-images.npy', mmap_mode='r'),
+                                   np.load(f'{name}-boxes.npy', mmap_mode='r'))
+        return self._shards[shard]
+
+    def get(self, path):
+        """(crops, boxes) cached for a file, or None if it has not been processed"""
+        known = self.files.get(path)
+        if not known or known['hash'] not in self.entries:
+            return None
+        entry = self.entries[known['hash']]
+        images, boxes = self.load_shard(entry['shard'])
+        end = entry['start'] + entry['count']
+        return images[entry['start']:end], boxes[entry['start']:end]
+
+    def labeled_crops(self, data_dir, emotions, all_faces=False, processes=None):
+        """
+        Yield (crop, label) for a data_dir/emotion_name/photo.jpg tree, running
+        detection only for files not in the cache
+        With all_faces=False only the largest face of each photo is used
+        """
+        labeled = []
+        for label, emotion in enumerate(emotions):
+            emotion_dir = os.path.join(data_dir, emotion.lower())
+            if not os.path.exists(emotion_dir):
+                print(f"Warning: Directory not found: {emotion_dir}")
+                continue
+            labeled.extend((os.path.join(emotion_dir, f), label)
+                           for f in sorted(os.listdir(emotion_dir)) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+        self.update([path for path, _ in labeled], processes)
+        for path, label in labeled:
+            cached = self.get(path)
+            if cached is None or len(cached[0]) == 0:
+                continue
+            crops, boxes = cached
+            if all_faces:
+                for crop in crops:
+                    yield crop, label
+            else:
+                yield crops[int(np.argmax(boxes[:, 2] * boxes[:, 3]))], label
+
+    def write_training_shards(self, data_dir, output_dir, emotions, all_faces=False,
+                              shard_size=10000, processes=None):
+        """Write the labeled crops as a training shard directory (see shard_dataset.py)"""
+        writer = ShardWriter(output_dir, shard_size, emotions)
+        for crop, label in self.labeled_crops(data_dir, emotions, all_faces, processes):
+            writer.add(crop, label)
+        writer.close()
+        return output_dir
@@ -0,0 +1,273 @@
+"""
+Face detector backends for EmotionDetector
+Haar and LBP cascades plus OpenCV DNN detectors (YuNet, res10 SSD) loaded
+from local model files. Every backend returns boxes as (x, y, w, h) rows.
+"""
+
+import os
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Default locations of model files that are not bundled with opencv-python
+MODELS_DIR = 'models'
+LBP_CASCADE_PATH = os.path.join(MODELS_DIR, 'lbpcascade_frontalface_improved.xml')
+YUNET_MODEL_PATH = os.path.join(MODELS_DIR, 'face_detection_yunet_2023mar.onnx')
+RES10_PROTOTXT_PATH = os.path.join(MODELS_DIR, 'deploy.prototxt')
+RES10_WEIGHTS_PATH = os.path.join(MODELS_DIR, 'res10_300x300_ssd_iter_140000.caffemodel')
+
+
+def to_boxes(boxes):
+    """Normalize detections to an int32 array of shape (N, 4)"""
+    if len(boxes) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    return np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+
+def clip_corners(corners, width, height):
+    """
+    Clip (x1, y1, x2, y2) corners to the image and return (x, y, w, h) boxes,
+    dropping boxes left with no area
+    """
+    corners = np.asarray(corners, dtype=np.float32).reshape(-1, 4)
+    x1 = np.clip(corners[:, 0], 0, width).astype(np.int32)
+    y1 = np.clip(corners[:, 1], 0, height).astype(np.int32)
+    x2 = np.clip(corners[:, 2], 0, width).astype(np.int32)
+    y2 = np.clip(corners[:, 3], 0, height).astype(np.int32)
+    keep = (x2 > x1) & (y2 > y1)
+    return to_boxes(np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)[keep])
+
+
+class FaceDetectorBackend:
+    """Base class for face detectors"""
+
+    name = 'base'
+
+    def detect(self, frame=None, gray=None):
+        """
+        Detect faces in a BGR frame and/or its grayscale version
+        Backends use whichever input they need; at least one must be given
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def ensure_gray(frame, gray):
+        """Return a grayscale image, converting the frame if needed"""
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return gray
+
+    @staticmethod
+    def ensure_bgr(frame, gray):
+        """Return a BGR image, converting the grayscale image if needed"""
+        if frame is None:
+            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        return frame
+
+
+class CascadeDetector(FaceDetectorBackend):
+    """Cascade classifier detector (Haar or LBP)"""
+
+    name = 'cascade'
+
+    def __init__(self, cascade_path, scale_factor=1.1, min_neighbors=5, min_size=(30, 30),
+                 max_size=None):
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(f"Cascade file not found: {cascade_path}")
+        self.cascade_path = cascade_path
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def detect(self, frame=None, gray=None):
+        gray = self.ensure_gray(frame, gray)
+        options = {}
+        if self.max_size:
+            options['maxSize'] = self.max_size
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors,
+                                              minSize=self.min_size, **options)
+        return to_boxes(faces)
+
+
+class HaarCascadeDetector(CascadeDetector):
+    """OpenCV's bundled Haar frontal face cascade (the original detector)"""
+
+    name = 'haar'
+
+    def __init__(self, cascade_path=None, **options):
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        super().__init__(cascade_path, **options)
+
+
+class LBPCascadeDetector(CascadeDetector):
+    """LBP frontal face cascade; faster than Haar, slightly less accurate"""
+
+    name = 'lbp'
+
+    def __init__(self, cascade_path=LBP_CASCADE_PATH, **options):
+        super().__init__(cascade_path, **options)
+
+
+class AdaptiveCascadeDetector(FaceDetectorBackend):
+    """
+    Cascade detector that learns the face-size distribution from recent
+    detections and scans only that size range, with periodic full sweeps
+
+    Suited to fixed-geometry installations (e.g. a kiosk camera) where faces
+    always appear at roughly the same distance.
+    """
+
+    name = 'adaptive'
+
+    def __init__(self, cascade, history=120, min_samples=15, margin=0.25,
+                 full_sweep_interval=30, narrow_scale_factor=1.05):
+        """
+        cascade: the CascadeDetector whose parameters define the full sweep
+        history: number of recent face sizes kept
+        min_samples: sizes needed before narrowing the search range
+        margin: fraction added below/above the observed size range
+        full_sweep_interval: frames between full-range sweeps
+        narrow_scale_factor: pyramid step used within the narrowed range.
+            Finer than the usual full-sweep step (1.1), so sizes near known
+            faces are sampled more densely. Scanning a narrow range leaves
+            time for that. Each step closer to 1 adds pyramid levels; None
+            uses the cascade's own scale factor
+        """
+        self.cascade = cascade
+        self.sizes = deque(maxlen=history)
+        self.min_samples = min_samples
+        self.margin = margin
+        self.full_sweep_interval = full_sweep_interval
+        self.narrow_scale_factor = narrow_scale_factor or cascade.scale_factor
+        if self.narrow_scale_factor <= 1:
+            raise ValueError("narrow_scale_factor must be greater than 1")
+        self.frames = 0
+        self.full_sweeps = 0
+        self.narrow_scans = 0
+
+    def size_range(self):
+        """Return (min_size, max_size) learned from history, or None"""
+        if len(self.sizes) < self.min_samples:
+            return None
+        low, high = np.percentile(self.sizes, [5, 95])
+        low = max(self.cascade.min_size[0], int(low * (1 - self.margin)))
+        high = int(high * (1 + self.margin))
+        return (low, low), (max(high, low + 1), max(high, low + 1))
+
+    def detect(self, frame=None, gray=None):
+        gray = self.ensure_gray(frame, gray)
+        self.frames += 1
+
+        size_range = self.size_range()
+        if size_range is None or self.frames % self.full_sweep_interval == 0:
+            faces = self.cascade.detect(gray=gray)
+            self.full_sweeps += 1
+        else:
+            min_size, max_size = size_range
+            faces = to_boxes(self.cascade.cascade.detectMultiScale(
+                gray, scaleFactor=self.narrow_scale_factor,
+                minNeighbors=self.cascade.min_neighbors,
+                minSize=min_size, maxSize=max_size))
+            self.narrow_scans += 1
+
+        self.sizes.extend(int(w) for (_, _, w, _) in faces)
+        return faces
+
+    def reset(self):
+        """Forget learned face sizes and go back to full-range scans"""
+        self.sizes.clear()
+        self.frames = 0
+
+
+class YuNetDetector(FaceDetectorBackend):
+    """OpenCV FaceDetectorYN (YuNet ONNX model)"""
+
+    name = 'yunet'
+
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=0.6, nms_threshold=0.3,
+                 top_k=5000):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found: {model_path}")
+        self.model_path = model_path
+        self.detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320),
+                                                  score_threshold, nms_threshold, top_k)
+        self.input_size = None
+
+    def detect(self, frame=None, gray=None):
+        frame = self.ensure_bgr(frame, gray)
+        size = (frame.shape[1], frame.shape[0])
+        if size != self.input_size:
+            self.detector.setInputSize(size)
+            self.input_size = size
+
+        _, faces = self.detector.detect(frame)
+        if faces is None:
+            return to_boxes([])
+        # YuNet reports faces extending past the frame edges; clip them like res10
+        x, y, w, h = faces[:, 0], faces[:, 1], faces[:, 2], faces[:, 3]
+        return clip_corners(np.stack([x, y, x + w, y + h], axis=1), size[0], size[1])
+
+
+class Res10SSDDetector(FaceDetectorBackend):
+    """OpenCV DNN res10 300x300 SSD face detector (Caffe model)"""
+
+    name = 'res10'
+
+    def __init__(self, prototxt_path=RES10_PROTOTXT_PATH, weights_path=RES10_WEIGHTS_PATH,
+                 confidence=0.5):
+        for path in (prototxt_path, weights_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"res10 model file not found: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, weights_path)
+        self.confidence = confidence
+
+    def detect(self, frame=None, gray=None):
+        frame = self.ensure_bgr(frame, gray)
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300),
+                                     (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        corners = detections[detections[:, 2] >= self.confidence][:, 3:7] * np.array([w, h, w, h])
+        return clip_corners(corners.astype(int), w, h)
+
+
+BACKENDS = {
+    'haar': HaarCascadeDetector,
+    'lbp': LBPCascadeDetector,
+    'yunet': YuNetDetector,
+    'res10': Res10SSDDetector,
+}
+
+
+def create_face_detector(backend='haar', adaptive=False, adaptive_options=None, processes=0,
+                         parallel_options=None, **options):
+    """
+    Create a face detector backend by name ('haar', 'lbp', 'yunet', 'res10')
+    With adaptive=True cascade backends are wrapped in AdaptiveCascadeDetector
+    With processes > 1 detection runs in worker processes (see parallel_detection)
+    """
+    if isinstance(backend, FaceDetectorBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown face detector '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
+    if processes and processes > 1:
+        from parallel_detection import ParallelFaceDetector
+        backend_options = dict(options, adaptive=adaptive, adaptive_options=adaptive_options)
+        parallel_options = dict(parallel_options or {})
+        parallel_options.setdefault('channels', 1 if issubclass(BACKENDS[backend], CascadeDetector) else 3)
+        return ParallelFaceDetector(backend, backend_options, processes=processes, **parallel_options)
+
+    detector = BACKENDS[backend](**options)
+    if adaptive:
+        if not isinstance(detector, CascadeDetector):
+            raise ValueError(f"Adaptive mode is only available for cascade detectors, not '{backend}'")
+        detector = AdaptiveCascadeDetector(detector, **(adaptive_options or {}))
+    return detector
@@ -0,0 +1,150 @@
+"""
+Face tracking with temporally smoothed emotion predictions
+Keeps per-face state across frames so labels don't flicker and unchanged
+faces can skip re-inference
+"""
+
+import itertools
+
+import cv2
+import numpy as np
+
+
+class TrackedFace:
+    """State kept for one face across frames"""
+
+    def __init__(self, face_id, box):
+        self.id = face_id
+        self.box = box
+        self.probabilities = None
+        self.last_crop = None
+        self.staleness = 0
+        self.missed = 0
+
+
+class EmotionTracker:
+    """
+    Match detections to tracked faces and smooth their emotion probabilities
+
+    A face whose 48x48 crop has barely changed since it was last scored reuses
+    its previous prediction, for at most max_staleness frames in a row.
+    """
+
+    def __init__(self, detector, smoothing=0.6, change_threshold=4.0, max_staleness=10,
+                 iou_threshold=0.3, max_missed=5, ids=None):
+        """
+        smoothing: weight of the previous probabilities in the moving average (0 = raw)
+        change_threshold: mean absolute pixel difference below which a crop counts as unchanged
+        max_staleness: frames a prediction may be reused before forcing inference
+        iou_threshold: minimum box overlap to match a detection to a track
+        max_missed: frames a track survives without a matching detection
+        ids: iterator of face ids, shared by trackers whose faces must not collide
+        """
+        self.detector = detector
+        self.smoothing = smoothing
+        self.change_threshold = change_threshold
+        self.max_staleness = max_staleness
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+
+        self.tracks = []
+        self.ids = ids if ids is not None else itertools.count(1)
+        self.inferences = 0
+        self.skipped = 0
+
+    @staticmethod
+    def iou(a, b):
+        """Intersection over union of two (x, y, w, h) boxes"""
+        ax, ay, aw, ah = a
+        bx, by, bw, bh = b
+        ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+        iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+        inter = ix * iy
+        union = aw * ah + bw * bh - inter
+        return inter / union if union > 0 else 0.0
+
+    def match(self, faces):
+        """Greedily assign each detection to the best overlapping track"""
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for f, box in enumerate(faces):
+                score = self.iou(track.box, box)
+                if score >= self.iou_threshold:
+                    pairs.append((score, t, f))
+        pairs.sort(reverse=True)
+
+        assigned = {}
+        used_tracks = set()
+        for score, t, f in pairs:
+            if t in used_tracks or f in assigned:
+                continue
+            assigned[f] = self.tracks[t]
+            used_tracks.add(t)
+        return assigned
+
+    def update(self, faces, gray):
+        """
+        Update tracks with this frame's detections
+        Returns a list of (track, emotion, probabilities) in detection order
+        """
+        faces = [tuple(int(v) for v in box) for box in faces]
+        assigned = self.match(faces)
+
+        matched = []
+        pending = []
+        for f, box in enumerate(faces):
+            track = assigned.get(f)
+            if track is None:
+                track = TrackedFace(next(self.ids), box)
+                self.tracks.append(track)
+            track.box = box
+            track.missed = 0
+
+            x, y, w, h = box
+            crop = cv2.resize(gray[y:y+h, x:x+w], (48, 48))
+
+            unchanged = (track.last_crop is not None
+                         and track.staleness < self.max_staleness
+                         and cv2.absdiff(crop, track.last_crop).mean() < self.change_threshold)
+            if unchanged:
+                track.staleness += 1
+                self.skipped += 1
+            else:
+                pending.append((track, crop))
+            matched.append(track)
+
+        # Score all changed faces in one batch
+        if pending:
+            results = self.detector.predict_emotions_batch([crop for _, crop in pending])
+            for (track, crop), (emotion, predictions) in zip(pending, results):
+                if emotion is None:
+                    continue
+                predictions = np.asarray(predictions, dtype='float32')
+                if track.probabilities is None:
+                    track.probabilities = predictions
+                else:
+                    track.probabilities = (self.smoothing * track.probabilities
+                                           + (1 - self.smoothing) * predictions)
+                track.last_crop = crop
+                track.staleness = 0
+                self.inferences += 1
+
+        # Age out tracks that were not seen this frame
+        seen = set(id(track) for track in matched)
+        for track in self.tracks:
+            if id(track) not in seen:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        output = []
+        for track in matched:
+            if track.probabilities is None:
+                output.append((track, None, []))
+            else:
+                emotion = self.detector.emotions[int(np.argmax(track.probabilities))]
+                output.append((track, emotion, track.probabilities))
+        return output
+
+    def reset(self):
+        """Forget all tracked faces"""
+        self.tracks = []
@@ -0,0 +1,278 @@
+"""
+Pipelined frame processing
+Runs face detection, batched emotion inference and render/encode as separate
+stages so consecutive frames overlap: while frame N is being drawn, frame N+1
+is in inference and frame N+2 in detection. Throughput approaches the speed
+of the slowest stage instead of the sum of all stages.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class FrameResult:
+    """Output of the pipeline for one frame"""
+
+    def __init__(self, seq, frame, faces, output, latency):
+        self.seq = seq
+        self.frame = frame
+        self.faces = faces          # list of (face_id, (x, y, w, h), emotion, predictions)
+        self.output = output        # return value of the render callback
+        self.latency = latency      # seconds from submit() to completion
+
+
+class FramePipeline:
+    """
+    Three-stage frame pipeline: detect -> infer -> render
+
+    Each stage runs in its own thread and stages are connected by FIFO queues,
+    so results come out in frame order. At most max_in_flight frames are inside
+    the pipeline at once, which bounds the added latency; submit() blocks (or
+    drops, with block=False) when the pipeline is full.
+
+    With threaded=False the same stages run inline in submit(), which gives the
+    original sequential behaviour through the same interface.
+
+    When the face detector can work on several frames at once (a frames-mode
+    ParallelFaceDetector, see its lookahead), the detect stage keeps that many
+    frames submitted and hands them on in order as they complete.
+    """
+
+    STAGES = ('detect', 'infer', 'render')
+
+    def __init__(self, detector, tracker=None, render=None, max_in_flight=3, threaded=True):
+        """
+        detector: EmotionDetector used for detection and inference
+        tracker: optional EmotionTracker for smoothed, per-face predictions
+        render: optional callback render(frame, faces) -> output (draw, encode, ...)
+        """
+        self.detector = detector
+        self.tracker = tracker
+        self.render = render
+        self.threaded = threaded
+        self.lookahead = getattr(getattr(detector, 'face_detector', None), 'lookahead', 1)
+        if threaded and self.lookahead > 1:
+            # Room for the frames in detection plus one each in inference and render
+            max_in_flight = max(max_in_flight, self.lookahead + 2)
+        self.max_in_flight = max_in_flight
+
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.detect_queue = queue.Queue()
+        self.infer_queue = queue.Queue()
+        self.render_queue = queue.Queue()
+        self.output_queue = queue.Queue()
+        self.threads = []
+        self.running = False
+        self.gray_buffers = []
+
+        self.next_seq = 0
+        self.dropped = 0
+        self.completed = 0
+        self.started_at = None
+        self.latencies = deque(maxlen=300)
+        self.stage_times = {stage: deque(maxlen=300) for stage in self.STAGES}
+
+    # Stages
+
+    def gray_buffer(self, seq, shape):
+        """
+        Preallocated grayscale buffer for a frame; a ring of max_in_flight + 1
+        buffers so a frame's buffer is never reused while it is in flight
+        """
+        if not self.gray_buffers or self.gray_buffers[0].shape != shape[:2]:
+            self.gray_buffers = [np.empty(shape[:2], dtype=np.uint8)
+                                 for _ in range(self.max_in_flight + 1)]
+        return self.gray_buffers[seq % len(self.gray_buffers)]
+
+    def run_detect(self, frame, seq=0):
+        """Detection stage"""
+        start = time.perf_counter()
+        faces, gray = self.detector.detect_faces(frame, gray=self.gray_buffer(seq, frame.shape))
+        self.stage_times['detect'].append(time.perf_counter() - start)
+        return faces, gray
+
+    def run_infer(self, faces, gray):
+        """Inference stage: one batched (or tracked) prediction for all faces"""
+        start = time.perf_counter()
+        results = []
+        if self.tracker is not None:
+            for track, emotion, predictions in self.tracker.update(faces, gray):
+                if emotion is not None:
+                    results.append((track.id, tuple(track.box), emotion, predictions))
+        else:
+            rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+            for i, ((x, y, w, h), (emotion, predictions)) in enumerate(
+                    zip(faces, self.detector.predict_emotions_batch(rois))):
+                if emotion is not None:
+                    results.append((i, (int(x), int(y), int(w), int(h)), emotion, predictions))
+        self.stage_times['infer'].append(time.perf_counter() - start)
+        return results
+
+    def run_render(self, frame, faces):
+        """Render stage: the caller's drawing/encoding callback"""
+        start = time.perf_counter()
+        output = self.render(frame, faces) if self.render else None
+        self.stage_times['render'].append(time.perf_counter() - start)
+        return output
+
+    def finish(self, seq, submitted, frame, faces, output):
+        """Record timing and publish a completed frame"""
+        latency = time.perf_counter() - submitted
+        self.latencies.append(latency)
+        self.completed += 1
+        self.output_queue.put(FrameResult(seq, frame, faces, output, latency))
+
+    # Stage threads
+
+    def detect_worker(self):
+        """Thread running the detection stage"""
+        if self.lookahead > 1:
+            return self.overlapped_detect_worker()
+        while True:
+            item = self.detect_queue.get()
+            if item is None:
+                self.infer_queue.put(None)
+                break
+            seq, submitted, frame = item
+            faces, gray = self.run_detect(frame, seq)
+            self.infer_queue.put((seq, submitted, frame, faces, gray))
+
+    def overlapped_detect_worker(self):
+        """Detection stage keeping up to lookahead frames submitted to the face detector"""
+        face_detector = self.detector.face_detector
+        in_flight = deque()
+
+        def hand_on():
+            seq, submitted, frame, gray, ticket, start = in_flight.popleft()
+            faces = face_detector.collect(ticket)
+            self.stage_times['detect'].append(time.perf_counter() - start)
+            self.infer_queue.put((seq, submitted, frame, faces, gray))
+
+        while True:
+            # Pass completed frames on in order without blocking on later ones
+            while in_flight and face_detector.ready(in_flight[0][4]):
+                hand_on()
+            if len(in_flight) >= self.lookahead:
+                hand_on()
+                continue
+            try:
+                # Poll while frames are in detection so finished ones are not held back
+                item = self.detect_queue.get(timeout=0.002 if in_flight else None)
+            except queue.Empty:
+                continue
+            if item is None:
+                while in_flight:
+                    hand_on()
+                self.infer_queue.put(None)
+                break
+            seq, submitted, frame = item
+            start = time.perf_counter()
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray_buffer(seq, frame.shape))
+            in_flight.append((seq, submitted, frame, gray, face_detector.submit(frame=frame, gray=gray), start))
+
+    def infer_worker(self):
+        """Thread running the inference stage"""
+        while True:
+            item = self.infer_queue.get()
+            if item is None:
+                self.render_queue.put(None)
+                break
+            seq, submitted, frame, faces, gray = item
+            self.render_queue.put((seq, submitted, frame, self.run_infer(faces, gray)))
+
+    def render_worker(self):
+        """Thread running the render stage"""
+        while True:
+            item = self.render_queue.get()
+            if item is None:
+                break
+            seq, submitted, frame, faces = item
+            output = self.run_render(frame, faces)
+            self.finish(seq, submitted, frame, faces, output)
+            self.slots.release()
+
+    # Public interface
+
+    def start(self):
+        """Start the stage threads"""
+        self.running = True
+        self.started_at = time.perf_counter()
+        if self.threaded:
+            for target in (self.detect_worker, self.infer_worker, self.render_worker):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        return self
+
+    def stop(self):
+        """Flush remaining frames through the pipeline and stop the threads"""
+        if self.threaded and self.running:
+            self.detect_queue.put(None)
+            for thread in self.threads:
+                thread.join()
+            self.threads = []
+        self.running = False
+        self.gray_buffers = []
+
+    def submit(self, frame, block=True):
+        """
+        Feed a frame into the pipeline
+        Returns False if the frame was dropped because the pipeline is full
+        """
+        if not self.slots.acquire(blocking=block):
+            self.dropped += 1
+            return False
+
+        seq = self.next_seq
+        self.next_seq += 1
+        submitted = time.perf_counter()
+
+        if self.threaded:
+            self.detect_queue.put((seq, submitted, frame))
+        else:
+            faces, gray = self.run_detect(frame, seq)
+            faces = self.run_infer(faces, gray)
+            self.finish(seq, submitted, frame, faces, self.run_render(frame, faces))
+            self.slots.release()
+        return True
+
+    def get(self, timeout=None):
+        """Return the next completed FrameResult in frame order, or None on timeout"""
+        try:
+            return self.output_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        """Return all results that are already complete"""
+        results = []
+        while True:
+            try:
+                results.append(self.output_queue.get_nowait())
+            except queue.Empty:
+                return results
+
+    def stats(self):
+        """Throughput, end-to-end latency and per-stage timings in milliseconds"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+
+        def summary(values):
+            if not values:
+                return {'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+            values = np.asarray(values) * 1000
+            return {'mean_ms': float(values.mean()),
+                    'p95_ms': float(np.percentile(values, 95)),
+                    'max_ms': float(values.max())}
+
+        return {
+            'frames': self.completed,
+            'dropped': self.dropped,
+            'fps': self.completed / elapsed if elapsed > 0 else 0.0,
+            'latency': summary(self.latencies),
+            'stages': {stage: summary(times) for stage, times in self.stage_times.items()}
+        }
@@ -0,0 +1,269 @@
+"""
+Parallel hyperparameter sweep
+Trains many configurations concurrently from a sharded dataset (see
+shard_dataset.py), one trial per worker process with a fixed CPU thread
+budget. Trials report validation metrics after every epoch to a SQLite
+results table; a trial whose best validation accuracy falls below the median
+of the other trials at the same epoch is stopped early (median stopping rule).
+
+    python hyperparameter_sweep.py shards --trials 24 --parallel 4
+    python hyperparameter_sweep.py shards --space space.json --grid
+    python hyperparameter_sweep.py --results sweep.db --top 10
+
+Search space JSON: a list of candidate values per parameter, e.g.
+    {"learning_rate": [0.001, 0.0003], "batch_size": [32, 64],
+     "architecture": ["standard", "small"], "augmentation": [0.0, 1.0]}
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from shard_dataset import ShardedDataset
+
+DEFAULT_SPACE = {
+    'learning_rate': [1e-3, 5e-4, 2e-4, 1e-4],
+    'batch_size': [32, 64, 128],
+    'architecture': ['standard', 'small', 'wide'],
+    'augmentation': [0.0, 0.5, 1.0, 1.5],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    sweep_id INTEGER,
+    learning_rate REAL,
+    batch_size INTEGER,
+    architecture TEXT,
+    augmentation REAL,
+    status TEXT,
+    epochs INTEGER DEFAULT 0,
+    best_val_accuracy REAL,
+    best_val_loss REAL,
+    seconds REAL,
+    model_path TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS epochs (
+    trial_id INTEGER,
+    epoch INTEGER,
+    loss REAL,
+    accuracy REAL,
+    val_loss REAL,
+    val_accuracy REAL,
+    PRIMARY KEY (trial_id, epoch)
+);
+"""
+
+
+def connect(db_path):
+    """Open the results database (safe to use from several processes)"""
+    db = sqlite3.connect(db_path, timeout=60)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(SCHEMA)
+    columns = [row[1] for row in db.execute("PRAGMA table_info(trials)")]
+    if 'sweep_id' not in columns:
+        # Databases written before sweeps were numbered: treat their trials as sweep 0
+        with db:
+            db.execute("ALTER TABLE trials ADD COLUMN sweep_id INTEGER DEFAULT 0")
+    return db
+
+
+def sample_configs(space, trials=None, grid=False, seed=42):
+    """Configurations to run: the full grid, or `trials` random draws without repeats"""
+    names = sorted(space)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if grid or trials is None or trials >= len(configs):
+        return configs
+    return random.Random(seed).sample(configs, trials)
+
+
+def should_stop(db, trial_id, epoch, min_trials=3, grace_epochs=1):
+    """
+    Median stopping rule: stop if this trial's best val_accuracy so far is
+    below the median of other trials' best val_accuracy up to the same epoch
+    Only trials of the same sweep are compared, so earlier sweeps stored in a
+    reused results database do not move the median.
+    """
+    if epoch < grace_epochs:
+        return False
+    rows = db.execute(
+        "SELECT e.trial_id, MAX(e.val_accuracy) FROM epochs e JOIN trials t ON t.id = e.trial_id "
+        "WHERE e.epoch <= ? AND t.sweep_id = (SELECT sweep_id FROM trials WHERE id = ?) "
+        "GROUP BY e.trial_id",
+        (epoch, trial_id)).fetchall()
+    own = [best for tid, best in rows if tid == trial_id]
+    others = [best for tid, best in rows if tid != trial_id]
+    if not own or len(others) < min_trials:
+        return False
+    return own[0] < float(np.median(others))
+
+
+def run_trial(db_path, trial_id, config, shard_dir, epochs, threads, output_dir,
+              steps_per_epoch=None, min_trials=3):
+    """Train one configuration in this (worker) process and record its results"""
+    # Thread limits must be set before TensorFlow initializes its runtime
+    for var in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from tensorflow.keras.utils import to_categorical
+    from train_model import EmotionModelTrainer
+
+    db = connect(db_path)
+    start = time.perf_counter()
+    status = 'completed'
+    best_accuracy, best_loss = 0.0, None
+    model_path = os.path.join(output_dir, f'trial-{trial_id:04d}.h5')
+    epoch = -1
+    try:
+        trainer = EmotionModelTrainer(variant=config['architecture'],
+                                      learning_rate=config['learning_rate'])
+        datagen = trainer.create_augmentation(config['augmentation']) if config['augmentation'] > 0 else None
+        train_data = ShardedDataset(os.path.join(shard_dir, 'train'))
+        val_data = ShardedDataset(os.path.join(shard_dir, 'val'))
+        batch_size = config['batch_size']
+
+        for epoch in range(epochs):
+            losses, accuracies, counts = [], [], []
+            for step, (X_batch, labels) in enumerate(train_data.batches(batch_size, epoch, seed=trial_id)):
+                if steps_per_epoch and step >= steps_per_epoch:
+                    break
+                X_batch = X_batch.astype('float32')
+                if datagen is not None:
+                    for i in range(len(X_batch)):
+                        X_batch[i] = datagen.random_transform(X_batch[i])
+                loss, accuracy = trainer.model.train_on_batch(
+                    X_batch, to_categorical(labels, num_classes=len(trainer.emotions)))[:2]
+                losses.append(float(loss))
+                accuracies.append(float(accuracy))
+                counts.append(len(labels))
+
+            val_loss, val_accuracy = trainer.evaluate_loss_accuracy(val_data)
+            with db:
+                db.execute("INSERT OR REPLACE INTO epochs VALUES (?, ?, ?, ?, ?, ?)",
+                           (trial_id, epoch, float(np.average(losses, weights=counts)),
+                            float(np.average(accuracies, weights=counts)), val_loss, val_accuracy))
+                db.execute("UPDATE trials SET epochs = ? WHERE id = ?", (epoch + 1, trial_id))
+
+            if val_accuracy > best_accuracy:
+                best_accuracy = val_accuracy
+                trainer.model.save(model_path)
+            if best_loss is None or val_loss < best_loss:
+                best_loss = val_loss
+
+            if should_stop(db, trial_id, epoch, min_trials):
+                status = 'pruned'
+                break
+        error = None
+    except Exception as e:
+        status, error = 'failed', repr(e)
+
+    with db:
+        db.execute("UPDATE trials SET status = ?, epochs = ?, best_val_accuracy = ?, best_val_loss = ?, "
+                   "seconds = ?, model_path = ?, error = ? WHERE id = ?",
+                   (status, epoch + 1, best_accuracy, best_loss, time.perf_counter() - start,
+                    model_path if os.path.exists(model_path) else None, error, trial_id))
+    db.close()
+    return trial_id, status, best_accuracy
+
+
+def run_sweep(shard_dir, configs, db_path='sweep.db', parallel=None, threads=None, epochs=20,
+              output_dir='sweep_models', steps_per_epoch=None, min_trials=3):
+    """Run all configurations in a process pool and return the database path"""
+    parallel = parallel or max(1, (os.cpu_count() or 1) // 4)
+    threads = threads or max(1, (os.cpu_count() or 1) // parallel)
+    os.makedirs(output_dir, exist_ok=True)
+
+    db = connect(db_path)
+    trial_ids = []
+    with db:
+        sweep_id = db.execute("SELECT COALESCE(MAX(sweep_id), 0) + 1 FROM trials").fetchone()[0]
+        for config in configs:
+            cursor = db.execute(
+                "INSERT INTO trials (sweep_id, learning_rate, batch_size, architecture, augmentation, "
+                "status) VALUES (?, ?, ?, ?, ?, 'queued')",
+                (sweep_id, config['learning_rate'], config['batch_size'], config['architecture'],
+                 config['augmentation']))
+            trial_ids.append(cursor.lastrowid)
+    db.close()
+
+    print(f"Sweep {sweep_id}: running {len(configs)} trials, {parallel} at a time, {threads} threads each")
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=mp.get_context('spawn')) as pool:
+        futures = [pool.submit(run_trial, db_path, trial_id, config, shard_dir, epochs, threads,
+                               output_dir, steps_per_epoch, min_trials)
+                   for trial_id, config in zip(trial_ids, configs)]
+        for future in as_completed(futures):
+            trial_id, status, accuracy = future.result()
+            print(f"Trial {trial_id}: {status}, best val_accuracy {accuracy:.4f}")
+    return db_path
+
+
+def print_top(db_path, top=10):
+    """Print the best trials from a results database"""
+    db = connect(db_path)
+    rows = db.execute(
+        "SELECT id, learning_rate, batch_size, architecture, augmentation, status, epochs, "
+        "best_val_accuracy, best_val_loss, seconds FROM trials "
+        "WHERE best_val_accuracy IS NOT NULL ORDER BY best_val_accuracy DESC LIMIT ?",
+        (top,)).fetchall()
+    db.close()
+
+    print(f"{'Trial':>5} {'LR':>9} {'Batch':>6} {'Arch':>9} {'Aug':>5} {'Status':>10} "
+          f"{'Epochs':>6} {'Val acc':>8} {'Val loss':>9} {'Time (s)':>9}")
+    for row in rows:
+        trial_id, lr, batch, arch, aug, status, epochs, acc, loss, seconds = row
+        print(f"{trial_id:>5} {lr:>9.2e} {batch:>6} {arch:>9} {aug:>5.2f} {status:>10} "
+              f"{epochs:>6} {acc:>8.4f} {loss if loss is not None else float('nan'):>9.4f} "
+              f"{seconds or 0:>9.0f}")
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Parallel hyperparameter sweep for the emotion model')
+    parser.add_argument('shard_dir', nargs='?', help='Directory with train/ and val/ shard directories')
+    parser.add_argument('--space', help='JSON file with the search space (default: built-in space)')
+    parser.add_argument('--trials', type=int, default=16, help='Random configurations to try')
+    parser.add_argument('--grid', action='store_true', help='Run every combination in the space')
+    parser.add_argument('--epochs', type=int, default=20, help='Maximum epochs per trial')
+    parser.add_argument('--steps-per-epoch', type=int, help='Limit training batches per epoch')
+    parser.add_argument('--parallel', type=int, help='Concurrent trials (default: CPU count / 4)')
+    parser.add_argument('--threads', type=int, help='CPU threads per trial (default: CPU count / parallel)')
+    parser.add_argument('--min-trials', type=int, default=3,
+                        help='Other trials needed at an epoch before pruning')
+    parser.add_argument('--results', default='sweep.db', help='SQLite results database')
+    parser.add_argument('--output-dir', default='sweep_models', help='Best model of each trial')
+    parser.add_argument('--top', type=int, default=10, help='Trials to list at the end')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.shard_dir:
+        space = DEFAULT_SPACE
+        if args.space:
+            with open(args.space) as f:
+                space = dict(DEFAULT_SPACE, **json.load(f))
+        configs = sample_configs(space, args.trials, args.grid, args.seed)
+        run_sweep(args.shard_dir, configs, args.results, args.parallel, args.threads, args.epochs,
+                  args.output_dir, args.steps_per_epoch, args.min_trials)
+    elif not os.path.exists(args.results):
+        parser.error('shard_dir is required unless --results points to an existing sweep')
+
+    print_top(args.results, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
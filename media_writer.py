@@ -0,0 +1,244 @@
+"""
+Background writer for snapshots and annotated video recordings
+Frames are copied into a bounded queue and written by one worker thread, so
+PNG encoding, video encoding and slow disks never block the capture loop.
+Recordings are split into segments of fixed duration. When the queue fills
+up, frames are dropped (or the recording rate is reduced) according to the
+overload policy instead of stalling the caller.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# Overload policies for recorded frames
+DROP_NEWEST = 'drop_newest'   # Reject incoming frames while the queue is full
+DROP_OLDEST = 'drop_oldest'   # Discard the oldest queued frame to make room
+DEGRADE = 'degrade'           # Record every Nth frame while the writer lags, then drop newest
+POLICIES = (DROP_NEWEST, DROP_OLDEST, DEGRADE)
+
+
+class MediaWriter:
+    """
+    Non-blocking snapshot and video writer
+
+        writer = MediaWriter('recordings')
+        writer.snapshot(frame)            # PNG, written in the background
+        writer.start_recording(fps=30)
+        writer.record(frame)              # every frame; never blocks
+        writer.stop_recording()
+        writer.close()
+
+    Snapshots have their own small queue and are never dropped to make room
+    for recorded frames.
+    """
+
+    def __init__(self, output_dir='.', max_queue=64, policy=DROP_OLDEST, segment_seconds=300,
+                 fourcc='mp4v', extension='.mp4', max_snapshots=8, max_stride=8):
+        """
+        max_queue: recorded frames buffered before the overload policy applies
+        segment_seconds: duration of each recording file before a new one is started
+        max_stride: in degrade mode, the largest frame decimation applied
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overload policy '{policy}'. Choose from: {', '.join(POLICIES)}")
+        self.output_dir = output_dir
+        self.max_queue = max_queue
+        self.policy = policy
+        self.segment_seconds = segment_seconds
+        self.fourcc = fourcc
+        self.extension = extension
+        self.max_snapshots = max_snapshots
+        self.max_stride = max_stride
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.condition = threading.Condition()
+        self.frames = deque()
+        self.snapshots = deque()
+        self.running = True
+        self.recording = False
+        self.fps = 30.0
+        self.stride = 1
+        self.offered = 0
+
+        # Writer-thread state
+        self.video = None
+        self.segment_path = None
+        self.segment_started = None
+        self.segment_size = None
+
+        self.written = 0
+        self.dropped = 0
+        self.snapshots_written = 0
+        self.snapshots_rejected = 0
+        self.segments = []
+        self.errors = 0
+        self.write_times = deque(maxlen=300)
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Caller side
+
+    def snapshot(self, frame, path=None):
+        """
+        Queue a PNG snapshot of frame and return its path, or None if the
+        snapshot queue is full
+        """
+        if path is None:
+            path = os.path.join(self.output_dir,
+                                f"emotion_screenshot_{datetime.now():%Y%m%d_%H%M%S_%f}.png")
+        with self.condition:
+            if len(self.snapshots) >= self.max_snapshots:
+                self.snapshots_rejected += 1
+                return None
+            self.snapshots.append((path, frame.copy()))
+            self.condition.notify()
+        return path
+
+    def start_recording(self, fps=30.0):
+        """Start recording frames passed to record() into rotating segments"""
+        with self.condition:
+            self.fps = float(fps)
+            self.recording = True
+            self.stride = 1
+
+    def stop_recording(self):
+        """Stop recording; frames already queued are still written"""
+        with self.condition:
+            self.recording = False
+            self.frames.append(None)  # Closes the current segment after the queued frames
+            self.condition.notify()
+
+    def record(self, frame):
+        """
+        Queue a frame for the current recording without blocking
+        Returns False if the frame was dropped
+        """
+        with self.condition:
+            if not self.recording:
+                return False
+            self.offered += 1
+
+            if self.policy == DEGRADE:
+                # Raise the stride while the queue is over half full, relax it when it drains
+                if len(self.frames) > self.max_queue // 2:
+                    self.stride = min(self.stride * 2, self.max_stride)
+                elif not self.frames:
+                    self.stride = 1
+                if self.offered % self.stride:
+                    self.dropped += 1
+                    return False
+
+            if len(self.frames) >= self.max_queue:
+                if self.policy == DROP_OLDEST:
+                    # Oldest frame, keeping any end-of-recording marker in place
+                    for i, item in enumerate(self.frames):
+                        if item is not None:
+                            del self.frames[i]
+                            break
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return False
+
+            self.frames.append((time.time(), frame.copy()))
+            self.condition.notify()
+        return True
+
+    def close(self, timeout=10):
+        """Write everything still queued, close the recording and stop the thread"""
+        with self.condition:
+            if self.recording:
+                self.recording = False
+                self.frames.append(None)
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=timeout)
+
+    # Writer thread
+
+    def run(self):
+        """Writer thread: snapshots first, then recorded frames"""
+        while True:
+            with self.condition:
+                while self.running and not self.snapshots and not self.frames:
+                    self.condition.wait()
+                if self.snapshots:
+                    job = ('snapshot', self.snapshots.popleft())
+                elif self.frames:
+                    job = ('frame', self.frames.popleft())
+                else:
+                    break
+
+            start = time.perf_counter()
+            try:
+                if job[0] == 'snapshot':
+                    path, frame = job[1]
+                    if not cv2.imwrite(path, frame):
+                        raise IOError(f"Could not write {path}")
+                    self.snapshots_written += 1
+                elif job[1] is None:
+                    self.close_segment()
+                else:
+                    self.write_frame(*job[1])
+            except Exception as e:
+                self.errors += 1
+                print(f"Media writer error: {e}")
+            with self.condition:
+                self.write_times.append(time.perf_counter() - start)
+
+        self.close_segment()
+
+    def write_frame(self, timestamp, frame):
+        """Append a frame to the current segment, rotating segments as needed"""
+        size = (frame.shape[1], frame.shape[0])
+        if (self.video is None or size != self.segment_size
+                or timestamp - self.segment_started >= self.segment_seconds):
+            self.open_segment(timestamp, size)
+        self.video.write(frame)
+        self.written += 1
+
+    def open_segment(self, timestamp, size):
+        """Close the current segment and start a new file"""
+        self.close_segment()
+        name = f"emotion_recording_{datetime.fromtimestamp(timestamp):%Y%m%d_%H%M%S}_{len(self.segments):03d}"
+        path = os.path.join(self.output_dir, name + self.extension)
+        video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, size)
+        if not video.isOpened():
+            raise IOError(f"Could not open video writer for {path}")
+        self.video = video
+        self.segment_path = path
+        self.segment_started = timestamp
+        self.segment_size = size
+        self.segments.append(path)
+
+    def close_segment(self):
+        """Finish the current segment file"""
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+    def stats(self):
+        """Queue depth, written/dropped counts and write times in milliseconds"""
+        with self.condition:
+            queued = len(self.frames)
+            stride = self.stride
+            times = np.asarray(list(self.write_times) or [0.0]) * 1000
+        return {
+            'recording': self.recording,
+            'queued': queued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'stride': stride,
+            'snapshots': self.snapshots_written,
+            'snapshots_rejected': self.snapshots_rejected,
+            'segments': list(self.segments),
+            'errors': self.errors,
+            'write_ms': {'mean': float(times.mean()), 'max': float(times.max())}
+        }
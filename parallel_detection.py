@@ -0,0 +1,281 @@
+"""
+Multi-core face detection over shared-memory frames
+Frames are copied once into a multiprocessing.shared_memory ring buffer and
+worker processes run the detector on whole frames or on overlapping tiles.
+Only slot indices and box coordinates cross process boundaries; pixel
+arrays are never pickled.
+"""
+
+import math
+import multiprocessing as mp
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from face_detectors import FaceDetectorBackend, create_face_detector, to_boxes
+
+
+def _detection_worker(shm_name, ring_shape, backend, options, tasks, results):
+    """Worker process: detect faces in regions of frames stored in the ring"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=shm.buf)
+    detector = create_face_detector(backend, **options)
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, slot, (y0, y1, x0, x1) = task
+            region = ring[slot, y0:y1, x0:x1]
+            if region.ndim == 3:
+                faces = detector.detect(frame=region)
+            else:
+                faces = detector.detect(gray=region)
+            faces = to_boxes(faces)
+            faces[:, 0] += x0
+            faces[:, 1] += y0
+            results.put((task_id, faces.tolist()))
+    finally:
+        del ring
+        shm.close()
+
+
+def merge_boxes(boxes, overlap_threshold=0.5):
+    """
+    Merge duplicate detections from overlapping tiles
+    A box is dropped if most of it lies inside an already kept (larger) box
+    """
+    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+    kept = []
+    for x, y, w, h in boxes:
+        duplicate = False
+        for kx, ky, kw, kh in kept:
+            ix = max(0, min(x + w, kx + kw) - max(x, kx))
+            iy = max(0, min(y + h, ky + kh) - max(y, ky))
+            if ix * iy >= overlap_threshold * w * h:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((x, y, w, h))
+    return to_boxes(kept)
+
+
+class ParallelFaceDetector(FaceDetectorBackend):
+    """
+    Run a face detector backend across several worker processes
+
+    mode='tiles': every frame is split into overlapping tiles detected in
+        parallel and merged (lower latency per frame, best for high resolutions)
+    mode='frames': whole frames are spread over workers with submit()/collect()
+        (higher throughput across consecutive frames or several streams)
+
+    The lock is released while waiting for workers, so concurrent detect()
+    calls overlap; FramePipeline keeps `lookahead` frames in detection at once.
+    """
+
+    name = 'parallel'
+
+    def __init__(self, backend='haar', backend_options=None, processes=None, mode='tiles',
+                 tile_overlap=96, slots=None, channels=1):
+        """
+        processes: worker count (default: CPU count)
+        tile_overlap: pixels shared by neighbouring tiles; should exceed the
+            largest expected face so every face fits wholly in some tile
+        slots: frames the ring buffer can hold (default: 2 x processes)
+        channels: 1 to share grayscale frames (cascades), 3 for BGR (DNN backends)
+        """
+        if mode not in ('tiles', 'frames'):
+            raise ValueError(f"Unknown parallel mode '{mode}'")
+        self.backend = backend
+        self.backend_options = backend_options or {}
+        self.processes = processes or mp.cpu_count()
+        self.mode = mode
+        self.tile_overlap = tile_overlap
+        self.slots = slots or 2 * self.processes
+        self.channels = channels
+
+        self.shm = None
+        self.ring = None
+        self.workers = []
+        self.tasks = None
+        self.results = None
+        # Guards the ring and task tables; released while blocked on the result queue
+        self.lock = threading.Condition()
+        self.receiving = False
+        self.next_slot = 0
+        self.next_task = 0
+        self.slot_pending = [0] * self.slots
+        self.task_slots = {}
+        self.task_results = {}
+        self.tickets = {}
+
+    def start(self, frame_shape):
+        """Allocate the ring buffer for frames of this size and start the workers"""
+        height, width = frame_shape[:2]
+        ring_shape = (self.slots, height, width) + ((self.channels,) if self.channels > 1 else ())
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(ring_shape)))
+        self.ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=self.shm.buf)
+
+        ctx = mp.get_context('spawn')
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        for _ in range(self.processes):
+            worker = ctx.Process(target=_detection_worker,
+                                 args=(self.shm.name, ring_shape, self.backend,
+                                       self.backend_options, self.tasks, self.results),
+                                 daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def close(self):
+        """Stop the workers and release the shared memory"""
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        if self.shm is not None:
+            self.ring = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    @property
+    def lookahead(self):
+        """Frames worth submitting before collecting the oldest one"""
+        return self.processes if self.mode == 'frames' else 1
+
+    def tiles(self, height, width):
+        """Overlapping (y0, y1, x0, x1) regions, one per worker"""
+        cols = math.ceil(math.sqrt(self.processes))
+        rows = math.ceil(self.processes / cols)
+        tile_h = math.ceil(height / rows)
+        tile_w = math.ceil(width / cols)
+        half = self.tile_overlap // 2
+
+        regions = []
+        for r in range(rows):
+            for c in range(cols):
+                y0, x0 = max(0, r * tile_h - half), max(0, c * tile_w - half)
+                y1, x1 = min(height, (r + 1) * tile_h + half), min(width, (c + 1) * tile_w + half)
+                if y1 > y0 and x1 > x0:
+                    regions.append((y0, y1, x0, x1))
+        return regions
+
+    def write_frame(self, image):
+        """Copy a frame into the next free ring slot and return the slot index"""
+        if self.shm is None:
+            self.start(image.shape)
+        if image.shape != self.ring.shape[1:]:
+            raise ValueError(f"Frame shape {image.shape} does not match ring {self.ring.shape[1:]}")
+
+        # Wait for the slot's previous frame to be fully processed, then reserve
+        # it until its tasks are queued (release_slot)
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.slots
+        while self.slot_pending[slot] > 0:
+            self.receive()
+        self.slot_pending[slot] += 1
+
+        np.copyto(self.ring[slot], image)
+        return slot
+
+    def release_slot(self, slot):
+        """Drop the reservation taken by write_frame()"""
+        self.slot_pending[slot] -= 1
+
+    def queue_task(self, slot, region):
+        """Queue detection of one region of a ring slot and return the task id"""
+        task_id = self.next_task
+        self.next_task += 1
+        self.slot_pending[slot] += 1
+        self.task_slots[task_id] = slot
+        self.tasks.put((task_id, slot, region))
+        return task_id
+
+    def receive(self, timeout=None):
+        """
+        Wait for worker results (lock held); returns False on timeout
+        One thread at a time reads the result queue with the lock released;
+        the others wait until it has recorded a result
+        """
+        if self.receiving:
+            self.lock.wait(timeout)
+            return True
+
+        self.receiving = True
+        self.lock.release()
+        try:
+            task_id, faces = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        finally:
+            self.lock.acquire()
+            self.receiving = False
+            self.lock.notify_all()
+        self.task_results[task_id] = faces
+        self.slot_pending[self.task_slots.pop(task_id)] -= 1
+        return True
+
+    def wait(self, task_ids):
+        """Wait for a set of tasks and return their boxes combined"""
+        while any(task_id not in self.task_results for task_id in task_ids):
+            self.receive()
+        boxes = []
+        for task_id in task_ids:
+            boxes.extend(self.task_results.pop(task_id))
+        return boxes
+
+    def select_input(self, frame, gray):
+        """The image the workers operate on, given the configured channel count"""
+        if self.channels > 1:
+            return self.ensure_bgr(frame, gray)
+        return self.ensure_gray(frame, gray)
+
+    def detect(self, frame=None, gray=None):
+        """Detect faces in one frame using all workers"""
+        return self.collect(self.submit(frame, gray))
+
+    def submit(self, frame=None, gray=None):
+        """
+        Queue a frame for detection without waiting
+        Returns a ticket for collect(); in frames mode consecutive frames run on
+        different workers
+        """
+        image = self.select_input(frame, gray)
+        with self.lock:
+            slot = self.write_frame(image)
+            if self.mode == 'tiles':
+                task_ids = [self.queue_task(slot, region)
+                            for region in self.tiles(image.shape[0], image.shape[1])]
+            else:
+                task_ids = [self.queue_task(slot, (0, image.shape[0], 0, image.shape[1]))]
+            self.release_slot(slot)
+            ticket = task_ids[0]
+            self.tickets[ticket] = task_ids
+            return ticket
+
+    def ready(self, ticket):
+        """Whether a submitted frame's results have arrived (never blocks)"""
+        with self.lock:
+            while not self.receiving and self.receive(timeout=0):
+                pass
+            return all(task_id in self.task_results for task_id in self.tickets[ticket])
+
+    def collect(self, ticket):
+        """Wait for a submitted frame and return its face boxes"""
+        with self.lock:
+            task_ids = self.tickets.pop(ticket)
+            boxes = self.wait(task_ids)
+        return merge_boxes(boxes) if len(task_ids) > 1 else to_boxes(boxes)
@@ -0,0 +1,78 @@
+"""
+LRU cache of emotion predictions keyed by a perceptual hash of the face crop
+Near-duplicate crops (re-analysed videos, static scenes) reuse a prediction
+instead of running the model again
+"""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def perceptual_hash(face_img, hash_size=16):
+    """
+    Difference hash of a grayscale face crop
+    Compares neighbouring pixels of a (hash_size+1) x hash_size thumbnail and
+    packs the hash_size^2 bits into bytes
+    """
+    small = cv2.resize(face_img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return np.packbits(bits).tobytes()
+
+
+class PredictionCache:
+    """Bounded, thread-safe LRU cache mapping crop hashes to probability vectors"""
+
+    def __init__(self, max_size=1024, hash_size=16):
+        self.max_size = max_size
+        self.hash_size = hash_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, face_img):
+        """Cache key for a 48x48 grayscale crop"""
+        return perceptual_hash(face_img, self.hash_size)
+
+    def get(self, key):
+        """Return the cached predictions for key, or None"""
+        with self.lock:
+            predictions = self.entries.get(key)
+            if predictions is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return predictions
+
+    def put(self, key, predictions):
+        """Store predictions, evicting the least recently used entries if full"""
+        with self.lock:
+            self.entries[key] = predictions
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the metrics"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Hit/miss metrics"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,158 @@
+"""
+Result sinks for headless realtime detection
+Each sink receives every completed frame (a frame_pipeline.FrameResult) from
+EmotionDetector.run_headless. Sinks must be cheap or hand work to a
+background thread; they run on the capture loop.
+"""
+
+import json
+import os
+import socket
+import time
+
+import numpy as np
+
+from media_writer import MediaWriter
+
+
+def frame_record(result, emotions):
+    """JSON-serializable description of one processed frame"""
+    return {
+        'seq': result.seq,
+        'timestamp': time.time(),
+        'latency_ms': result.latency * 1000,
+        'faces': [{
+            'face_id': face_id,
+            'box': {'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)},
+            'emotion': emotion,
+            'confidence': float(np.max(predictions)),
+            'predictions': {emotions[i]: float(p) for i, p in enumerate(predictions)}
+        } for face_id, (x, y, w, h), emotion, predictions in result.faces]
+    }
+
+
+class ResultSink:
+    """Base class for headless result sinks"""
+
+    # True if the sink needs annotated frames (result.output) to be rendered
+    needs_frames = False
+
+    def start(self, detector, statistics, pipeline):
+        """Called once before the first frame"""
+        self.emotions = detector.emotions
+        self.statistics = statistics
+        self.pipeline = pipeline
+
+    def handle(self, result):
+        """Called for every completed frame, in frame order"""
+        raise NotImplementedError
+
+    def close(self):
+        """Called once after the last frame"""
+
+
+class JsonlSink(ResultSink):
+    """Append one JSON line per frame to a file"""
+
+    def __init__(self, path, skip_empty=False, flush_every=30):
+        self.path = path
+        self.skip_empty = skip_empty
+        self.flush_every = flush_every
+        self.file = None
+        self.lines = 0
+
+    def start(self, detector, statistics, pipeline):
+        super().start(detector, statistics, pipeline)
+        self.file = open(self.path, 'a', buffering=1 << 16)
+
+    def handle(self, result):
+        if self.skip_empty and not result.faces:
+            return
+        self.file.write(json.dumps(frame_record(result, self.emotions)) + '\n')
+        self.lines += 1
+        if self.lines % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class MetricsSink(ResultSink):
+    """Periodically write statistics and pipeline throughput to a JSON file"""
+
+    def __init__(self, path, interval=10.0):
+        self.path = path
+        self.interval = interval
+        self.last_write = 0.0
+
+    def write(self):
+        """Atomically replace the metrics file with current values"""
+        metrics = self.statistics.snapshot().as_dict(history=0)
+        metrics['pipeline'] = self.pipeline.stats()
+        metrics['updated'] = time.time()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(metrics, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.last_write = time.monotonic()
+
+    def handle(self, result):
+        if time.monotonic() - self.last_write >= self.interval:
+            self.write()
+
+    def close(self):
+        self.write()
+
+
+class RecordingSink(ResultSink):
+    """Record the annotated frames as rotating video segments (see media_writer)"""
+
+    needs_frames = True
+
+    def __init__(self, output_dir='recordings', fps=30, **writer_options):
+        self.writer = MediaWriter(output_dir, **writer_options)
+        self.fps = fps
+
+    def start(self, detector, statistics, pipeline):
+        super().start(detector, statistics, pipeline)
+        self.writer.start_recording(self.fps)
+
+    def handle(self, result):
+        self.writer.record(result.output)
+
+    def close(self):
+        self.writer.close()
+        stats = self.writer.stats()
+        print(f"Recorded {stats['written']} frames ({stats['dropped']} dropped) to: "
+              f"{', '.join(stats['segments'])}")
+
+
+class UdpPublishSink(ResultSink):
+    """
+    Publish each frame's results as a JSON datagram
+    Sending never blocks; datagrams that cannot be sent are counted and dropped
+    """
+
+    def __init__(self, host, port, skip_empty=True):
+        self.address = (host, int(port))
+        self.skip_empty = skip_empty
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sent = 0
+        self.failed = 0
+
+    def handle(self, result):
+        if self.skip_empty and not result.faces:
+            return
+        try:
+            self.sock.sendto(json.dumps(frame_record(result, self.emotions)).encode(), self.address)
+            self.sent += 1
+        except OSError:
+            self.failed += 1
+
+    def close(self):
+        self.sock.close()
+        print(f"Published {self.sent} results to {self.address[0]}:{self.address[1]} "
+              f"({self.failed} failed)")
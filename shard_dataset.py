@@ -0,0 +1,180 @@
+"""
+On-disk sharded datasets of 48x48 grayscale faces
+Each shard is a pair of .npy files (uint8 images and class indices) that are
+memory-mapped on read, so datasets far larger than RAM can be streamed.
+Batch order is a pure function of (seed, epoch), which lets an interrupted
+run resume at an exact batch position.
+"""
+
+import json
+import os
+
+import numpy as np
+
+SHARD_MANIFEST = 'shards.json'
+SHARD_FORMAT = 1
+
+
+class ShardWriter:
+    """Append images and labels to a sharded dataset directory"""
+
+    def __init__(self, output_dir, shard_size=10000, emotions=None):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.emotions = emotions
+        self.shards = []
+        self.images = []
+        self.labels = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add(self, image, label):
+        """Add one 48x48 (or 48x48x1) image with its class index"""
+        self.images.append(np.asarray(image, dtype=np.uint8).reshape(48, 48, 1))
+        self.labels.append(int(label))
+        if len(self.images) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered samples as a new shard"""
+        if not self.images:
+            return
+        name = f"shard-{len(self.shards):05d}"
+        np.save(os.path.join(self.output_dir, f"{name}-images.npy"), np.stack(self.images))
+        np.save(os.path.join(self.output_dir, f"{name}-labels.npy"), np.asarray(self.labels, dtype=np.uint8))
+        self.shards.append({'name': name, 'count': len(self.images)})
+        self.images = []
+        self.labels = []
+
+    def close(self):
+        """Flush remaining samples and write the manifest"""
+        self.flush()
+        manifest = {'format': SHARD_FORMAT, 'image_shape': [48, 48, 1],
+                    'emotions': self.emotions, 'shards': self.shards}
+        with open(os.path.join(self.output_dir, SHARD_MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def write_shards(X, y, output_dir, shard_size=10000, emotions=None):
+    """Write arrays (images 0-255, labels one-hot or indices) as a sharded dataset"""
+    y = np.asarray(y)
+    labels = np.argmax(y, axis=1) if y.ndim == 2 else y
+    writer = ShardWriter(output_dir, shard_size, emotions)
+    for image, label in zip(X, labels):
+        writer.add(image, label)
+    writer.close()
+    print(f"Wrote {len(labels)} samples in {len(writer.shards)} shards to {output_dir}")
+
+
+class ShardedDataset:
+    """Read-only view of a sharded dataset directory"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        with open(os.path.join(data_dir, SHARD_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != SHARD_FORMAT:
+            raise ValueError(f"Unsupported shard format: {manifest.get('format')}")
+        self.shards = manifest['shards']
+        self.emotions = manifest.get('emotions')
+
+    def __len__(self):
+        return sum(shard['count'] for shard in self.shards)
+
+    def load_shard(self, shard):
+        """Memory-map one shard's images and labels"""
+        base = os.path.join(self.data_dir, shard['name'])
+        images = np.load(f"{base}-images.npy", mmap_mode='r')
+        labels = np.load(f"{base}-labels.npy", mmap_mode='r')
+        return images, labels
+
+    def num_batches(self, batch_size, shard_indices=None, batch_offset=0, batch_stride=1):
+        """Batches per epoch (batches never span two shards)"""
+        shards = self.shards if shard_indices is None else [self.shards[i] for i in shard_indices]
+        total = sum(-(-shard['count'] // batch_size) for shard in shards)
+        return max(0, -(-(total - batch_offset) // batch_stride))
+
+    def batches(self, batch_size, epoch=0, seed=42, start_batch=0, shard_indices=None, shuffle=True,
+                batch_offset=0, batch_stride=1):
+        """
+        Yield (images, labels) batches for one epoch
+        Shard order and sample order within each shard are shuffled from
+        (seed, epoch); the first start_batch batches are skipped without
+        reading their data. shard_indices restricts the epoch to a subset of
+        shards (e.g. one worker's partition); batch_offset/batch_stride keep
+        only every batch_stride-th batch of the epoch, so workers sharing the
+        same shards (and seed) read disjoint batches.
+        """
+        rng = np.random.default_rng([seed, epoch])
+        order = list(range(len(self.shards))) if shard_indices is None else list(shard_indices)
+        if shuffle:
+            order = [order[i] for i in rng.permutation(len(order))]
+
+        batch_index = 0
+        for shard_index in order:
+            shard = self.shards[shard_index]
+            count = shard['count']
+            n_batches = -(-count // batch_size)
+            permutation = rng.permutation(count) if shuffle else np.arange(count)
+
+            own = range(max(batch_index, start_batch), batch_index + n_batches)
+            if not any((i - batch_offset) % batch_stride == 0 for i in own[:batch_stride]):
+                batch_index += n_batches
+                continue
+
+            images, labels = self.load_shard(shard)
+            for b in range(n_batches):
+                if batch_index >= start_batch and (batch_index - batch_offset) % batch_stride == 0:
+                    # Sorted indices keep reads from the memory map sequential
+                    idx = np.sort(permutation[b * batch_size:(b + 1) * batch_size])
+                    yield np.asarray(images[idx]), np.asarray(labels[idx])
+                batch_index += 1
+
+
+def shard_kaggle_csv(csv_path, output_dir, shard_size=10000, validation_split=0.2, seed=42,
+                     chunk_size=5000):
+    """
+    Convert a Kaggle-format CSV ('emotion', 'pixels' columns) into train/ and val/
+    shard directories, reading it in chunks so it never has to fit in memory
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    writers = {split: ShardWriter(os.path.join(output_dir, split), shard_size)
+               for split in ('train', 'val')}
+    for chunk in pd.read_csv(csv_path, usecols=['emotion', 'pixels'], chunksize=chunk_size):
+        for label, pixels, is_val in zip(chunk['emotion'].values, chunk['pixels'].values,
+                                         rng.random(len(chunk)) < validation_split):
+            image = np.array(pixels.split(' '), dtype=np.uint8)
+            writers['val' if is_val else 'train'].add(image, label)
+    for split, writer in writers.items():
+        writer.close()
+        print(f"{split}: {sum(s['count'] for s in writer.shards)} samples in {len(writer.shards)} shards")
+
+
+def shard_image_directory(data_dir, output_dir, emotions, shard_size=10000, validation_split=0.2,
+                          seed=42):
+    """
+    Convert a data_dir/emotion_name/image.jpg tree into train/ and val/ shard
+    directories, one image at a time
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    writers = {split: ShardWriter(os.path.join(output_dir, split), shard_size, emotions)
+               for split in ('train', 'val')}
+    for label, emotion in enumerate(emotions):
+        emotion_dir = os.path.join(data_dir, emotion.lower())
+        if not os.path.exists(emotion_dir):
+            print(f"Warning: Directory not found: {emotion_dir}")
+            continue
+        for filename in sorted(os.listdir(emotion_dir)):
+            if not filename.endswith(('.jpg', '.jpeg', '.png')):
+                continue
+            img = cv2.imread(os.path.join(emotion_dir, filename), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                continue
+            split = 'val' if rng.random() < validation_split else 'train'
+            writers[split].add(cv2.resize(img, (48, 48)), label)
+    for split, writer in writers.items():
+        writer.close()
+        print(f"{split}: {sum(s['count'] for s in writer.shards)} samples in {len(writer.shards)} shards")
@@ -0,0 +1,77 @@
+"""
+Tests for DetectorPool checkout, timeouts and release
+Models are never loaded (detectors stay lazy); skipped when OpenCV/NumPy are missing
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from detector_pool import DetectorPool, PoolExhausted
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = DetectorPool(size=2)
+    held = [pool.acquire(), pool.acquire()]
+    assert held[0] is not held[1]
+
+    with pytest.raises(PoolExhausted):
+        pool.acquire(timeout=0.05)
+    with pytest.raises(PoolExhausted):
+        with pool.checkout(timeout=0.05):
+            pass
+
+    stats = pool.stats()
+    assert (stats['in_use'], stats['peak_in_use'], stats['checkouts'], stats['timeouts']) == (2, 2, 2, 2)
+
+
+def test_pool_exhausted_is_not_a_timeout_error():
+    # concurrent.futures raises TimeoutError for a slow job; callers tell the two apart
+    assert not issubclass(PoolExhausted, TimeoutError)
+
+
+def test_release_returns_detector_to_waiting_caller():
+    pool = DetectorPool(size=1)
+    detector = pool.acquire()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(pool.acquire(timeout=5)))
+    waiter.start()
+
+    pool.release(detector)
+    waiter.join(timeout=5)
+    assert received == [detector]
+    assert pool.stats()['wait']['max_ms'] > 0
+
+
+def test_checkout_releases_on_error():
+    pool = DetectorPool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.checkout(timeout=1):
+            raise RuntimeError('request failed')
+
+    stats = pool.stats()
+    assert (stats['in_use'], stats['checkouts']) == (0, 1)
+    with pool.checkout(timeout=0.05) as detector:
+        assert detector is pool.detectors[0]
+
+
+def test_warm_up_holds_every_detector():
+    pool = DetectorPool(size=3)
+    in_use = []
+
+    def predict(crops):
+        in_use.append(pool.stats()['in_use'])
+        return [(None, None) for _ in crops]
+
+    for detector in pool.detectors:
+        detector.predict_emotions_batch = predict
+    pool.warm_up()
+
+    assert in_use == [3, 3, 3]
+    assert pool.stats()['in_use'] == 0
+    with pool.exclusive():
+        with pytest.raises(PoolExhausted):
+            pool.acquire(timeout=0.05)
@@ -0,0 +1,97 @@
+"""
+Tests for the debounced per-face emotion event stream
+"""
+
+import time
+
+from emotion_events import EmotionEventStream
+
+BOX = (10, 20, 30, 30)
+
+
+def feed(stream, frames):
+    """Feed (time, [(face_id, emotion)]) frames and return all events"""
+    events = []
+    for now, faces in frames:
+        events.extend(stream.update([(face_id, emotion, 0.9, BOX) for face_id, emotion in faces], now=now))
+    return events
+
+
+def kinds(events):
+    return [(event['type'], event['face_id'], event['emotion']) for event in events]
+
+
+def test_first_sighting_reports_appear():
+    stream = EmotionEventStream(hold_time=1.0)
+    events = feed(stream, [(0.0, [(1, 'Happy')]), (0.1, [(1, 'Happy')])])
+    assert kinds(events) == [('appear', 1, 'Happy')]
+
+
+def test_flicker_shorter_than_hold_time_is_suppressed():
+    stream = EmotionEventStream(hold_time=1.0, disappear_after=5.0)
+    frames = [(0.0, [(1, 'Happy')])]
+    # Alternate between Sad and Happy every 0.2s; no run lasts the hold time
+    for i in range(1, 20):
+        frames.append((i * 0.2, [(1, 'Sad' if i % 2 else 'Happy')]))
+    events = feed(stream, frames)
+    assert kinds(events) == [('appear', 1, 'Happy')]
+
+
+def test_change_reported_after_hold_time():
+    stream = EmotionEventStream(hold_time=1.0, disappear_after=5.0)
+    frames = [(0.0, [(1, 'Happy')])] + [(0.5 + i * 0.25, [(1, 'Sad')]) for i in range(6)]
+    events = feed(stream, frames)
+    assert kinds(events) == [('appear', 1, 'Happy'), ('change', 1, 'Sad')]
+    change = events[-1]
+    assert change['previous'] == 'Happy'
+    # Sad first seen at 0.5s, so the change fires on the first frame at or after 1.5s
+    assert change['duration'] == 1.5
+
+
+def test_interrupted_candidate_restarts_hold_time():
+    stream = EmotionEventStream(hold_time=1.0, disappear_after=5.0)
+    events = feed(stream, [
+        (0.0, [(1, 'Happy')]),
+        (0.1, [(1, 'Sad')]),
+        (0.9, [(1, 'Angry')]),     # a different candidate resets the timer
+        (1.2, [(1, 'Sad')]),
+        (2.1, [(1, 'Sad')]),
+        (2.2, [(1, 'Sad')]),
+    ])
+    assert kinds(events) == [('appear', 1, 'Happy'), ('change', 1, 'Sad')]
+    assert events[-1]['duration'] == 2.2
+
+
+def test_disappear_after_timeout_and_clear():
+    stream = EmotionEventStream(hold_time=1.0, disappear_after=1.0)
+    events = feed(stream, [(0.0, [(1, 'Happy'), (2, 'Sad')]), (0.5, [(2, 'Sad')]), (1.2, [(2, 'Sad')])])
+    assert kinds(events)[-1] == ('disappear', 1, 'Happy')
+
+    assert kinds(stream.clear([2])) == [('disappear', 2, 'Sad')]
+    assert stream.faces == {}
+
+
+def test_subscribers_and_replay():
+    stream = EmotionEventStream()
+    subscriber = stream.subscribe()
+    received = []
+    stream.add_callback(received.append)
+    events = feed(stream, [(0.0, [(1, 'Happy')])])
+    assert subscriber.get_nowait() == events[0] == received[0]
+    assert stream.events_since(0) == events
+    assert stream.events_since(events[0]['seq']) == []
+
+
+def test_expire_stale_reports_faces_without_further_updates():
+    stream = EmotionEventStream(disappear_after=1.0)
+    stream.update([(1, 'Happy', 0.9, BOX)], now=time.monotonic() - 5)
+    assert kinds(stream.expire_stale()) == [('disappear', 1, 'Happy')]
+    assert stream.expire_stale() == []
+
+
+def test_clear_with_face_ids_leaves_other_sources_alone():
+    stream = EmotionEventStream(disappear_after=5.0)
+    now = time.monotonic()
+    stream.update([(1, 'Happy', 0.9, BOX), (2, 'Sad', 0.8, BOX)], now=now)
+    assert kinds(stream.clear([1])) == [('disappear', 1, 'Happy')]
+    assert list(stream.faces) == [2]
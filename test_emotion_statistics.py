@@ -0,0 +1,128 @@
+"""
+Tests for the array-backed EmotionStatistics
+Results are compared with a straightforward dict implementation like the
+per-detection counters it replaced; skipped when NumPy is missing
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from emotion_statistics import EmotionStatistics
+
+EMOTIONS = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
+START = 1_700_000_000.0
+
+
+class DictStatistics:
+    """Reference: per-detection dict counters and a capped history list"""
+
+    def __init__(self, history=100):
+        self.counts = {emotion: 0 for emotion in EMOTIONS}
+        self.confidences = {emotion: [] for emotion in EMOTIONS}
+        self.probabilities = []
+        self.history = []
+        self.max_history = history
+        self.frames = 0
+
+    def record_frame(self, faces, now):
+        if faces:
+            self.frames += 1
+        for emotion, confidence, probabilities in faces:
+            self.counts[emotion] += 1
+            self.confidences[emotion].append(confidence)
+            self.probabilities.append(probabilities)
+            self.history.append((emotion, confidence, now))
+            if len(self.history) > self.max_history:
+                self.history.pop(0)
+
+
+def detection_sequence(frames=300, seed=7):
+    """Deterministic frames of (emotion, confidence, probabilities) with timestamps"""
+    rng = random.Random(seed)
+    sequence = []
+    for i in range(frames):
+        faces = []
+        for _ in range(rng.randint(0, 3)):
+            raw = [rng.random() for _ in EMOTIONS]
+            probabilities = [p / sum(raw) for p in raw]
+            best = max(range(len(EMOTIONS)), key=probabilities.__getitem__)
+            faces.append((EMOTIONS[best], probabilities[best], probabilities))
+        sequence.append((START + i * 0.25, faces))
+    return sequence
+
+
+def fill(sequence, **options):
+    statistics = EmotionStatistics(EMOTIONS, **options)
+    reference = DictStatistics()
+    for now, faces in sequence:
+        statistics.update([f[0] for f in faces], [f[1] for f in faces], [f[2] for f in faces], now=now)
+        reference.record_frame(faces, now)
+    return statistics.snapshot(), reference
+
+
+def test_counts_and_averages_match_dict_implementation():
+    snapshot, reference = fill(detection_sequence())
+    total = sum(reference.counts.values())
+
+    assert snapshot.counts_dict() == reference.counts
+    assert snapshot.total == total
+    assert snapshot.frames == reference.frames
+    for emotion in EMOTIONS:
+        values = reference.confidences[emotion]
+        assert snapshot.percentages()[emotion] == pytest.approx(len(values) / total * 100)
+        assert snapshot.mean_confidence()[emotion] == pytest.approx(
+            sum(values) / len(values) if values else 0.0)
+    means = np.mean(reference.probabilities, axis=0)
+    for i, emotion in enumerate(EMOTIONS):
+        assert snapshot.mean_probabilities()[emotion] == pytest.approx(means[i])
+
+
+def test_history_keeps_most_recent_detections_in_order():
+    snapshot, reference = fill(detection_sequence())
+    history = snapshot.history()
+    assert len(history) == len(reference.history) == 100
+    for item, (emotion, confidence, _) in zip(history, reference.history):
+        assert item['emotion'] == emotion
+        assert item['confidence'] == pytest.approx(confidence)
+    assert snapshot.latest() == (reference.history[-1][0], pytest.approx(reference.history[-1][1]))
+
+
+def test_histograms_count_every_detection_in_its_bin():
+    snapshot, reference = fill(detection_sequence(), histogram_bins=10)
+    histograms = snapshot.confidence_histograms()
+    for emotion in EMOTIONS:
+        expected = [0] * 10
+        for confidence in reference.confidences[emotion]:
+            expected[min(int(confidence * 10), 9)] += 1
+        assert histograms[emotion] == expected
+
+
+def test_rolling_window_counts_only_recent_seconds():
+    sequence = detection_sequence()
+    snapshot, _ = fill(sequence, window_seconds=60)
+    now = sequence[-1][0]
+    rolling = snapshot.rolling(10, now=now)
+
+    expected = {emotion: 0 for emotion in EMOTIONS}
+    for timestamp, faces in sequence:
+        if int(timestamp) > int(now) - 10:
+            for emotion, _, _ in faces:
+                expected[emotion] += 1
+    assert rolling['counts'] == expected
+    assert rolling['detections_per_second'] == pytest.approx(sum(expected.values()) / 10)
+
+
+def test_reset_and_snapshot_isolation():
+    statistics = EmotionStatistics(EMOTIONS)
+    statistics.update(['Happy'], [0.9], now=START)
+    before = statistics.snapshot()
+    statistics.update(['Sad', 'Sad'], [0.5, 0.7], now=START + 1)
+    assert before.counts_dict()['Sad'] == 0
+    assert statistics.snapshot().counts_dict()['Sad'] == 2
+
+    statistics.reset()
+    assert statistics.snapshot().total == 0
+    assert before.total == 1
@@ -0,0 +1,113 @@
+"""
+Tests for EmotionTracker: IoU matching, smoothing, expiry and inference skipping
+Uses a scripted stand-in for the model; skipped when OpenCV/NumPy are missing
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from face_tracker import EmotionTracker
+
+EMOTIONS = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
+
+
+class ScriptedDetector:
+    """Returns a fixed probability vector per call and counts model calls"""
+
+    emotions = EMOTIONS
+
+    def __init__(self, predictions=None):
+        self.predictions = predictions
+        self.calls = 0
+
+    def predict_emotions_batch(self, crops):
+        self.calls += 1
+        results = []
+        for _ in crops:
+            p = np.asarray(self.predictions if self.predictions is not None
+                           else np.eye(len(EMOTIONS))[3], dtype='float32')
+            results.append((EMOTIONS[int(np.argmax(p))], p))
+        return results
+
+
+def noise_frame(seed, shape=(240, 320)):
+    """A random grayscale frame (every crop differs between seeds)"""
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_track_ids_stable_under_small_motion():
+    tracker = EmotionTracker(ScriptedDetector())
+    gray = noise_frame(0)
+    ids = []
+    for dx in range(0, 20, 4):
+        output = tracker.update([(50 + dx, 50, 60, 60), (200, 100, 50, 50)], gray)
+        ids.append([track.id for track, _, _ in output])
+    assert all(frame_ids == [1, 2] for frame_ids in ids)
+
+
+def test_non_overlapping_detection_starts_new_track():
+    tracker = EmotionTracker(ScriptedDetector())
+    gray = noise_frame(0)
+    first = tracker.update([(10, 10, 40, 40)], gray)[0][0]
+    second = tracker.update([(200, 150, 40, 40)], gray)[0][0]
+    assert first.id != second.id
+
+
+def test_smoothing_is_exponential_moving_average():
+    detector = ScriptedDetector()
+    tracker = EmotionTracker(detector, smoothing=0.6, change_threshold=0)
+    box = [(50, 50, 60, 60)]
+    p1 = np.eye(len(EMOTIONS))[3]
+    p2 = np.eye(len(EMOTIONS))[5]
+
+    detector.predictions = p1
+    tracker.update(box, noise_frame(1))
+    detector.predictions = p2
+    _, _, probabilities = tracker.update(box, noise_frame(2))[0]
+    np.testing.assert_allclose(probabilities, 0.6 * p1 + 0.4 * p2, rtol=1e-6)
+
+    detector.predictions = p2
+    _, emotion, probabilities = tracker.update(box, noise_frame(3))[0]
+    np.testing.assert_allclose(probabilities, 0.36 * p1 + 0.64 * p2, rtol=1e-6)
+    assert emotion == 'Sad'
+
+
+def test_unchanged_crop_skips_inference_until_stale():
+    detector = ScriptedDetector()
+    tracker = EmotionTracker(detector, max_staleness=3)
+    gray = noise_frame(0)
+    box = [(50, 50, 60, 60)]
+    for _ in range(5):
+        _, emotion, _ = tracker.update(box, gray)[0]
+        assert emotion == 'Happy'
+    # Frame 1 scores, frames 2-4 reuse it, frame 5 is forced after 3 stale frames
+    assert tracker.inferences == 2
+    assert tracker.skipped == 3
+    assert detector.calls == 2
+
+
+def test_changed_crop_is_rescored():
+    tracker = EmotionTracker(ScriptedDetector())
+    box = [(50, 50, 60, 60)]
+    tracker.update(box, noise_frame(1))
+    tracker.update(box, noise_frame(2))
+    assert tracker.inferences == 2
+    assert tracker.skipped == 0
+
+
+def test_tracks_expire_after_max_missed_frames():
+    tracker = EmotionTracker(ScriptedDetector(), max_missed=2)
+    gray = noise_frame(0)
+    box = [(50, 50, 60, 60)]
+    original = tracker.update(box, gray)[0][0].id
+
+    tracker.update([], gray)
+    tracker.update([], gray)
+    assert tracker.update(box, gray)[0][0].id == original
+
+    for _ in range(3):
+        tracker.update([], gray)
+    assert tracker.tracks == []
+    assert tracker.update(box, gray)[0][0].id != original
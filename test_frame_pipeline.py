@@ -0,0 +1,126 @@
+"""
+Tests for FramePipeline: bounded in-flight frames, ordering and reported latency
+Uses stand-ins for the detector and the face detector; skipped when OpenCV/NumPy are missing
+"""
+
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from frame_pipeline import FramePipeline
+
+
+class StubDetector:
+    """One fixed face per frame and a constant prediction"""
+
+    def detect_faces(self, frame, gray=None):
+        if gray is None:
+            gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        gray[:] = frame[:, :, 0]
+        return [(4, 4, 16, 16)], gray
+
+    def predict_emotions_batch(self, crops):
+        return [('Happy', np.eye(7, dtype='float32')[3]) for _ in crops]
+
+
+class StaggeredFaceDetector:
+    """
+    Frames-mode stand-in for ParallelFaceDetector: every frame takes its own
+    time to finish, so later frames can complete before earlier ones
+    """
+
+    def __init__(self, lookahead=3, delays=(0.03, 0.005, 0.015)):
+        self.lookahead = lookahead
+        self.delays = delays
+        self.done_at = {}
+        self.outstanding = 0
+        self.peak_outstanding = 0
+
+    def submit(self, frame=None, gray=None):
+        ticket = len(self.done_at)
+        self.done_at[ticket] = time.perf_counter() + self.delays[ticket % len(self.delays)]
+        self.outstanding += 1
+        self.peak_outstanding = max(self.peak_outstanding, self.outstanding)
+        return ticket
+
+    def ready(self, ticket):
+        return time.perf_counter() >= self.done_at[ticket]
+
+    def collect(self, ticket):
+        time.sleep(max(0.0, self.done_at[ticket] - time.perf_counter()))
+        self.outstanding -= 1
+        return [(ticket, 0, 8, 8)]
+
+
+def frame(value=0):
+    """A small BGR frame"""
+    return np.full((32, 32, 3), value, dtype=np.uint8)
+
+
+def test_submit_drops_when_pipeline_is_full():
+    release = threading.Event()
+    pipeline = FramePipeline(StubDetector(), render=lambda frame, faces: release.wait(5),
+                             max_in_flight=2).start()
+    assert pipeline.submit(frame(), block=False)
+    assert pipeline.submit(frame(), block=False)
+    assert not pipeline.submit(frame(), block=False)
+
+    release.set()
+    results = [pipeline.get(timeout=5) for _ in range(2)]
+    pipeline.stop()
+    assert [result.seq for result in results] == [0, 1]
+    stats = pipeline.stats()
+    assert (stats['frames'], stats['dropped']) == (2, 1)
+
+
+def test_results_in_order_with_reported_latency():
+    def render(frame, faces):
+        time.sleep(0.01)
+        return len(faces)
+
+    pipeline = FramePipeline(StubDetector(), render=render, max_in_flight=3).start()
+    for i in range(6):
+        pipeline.submit(frame(i))
+    pipeline.stop()
+    results = pipeline.drain()
+
+    assert [result.seq for result in results] == list(range(6))
+    assert all(result.output == 1 and result.latency >= 0.01 for result in results)
+    face_id, box, emotion, _ = results[0].faces[0]
+    assert (face_id, box, emotion) == (0, (4, 4, 16, 16), 'Happy')
+
+    stats = pipeline.stats()
+    assert stats['frames'] == 6
+    assert stats['latency']['max_ms'] >= stats['latency']['mean_ms'] >= 10
+    assert stats['stages']['render']['mean_ms'] >= 10
+
+
+def test_sequential_mode_matches_threaded():
+    pipeline = FramePipeline(StubDetector(), render=lambda frame, faces: faces, threaded=False).start()
+    for i in range(3):
+        assert pipeline.submit(frame(i))
+    results = pipeline.drain()
+    pipeline.stop()
+    assert [result.seq for result in results] == [0, 1, 2]
+    assert all(result.output == result.faces for result in results)
+
+
+def test_frames_mode_overlaps_detection_and_keeps_order():
+    detector = StubDetector()
+    detector.face_detector = face_detector = StaggeredFaceDetector(lookahead=3)
+    pipeline = FramePipeline(detector, max_in_flight=2).start()
+    assert pipeline.max_in_flight == 5
+
+    for i in range(9):
+        pipeline.submit(frame(i))
+    pipeline.stop()
+    results = pipeline.drain()
+
+    assert [result.seq for result in results] == list(range(9))
+    assert [result.faces[0][1][0] for result in results] == list(range(9))
+    assert 1 < face_detector.peak_outstanding <= 3
+    assert face_detector.outstanding == 0
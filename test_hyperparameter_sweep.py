@@ -0,0 +1,63 @@
+"""
+Tests for the sweep results database and the median stopping rule
+Uses an in-memory SQLite database; skipped when NumPy is missing
+"""
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from hyperparameter_sweep import connect, should_stop
+
+
+def add_trial(db, sweep_id, accuracies):
+    """Insert a trial with one val_accuracy per epoch and return its id"""
+    with db:
+        trial_id = db.execute("INSERT INTO trials (sweep_id, status) VALUES (?, 'running')",
+                              (sweep_id,)).lastrowid
+        for epoch, accuracy in enumerate(accuracies):
+            db.execute("INSERT INTO epochs (trial_id, epoch, val_accuracy) VALUES (?, ?, ?)",
+                       (trial_id, epoch, accuracy))
+    return trial_id
+
+
+def test_trial_below_median_is_stopped():
+    db = connect(':memory:')
+    for accuracy in (0.5, 0.6, 0.7):
+        add_trial(db, 1, [accuracy - 0.1, accuracy])
+    trial = add_trial(db, 1, [0.3, 0.4])
+    assert should_stop(db, trial, 1)
+    assert not should_stop(db, trial, 0)     # grace epoch
+
+
+def test_median_ignores_other_sweeps():
+    db = connect(':memory:')
+    for accuracy in (0.8, 0.85, 0.9):
+        add_trial(db, 1, [accuracy, accuracy])
+    for accuracy in (0.3, 0.35, 0.4):
+        add_trial(db, 2, [accuracy, accuracy])
+    trial = add_trial(db, 2, [0.5, 0.5])
+    assert not should_stop(db, trial, 1)
+
+
+def test_too_few_trials_in_sweep_never_stops():
+    db = connect(':memory:')
+    for accuracy in (0.8, 0.85, 0.9):
+        add_trial(db, 1, [accuracy, accuracy])
+    add_trial(db, 2, [0.9, 0.9])
+    trial = add_trial(db, 2, [0.1, 0.1])
+    assert not should_stop(db, trial, 1)
+
+
+def test_old_database_gains_sweep_column(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'sweep.db')
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE trials (id INTEGER PRIMARY KEY, status TEXT)")
+    old.execute("INSERT INTO trials (status) VALUES ('completed')")
+    old.commit()
+    old.close()
+
+    db = connect(path)
+    assert db.execute("SELECT sweep_id FROM trials").fetchall() == [(0,)]
@@ -0,0 +1,111 @@
+"""
+Tests for the MediaWriter overload policies
+The writer thread is stalled with a stand-in write_frame so the queue fills
+up deterministically; skipped when OpenCV/NumPy are missing
+"""
+
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from media_writer import DEGRADE, DROP_NEWEST, DROP_OLDEST, MediaWriter
+
+
+def frame(value):
+    """A small BGR frame tagged with value"""
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def stalled_writer(tmp_path, **options):
+    """
+    A recording writer whose thread is blocked inside frame 0
+    Returns (writer, release event, list of written frame tags)
+    """
+    writer = MediaWriter(str(tmp_path), **options)
+    started, release, written = threading.Event(), threading.Event(), []
+
+    def write_frame(timestamp, frame):
+        started.set()
+        assert release.wait(5)
+        written.append(int(frame[0, 0, 0]))
+
+    writer.write_frame = write_frame
+    writer.start_recording(fps=30)
+    assert writer.record(frame(0))
+    assert started.wait(5)
+    return writer, release, written
+
+
+def test_drop_newest_rejects_frames_while_full(tmp_path):
+    writer, release, written = stalled_writer(tmp_path, max_queue=4, policy=DROP_NEWEST)
+    accepted = [writer.record(frame(i)) for i in range(1, 7)]
+    assert accepted == [True] * 4 + [False] * 2
+    assert writer.stats()['queued'] == 4
+
+    release.set()
+    writer.close()
+    assert written == [0, 1, 2, 3, 4]
+    assert writer.stats()['dropped'] == 2
+
+
+def test_drop_oldest_keeps_most_recent_frames(tmp_path):
+    writer, release, written = stalled_writer(tmp_path, max_queue=4, policy=DROP_OLDEST)
+    assert all(writer.record(frame(i)) for i in range(1, 7))
+    assert writer.stats()['queued'] == 4
+
+    release.set()
+    writer.close()
+    assert written == [0, 3, 4, 5, 6]
+    assert writer.stats()['dropped'] == 2
+
+
+def test_drop_oldest_keeps_end_of_recording_marker(tmp_path):
+    writer, release, written = stalled_writer(tmp_path, max_queue=2, policy=DROP_OLDEST)
+    writer.record(frame(1))
+    writer.stop_recording()
+    writer.start_recording(fps=30)
+    writer.record(frame(2))
+    writer.record(frame(3))
+    assert list(writer.frames)[0] is None
+
+    release.set()
+    writer.close()
+    assert written == [0, 3]
+    assert writer.stats()['dropped'] == 2
+
+
+def test_degrade_reduces_rate_then_recovers(tmp_path):
+    writer, release, written = stalled_writer(tmp_path, max_queue=8, policy=DEGRADE, max_stride=4)
+    accepted = [writer.record(frame(i)) for i in range(1, 21)]
+    stats = writer.stats()
+    assert stats['stride'] == 4
+    assert stats['queued'] <= 8
+    # Every frame is kept until the queue is half full, then only every 4th
+    assert accepted[:5] == [True] * 5
+    assert 0 < sum(accepted[5:]) < len(accepted[5:])
+    assert stats['dropped'] == accepted.count(False)
+
+    release.set()
+    wait_for(lambda: writer.stats()['queued'] == 0)
+    assert writer.record(frame(99))
+    assert writer.stats()['stride'] == 1
+    writer.close()
+    assert written[-1] == 99
+
+
+def test_record_is_ignored_when_not_recording(tmp_path):
+    writer = MediaWriter(str(tmp_path))
+    assert not writer.record(frame(1))
+    writer.close()
+    assert writer.stats()['dropped'] == 0
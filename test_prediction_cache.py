@@ -0,0 +1,78 @@
+"""
+Tests for the perceptual-hash prediction cache and its use in EmotionDetector
+Uses a counting stand-in for the Keras model; skipped when OpenCV/NumPy are missing
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from prediction_cache import PredictionCache, perceptual_hash
+
+
+def face(seed, high=256):
+    """A random 48x48 grayscale crop"""
+    return np.random.default_rng(seed).integers(0, high, (48, 48), dtype=np.uint8)
+
+
+def test_near_duplicates_share_a_hash():
+    # A uniform brightness shift (without clipping) keeps every neighbour comparison
+    crop = face(0, high=200)
+    noisy = crop + 3
+    assert perceptual_hash(crop) == perceptual_hash(noisy)
+    assert perceptual_hash(crop) != perceptual_hash(face(1))
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = PredictionCache(max_size=2)
+    a, b, c = (cache.key(face(seed)) for seed in range(3))
+    cache.put(a, 'a')
+    cache.put(b, 'b')
+    assert cache.get(a) == 'a'          # a becomes most recently used
+    cache.put(c, 'c')                   # evicts b
+    assert cache.get(b) is None
+    assert cache.get(c) == 'c'
+
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (2, 2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+    cache.clear()
+    assert cache.stats()['size'] == 0 and cache.get(a) is None
+
+
+class Rescaling:
+    """Named like the Keras layer so the detector skips its own normalization"""
+
+
+class CountingModel:
+    """Stand-in model returning one distinct probability vector per input"""
+
+    layers = [Rescaling()]
+
+    def __init__(self):
+        self.inputs_seen = 0
+
+    def __call__(self, inputs, training=False):
+        self.inputs_seen += len(inputs)
+        means = np.asarray(inputs, dtype='float32').reshape(len(inputs), -1).mean(axis=1)
+        out = np.zeros((len(inputs), 7), dtype='float32')
+        out[np.arange(len(inputs)), (means.astype(int) % 7)] = 1.0
+        return type('Tensor', (), {'numpy': lambda self: out})()
+
+
+def test_detector_serves_repeated_crops_from_cache():
+    from emotion_detector import EmotionDetector
+
+    detector = EmotionDetector(lazy=True, cache_size=16)
+    detector.model = model = CountingModel()
+    crops = [face(0), face(1)]
+
+    first = detector.predict_emotions_batch(crops)
+    second = detector.predict_emotions_batch(crops + [face(0)])
+    assert model.inputs_seen == 2
+    for (emotion, p), (cached_emotion, cached_p) in zip(first + first[:1], second):
+        assert emotion == cached_emotion
+        np.testing.assert_array_equal(p, cached_p)
+    assert detector.cache.stats()['hits'] == 3
@@ -0,0 +1,66 @@
+"""
+Tests for TrainingCheckpoint (resumable out-of-core training state)
+Skipped when the training dependencies are not installed
+"""
+
+import os
+
+import pytest
+
+for module in ('numpy', 'tensorflow', 'pandas', 'matplotlib', 'seaborn', 'sklearn'):
+    pytest.importorskip(module)
+
+import numpy as np
+import tensorflow as tf
+
+from train_model import TrainingCheckpoint
+
+
+def small_model():
+    """A tiny compiled model with optimizer state"""
+    model = tf.keras.Sequential([tf.keras.Input(shape=(4,)), tf.keras.layers.Dense(2)])
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss='mse')
+    model.train_on_batch(np.ones((2, 4), dtype='float32'), np.zeros((2, 2), dtype='float32'))
+    return model
+
+
+def save_steps(checkpoint, model, steps):
+    """Save checkpoints the way train_sharded does"""
+    state = {'checkpoints': [], 'learning_rate': 1e-3}
+    for step in steps:
+        state['step'] = step
+        state['checkpoints'] = (state['checkpoints'] + [f'ckpt-{step}'])[-checkpoint.keep:]
+        checkpoint.save(model, state)
+    return state
+
+
+def test_old_checkpoints_are_deleted(tmp_path):
+    checkpoint = TrainingCheckpoint(str(tmp_path), keep=2)
+    save_steps(checkpoint, small_model(), [1, 2, 3])
+
+    files = sorted(name for name in os.listdir(tmp_path) if name.startswith('ckpt-'))
+    assert files == ['ckpt-2-optimizer.npz', 'ckpt-2.weights.h5',
+                     'ckpt-3-optimizer.npz', 'ckpt-3.weights.h5']
+
+
+def test_orphaned_checkpoint_files_are_deleted(tmp_path):
+    checkpoint = TrainingCheckpoint(str(tmp_path), keep=2)
+    (tmp_path / 'ckpt-0.weights.h5').write_bytes(b'')
+    (tmp_path / 'ckpt-0-optimizer.npz').write_bytes(b'')
+    save_steps(checkpoint, small_model(), [1])
+
+    assert not (tmp_path / 'ckpt-0.weights.h5').exists()
+    assert not (tmp_path / 'ckpt-0-optimizer.npz').exists()
+    assert (tmp_path / 'ckpt-1.weights.h5').exists()
+
+
+def test_load_restores_latest_checkpoint(tmp_path):
+    checkpoint = TrainingCheckpoint(str(tmp_path), keep=2)
+    model = small_model()
+    save_steps(checkpoint, model, [1, 2, 3])
+
+    restored = small_model()
+    state = checkpoint.load(restored)
+    assert state['checkpoint'] == 'ckpt-3'
+    for expected, actual in zip(model.get_weights(), restored.get_weights()):
+        np.testing.assert_allclose(expected, actual)
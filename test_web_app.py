@@ -0,0 +1,55 @@
+"""
+Behavioural tests for the web app's request handling
+No model is loaded; skipped when the web app's dependencies are missing
+"""
+
+import pytest
+
+for module in ('numpy', 'cv2', 'flask', 'flask_socketio'):
+    pytest.importorskip(module)
+
+import web_app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web_app, 'DETECTOR_CHECKOUT_TIMEOUT', 0.05)
+    web_app.model_ready.set()
+    yield web_app.app.test_client()
+    web_app.model_ready.clear()
+
+
+@pytest.fixture
+def exhausted_pool():
+    """Every pooled detector checked out for the duration of the test"""
+    held = [web_app.detector_pool.acquire() for _ in range(web_app.detector_pool.size)]
+    yield
+    for detector in held:
+        web_app.detector_pool.release(detector)
+
+
+def test_analyze_returns_503_when_all_detectors_are_busy(client, exhausted_pool):
+    response = client.post('/api/analyze', json={'image': 'aGVsbG8='})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['success'] is False
+
+
+def test_video_feed_returns_503_when_all_detectors_are_busy(client, exhausted_pool):
+    response = client.get('/video_feed')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_analyze_rejects_requests_before_the_model_is_ready(client):
+    web_app.model_ready.clear()
+    response = client.post('/api/analyze', json={'image': 'aGVsbG8='})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_video_feed_refuses_streams_before_the_model_is_ready(client):
+    web_app.model_ready.clear()
+    response = client.get('/video_feed')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
@@ -76,6 +76,8 @@ def test_web_app_structure():
         ('Stop Camera API', '@app.route(\'/api/stop_camera\'' in code),
         ('Stats API', '@app.route(\'/api/stats\')' in code),
         ('Reset API', '@app.route(\'/api/reset_stats\'' in code),
+        ('Analyze API', '@app.route(\'/api/analyze\'' in code),
+        ('Events API', '@app.route(\'/api/events\')' in code),
         ('WebSocket Handlers', '@socketio.on' in code),
         ('Main Function', 'def main():' in code),
     ]
@@ -5,6 +5,10 @@ https://www.kaggle.com/datasets/samithsachidanandan/human-face-emotions
 """
 
 import os
+import glob
+import json
+import time
+from types import SimpleNamespace
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -12,16 +16,192 @@ from sklearn.model_selection import train_test_split
 from tensorflow.keras.utils import to_categorical
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from emotion_detector import EmotionDetector
+from emotion_detector import EmotionDetector, export_fast_model
+from shard_dataset import ShardedDataset, shard_image_directory, shard_kaggle_csv
+
+
+def iterate_batches(X, y, batch_size):
+    """Yield (X, y) batches from arrays without copying the whole set"""
+    for start in range(0, len(X), batch_size):
+        yield X[start:start + batch_size], y[start:start + batch_size]
+
+
+class StreamingEvaluator:
+    """
+    Accumulate evaluation metrics batch by batch
+    Tracks loss, accuracy, the confusion matrix, per-class metrics and
+    per-batch inference throughput without keeping predictions in memory
+    """
+    
+    def __init__(self, emotions):
+        """Initialize empty accumulators"""
+        self.emotions = emotions
+        self.confusion = np.zeros((len(emotions), len(emotions)), dtype=np.int64)
+        self.loss_sum = 0.0
+        self.samples = 0
+        self.throughputs = []
+    
+    def update(self, y_true, y_pred, seconds):
+        """Add one batch of labels (one-hot or indices) and predicted probabilities"""
+        y_true = np.asarray(y_true)
+        true_classes = np.argmax(y_true, axis=1) if y_true.ndim == 2 else y_true.astype(int)
+        pred_classes = np.argmax(y_pred, axis=1)
+        
+        # Categorical cross-entropy, as used for training
+        probs = np.clip(y_pred[np.arange(len(true_classes)), true_classes], 1e-7, 1.0)
+        self.loss_sum += float(-np.log(probs).sum())
+        
+        np.add.at(self.confusion, (true_classes, pred_classes), 1)
+        self.samples += len(true_classes)
+        if seconds > 0:
+            self.throughputs.append(len(true_classes) / seconds)
+    
+    def per_class(self):
+        """Precision, recall, F1 and support for each class"""
+        true_positive = np.diag(self.confusion).astype(float)
+        support = self.confusion.sum(axis=1)
+        predicted = self.confusion.sum(axis=0)
+        precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+        recall = np.divide(true_positive, support, out=np.zeros_like(true_positive), where=support > 0)
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(true_positive),
+                       where=denominator > 0)
+        return {
+            emotion: {'precision': float(precision[i]), 'recall': float(recall[i]),
+                      'f1': float(f1[i]), 'support': int(support[i])}
+            for i, emotion in enumerate(self.emotions)
+        }
+    
+    def results(self):
+        """Summary of all accumulated metrics"""
+        throughputs = np.asarray(self.throughputs) if self.throughputs else np.zeros(1)
+        return {
+            'samples': self.samples,
+            'loss': self.loss_sum / self.samples if self.samples else 0.0,
+            'accuracy': float(np.trace(self.confusion) / self.samples) if self.samples else 0.0,
+            'per_class': self.per_class(),
+            'confusion_matrix': self.confusion.tolist(),
+            'throughput': {'mean': float(throughputs.mean()), 'min': float(throughputs.min()),
+                           'max': float(throughputs.max()), 'batches': len(self.throughputs)}
+        }
+    
+    def report(self):
+        """Text classification report"""
+        lines = [f"{'':>10} {'precision':>10} {'recall':>10} {'f1-score':>10} {'support':>10}"]
+        for emotion, m in self.per_class().items():
+            lines.append(f"{emotion:>10} {m['precision']:>10.2f} {m['recall']:>10.2f} "
+                         f"{m['f1']:>10.2f} {m['support']:>10d}")
+        return "\n".join(lines)
+    
+    def save(self, prefix=''):
+        """Write the metrics JSON and raw/normalized confusion matrix plots"""
+        import seaborn as sns
+        
+        with open(f'{prefix}evaluation_metrics.json', 'w') as f:
+            json.dump(self.results(), f, indent=2)
+        print(f"Evaluation metrics saved: {prefix}evaluation_metrics.json")
+        
+        support = self.confusion.sum(axis=1, keepdims=True)
+        normalized = np.divide(self.confusion, support, out=np.zeros(self.confusion.shape),
+                               where=support > 0)
+        for name, matrix, fmt in [('confusion_matrix', self.confusion, 'd'),
+                                  ('confusion_matrix_normalized', normalized, '.2f')]:
+            plt.figure(figsize=(10, 8))
+            sns.heatmap(matrix, annot=True, fmt=fmt, cmap='Blues', 
+                       xticklabels=self.emotions, yticklabels=self.emotions)
+            plt.title('Confusion Matrix')
+            plt.ylabel('True Label')
+            plt.xlabel('Predicted Label')
+            plt.tight_layout()
+            plt.savefig(f'{prefix}{name}.png')
+            print(f"Confusion matrix saved: {prefix}{name}.png")
+            plt.close()
+
+
+class TrainingCheckpoint:
+    """
+    Full training state on disk: model weights, optimizer variables and a
+    JSON state file (epoch, batch position, learning rate, schedule counters,
+    history). Files are written before state.json is atomically replaced, so
+    an interruption at any point leaves the previous checkpoint usable.
+    """
+    
+    def __init__(self, checkpoint_dir, keep=2):
+        self.checkpoint_dir = checkpoint_dir
+        self.keep = keep
+        self.state_path = os.path.join(checkpoint_dir, 'state.json')
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    
+    @staticmethod
+    def optimizer_variables(optimizer):
+        """Optimizer variables (a property or a method depending on the Keras version)"""
+        variables = optimizer.variables
+        return variables() if callable(variables) else variables
+    
+    def save(self, model, state):
+        """
+        Write a checkpoint for state['step'] and delete every checkpoint file
+        not listed in state['checkpoints']
+        """
+        name = f"ckpt-{state['step']}"
+        model.save_weights(os.path.join(self.checkpoint_dir, f'{name}.weights.h5'))
+        np.savez(os.path.join(self.checkpoint_dir, f'{name}-optimizer.npz'),
+                 *[np.asarray(v) for v in self.optimizer_variables(model.optimizer)])
+        
+        state = dict(state, checkpoint=name)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+        
+        # Also removes files orphaned by a run interrupted between writing and pruning
+        retained = set(state.get('checkpoints', [])) | {name}
+        for path in glob.glob(os.path.join(self.checkpoint_dir, 'ckpt-*')):
+            checkpoint_name = os.path.basename(path).split('.', 1)[0].split('-optimizer', 1)[0]
+            if checkpoint_name not in retained:
+                os.remove(path)
+    
+    def load(self, model):
+        """Restore the latest checkpoint into the model and return its state, or None"""
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            state = json.load(f)
+        name = state['checkpoint']
+        model.load_weights(os.path.join(self.checkpoint_dir, f'{name}.weights.h5'))
+        
+        # Create the optimizer slots before assigning their saved values
+        optimizer = model.optimizer
+        optimizer.build(model.trainable_variables)
+        with np.load(os.path.join(self.checkpoint_dir, f'{name}-optimizer.npz')) as saved:
+            values = [saved[f'arr_{i}'] for i in range(len(saved.files))]
+        variables = self.optimizer_variables(optimizer)
+        if len(values) != len(variables):
+            raise ValueError(f"Checkpoint {name} has {len(values)} optimizer variables, "
+                             f"expected {len(variables)}")
+        for variable, value in zip(variables, values):
+            variable.assign(value)
+        optimizer.learning_rate.assign(state['learning_rate'])
+        return state
 
 
 class EmotionModelTrainer:
     """Class to handle training of emotion detection model"""
     
-    def __init__(self):
-        """Initialize the trainer"""
-        self.detector = EmotionDetector()
-        self.model = self.detector.model
+    def __init__(self, strategy=None, variant='standard', learning_rate=None):
+        """
+        Initialize the trainer
+        With a tf.distribute strategy the model is built inside its scope
+        variant and learning_rate are passed to EmotionDetector.create_model()
+        """
+        self.detector = EmotionDetector(lazy=True)
+        self.variant = variant
+        if strategy is None:
+            self.model = self.detector.create_model(variant=variant, learning_rate=learning_rate)
+        else:
+            with strategy.scope():
+                self.model = self.detector.create_model(variant=variant, learning_rate=learning_rate)
+        self.detector.model = self.model
         self.emotions = self.detector.emotions
         self.history = None
     
@@ -58,11 +238,16 @@ class EmotionModelTrainer:
         
         return X, y
     
-    def load_from_directory(self, data_dir):
+    def load_from_directory(self, data_dir, detect_faces=False, cache_dir='face_crop_cache'):
         """
         Load dataset from directory structure
         Expected structure: data_dir/emotion_name/image.jpg
+        With detect_faces=True the images are raw photos: faces are detected
+        once and their aligned crops cached in cache_dir (see face_crop_cache.py)
         """
+        if detect_faces:
+            return self.load_face_crops(data_dir, cache_dir)
+        
         print("Loading dataset from directory...")
         X = []
         y = []
@@ -95,12 +280,29 @@ class EmotionModelTrainer:
         print(f"Dataset loaded: {X.shape[0]} images")
         return X, y
     
+    def load_face_crops(self, data_dir, cache_dir='face_crop_cache'):
+        """Load the largest face of every raw photo from the face-crop cache"""
+        from face_crop_cache import FaceCropCache
+        
+        print("Loading face crops from raw photos...")
+        cache = FaceCropCache(cache_dir)
+        X = []
+        y = []
+        for crop, label in cache.labeled_crops(data_dir, self.emotions):
+            X.append(crop.reshape(48, 48, 1))
+            y.append(label)
+        
+        X = np.array(X, dtype='float32')
+        y = to_categorical(y, num_classes=7)
+        
+        print(f"Dataset loaded: {X.shape[0]} face crops")
+        return X, y
+    
     def preprocess_data(self, X, y, validation_split=0.2):
         """Preprocess and split the data"""
         print("\nPreprocessing data...")
         
-        # Normalize pixel values
-        X = X / 255.0
+        # Pixel values stay in 0-255; the model's Rescaling layer normalizes them
         
         # Split into train and validation sets
         X_train, X_val, y_train, y_val = train_test_split(
@@ -118,9 +320,53 @@ class EmotionModelTrainer:
         print(f"Epochs: {epochs}, Batch size: {batch_size}")
         print(f"Data augmentation: {use_augmentation}")
         
-        # Callbacks
+        callbacks = self.create_callbacks()
+        
+        # Data augmentation
+        if use_augmentation:
+            datagen = self.create_augmentation()
+            datagen.fit(X_train)
+            
+            self.history = self.model.fit(
+                datagen.flow(X_train, y_train, batch_size=batch_size),
+                validation_data=(X_val, y_val),
+                epochs=epochs,
+                callbacks=callbacks,
+                verbose=1
+            )
+        else:
+            self.history = self.model.fit(
+                X_train, y_train,
+                validation_data=(X_val, y_val),
+                epochs=epochs,
+                batch_size=batch_size,
+                callbacks=callbacks,
+                verbose=1
+            )
+        
+        print("\nTraining completed!")
+        return self.history
+    
+    @staticmethod
+    def create_augmentation(strength=1.0):
+        """
+        Training-time augmentation shared by all training modes
+        strength scales the rotation, shift and zoom ranges (1.0 = defaults)
+        """
+        return ImageDataGenerator(
+            rotation_range=15 * strength,
+            width_shift_range=0.1 * strength,
+            height_shift_range=0.1 * strength,
+            horizontal_flip=True,
+            zoom_range=0.1 * strength,
+            fill_mode='nearest'
+        )
+    
+    @staticmethod
+    def create_callbacks(best_model_path='emotion_model_best.h5'):
+        """Checkpoint, early-stopping and learning-rate callbacks used by fit()"""
         checkpoint = ModelCheckpoint(
-            'emotion_model_best.h5',
+            best_model_path,
             monitor='val_accuracy',
             save_best_only=True,
             mode='max',
@@ -142,37 +388,126 @@ class EmotionModelTrainer:
             verbose=1
         )
         
-        callbacks = [checkpoint, early_stopping, reduce_lr]
+        return [checkpoint, early_stopping, reduce_lr]
+    
+    def evaluate_loss_accuracy(self, dataset, batch_size=256):
+        """Loss and accuracy over a sharded dataset, streamed batch by batch"""
+        evaluator = StreamingEvaluator(self.emotions)
+        for X_batch, y_batch in dataset.batches(batch_size, shuffle=False):
+            y_pred = self.model(X_batch.astype('float32'), training=False).numpy()
+            evaluator.update(y_batch, y_pred, 0)
+        results = evaluator.results()
+        return results['loss'], results['accuracy']
+    
+    def train_sharded(self, train_dir, val_dir, epochs=50, batch_size=64, use_augmentation=True,
+                      checkpoint_dir='checkpoints', checkpoint_every=500, seed=42, best_model_path=None):
+        """
+        Train from sharded datasets on disk (see shard_dataset.py) with resumable checkpoints
         
-        # Data augmentation
-        if use_augmentation:
-            datagen = ImageDataGenerator(
-                rotation_range=15,
-                width_shift_range=0.1,
-                height_shift_range=0.1,
-                horizontal_flip=True,
-                zoom_range=0.1,
-                fill_mode='nearest'
-            )
-            datagen.fit(X_train)
-            
-            self.history = self.model.fit(
-                datagen.flow(X_train, y_train, batch_size=batch_size),
-                validation_data=(X_val, y_val),
-                epochs=epochs,
-                callbacks=callbacks,
-                verbose=1
-            )
+        Only one batch is held in memory at a time. Full training state is saved
+        every checkpoint_every batches and at each epoch end; calling this again
+        with the same checkpoint_dir resumes at the exact batch where the last
+        checkpoint was taken. The learning-rate schedule, early stopping and best
+        model selection match train(); the best model is saved to
+        best_model_path (default: emotion_model_best.h5 inside checkpoint_dir).
+        """
+        if best_model_path is None:
+            best_model_path = os.path.join(checkpoint_dir, 'emotion_model_best.h5')
+        train_data = ShardedDataset(train_dir)
+        val_data = ShardedDataset(val_dir)
+        steps_per_epoch = train_data.num_batches(batch_size)
+        checkpoint = TrainingCheckpoint(checkpoint_dir)
+        
+        state = checkpoint.load(self.model)
+        if state is None:
+            state = {
+                'step': 0, 'epoch': 0, 'batch': 0, 'seed': seed,
+                'learning_rate': float(self.model.optimizer.learning_rate.numpy()),
+                'best_val_accuracy': 0.0, 'best_val_loss': None,
+                'lr_wait': 0, 'stop_wait': 0, 'stopped': False,
+                'epoch_loss': 0.0, 'epoch_accuracy': 0.0, 'epoch_samples': 0,
+                'checkpoints': [],
+                'history': {'loss': [], 'accuracy': [], 'val_loss': [], 'val_accuracy': []}
+            }
+            print("\nStarting sharded training...")
         else:
-            self.history = self.model.fit(
-                X_train, y_train,
-                validation_data=(X_val, y_val),
-                epochs=epochs,
-                batch_size=batch_size,
-                callbacks=callbacks,
-                verbose=1
-            )
+            seed = state['seed']
+            print(f"\nResuming from {state['checkpoint']}: epoch {state['epoch'] + 1}, "
+                  f"batch {state['batch']}/{steps_per_epoch}")
+        print(f"Training samples: {len(train_data)} ({len(train_data.shards)} shards), "
+              f"validation samples: {len(val_data)}")
+        print(f"Epochs: {epochs}, Batch size: {batch_size}, Data augmentation: {use_augmentation}")
+        
+        datagen = self.create_augmentation() if use_augmentation else None
         
+        def save_checkpoint():
+            state['checkpoints'] = (state['checkpoints'] + [f"ckpt-{state['step']}"])[-checkpoint.keep:]
+            checkpoint.save(self.model, state)
+        
+        while state['epoch'] < epochs and not state['stopped']:
+            epoch = state['epoch']
+            start = time.perf_counter()
+            
+            for X_batch, labels in train_data.batches(batch_size, epoch, seed, start_batch=state['batch']):
+                X_batch = X_batch.astype('float32')
+                if datagen is not None:
+                    # Seeds derived from the step make resumed augmentation identical
+                    for i in range(len(X_batch)):
+                        X_batch[i] = datagen.random_transform(X_batch[i], seed=seed + state['step'] * batch_size + i)
+                loss, accuracy = self.model.train_on_batch(
+                    X_batch, to_categorical(labels, num_classes=len(self.emotions)))[:2]
+                
+                state['epoch_loss'] += float(loss) * len(labels)
+                state['epoch_accuracy'] += float(accuracy) * len(labels)
+                state['epoch_samples'] += len(labels)
+                state['batch'] += 1
+                state['step'] += 1
+                if state['step'] % checkpoint_every == 0:
+                    save_checkpoint()
+            
+            val_loss, val_accuracy = self.evaluate_loss_accuracy(val_data)
+            history = state['history']
+            history['loss'].append(state['epoch_loss'] / max(state['epoch_samples'], 1))
+            history['accuracy'].append(state['epoch_accuracy'] / max(state['epoch_samples'], 1))
+            history['val_loss'].append(val_loss)
+            history['val_accuracy'].append(val_accuracy)
+            print(f"Epoch {epoch + 1}/{epochs} - {time.perf_counter() - start:.0f}s - "
+                  f"loss: {history['loss'][-1]:.4f} - accuracy: {history['accuracy'][-1]:.4f} - "
+                  f"val_loss: {val_loss:.4f} - val_accuracy: {val_accuracy:.4f}")
+            
+            if val_accuracy > state['best_val_accuracy']:
+                state['best_val_accuracy'] = val_accuracy
+                self.model.save(best_model_path)
+                print(f"val_accuracy improved to {val_accuracy:.4f}, saved {best_model_path}")
+            
+            # ReduceLROnPlateau and EarlyStopping on val_loss
+            if state['best_val_loss'] is None or val_loss < state['best_val_loss']:
+                state['best_val_loss'] = val_loss
+                state['lr_wait'] = 0
+                state['stop_wait'] = 0
+            else:
+                state['lr_wait'] += 1
+                state['stop_wait'] += 1
+                if state['lr_wait'] >= 5 and state['learning_rate'] > 1e-7:
+                    state['learning_rate'] = max(state['learning_rate'] * 0.5, 1e-7)
+                    self.model.optimizer.learning_rate.assign(state['learning_rate'])
+                    state['lr_wait'] = 0
+                    print(f"Reducing learning rate to {state['learning_rate']:.2e}")
+                if state['stop_wait'] >= 10:
+                    state['stopped'] = True
+                    print(f"Early stopping after epoch {epoch + 1}")
+            
+            state['epoch'] += 1
+            state['batch'] = 0
+            state['epoch_loss'] = state['epoch_accuracy'] = 0.0
+            state['epoch_samples'] = 0
+            save_checkpoint()
+        
+        if state['stopped'] and os.path.exists(best_model_path):
+            # Equivalent of restore_best_weights (by val_accuracy checkpoint)
+            self.model.load_weights(best_model_path)
+        
+        self.history = SimpleNamespace(history=state['history'])
         print("\nTraining completed!")
         return self.history
     
@@ -207,43 +542,47 @@ class EmotionModelTrainer:
         print(f"Training history plot saved: {save_path}")
         plt.close()
     
-    def evaluate(self, X_test, y_test):
-        """Evaluate the model"""
+    def evaluate(self, X_test, y_test, batch_size=256, output_prefix=''):
+        """
+        Evaluate the model in a single streaming pass over batches
+        X_test/y_test may be in-memory or memory-mapped arrays (np.load(..., mmap_mode='r'))
+        """
+        return self.evaluate_stream(iterate_batches(X_test, y_test, batch_size), output_prefix)
+    
+    def evaluate_stream(self, batches, output_prefix=''):
+        """
+        Evaluate the model over an iterable of (X, y) batches or shards
+        Only one batch is held in memory at a time
+        """
         print("\nEvaluating model...")
-        loss, accuracy = self.model.evaluate(X_test, y_test, verbose=0)
-        print(f"Test Loss: {loss:.4f}")
-        print(f"Test Accuracy: {accuracy:.4f}")
+        evaluator = StreamingEvaluator(self.emotions)
         
-        # Detailed classification report
-        from sklearn.metrics import classification_report, confusion_matrix
-        import seaborn as sns
+        for X_batch, y_batch in batches:
+            start = time.perf_counter()
+            y_pred = self.model(np.asarray(X_batch, dtype='float32'), training=False).numpy()
+            evaluator.update(y_batch, y_pred, time.perf_counter() - start)
         
-        y_pred = self.model.predict(X_test, verbose=0)
-        y_pred_classes = np.argmax(y_pred, axis=1)
-        y_true_classes = np.argmax(y_test, axis=1)
+        results = evaluator.results()
+        print(f"Test Loss: {results['loss']:.4f}")
+        print(f"Test Accuracy: {results['accuracy']:.4f}")
+        print(f"Inference throughput: {results['throughput']['mean']:.1f} samples/s "
+              f"(min {results['throughput']['min']:.1f})")
         
         print("\nClassification Report:")
-        print(classification_report(y_true_classes, y_pred_classes, target_names=self.emotions))
-        
-        # Confusion matrix
-        cm = confusion_matrix(y_true_classes, y_pred_classes)
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                   xticklabels=self.emotions, yticklabels=self.emotions)
-        plt.title('Confusion Matrix')
-        plt.ylabel('True Label')
-        plt.xlabel('Predicted Label')
-        plt.tight_layout()
-        plt.savefig('confusion_matrix.png')
-        print("Confusion matrix saved: confusion_matrix.png")
-        plt.close()
+        print(evaluator.report())
         
-        return accuracy
+        evaluator.save(output_prefix)
+        
+        return results['accuracy']
     
     def save_model(self, path='emotion_model_final.h5'):
         """Save the trained model"""
         self.model.save(path)
         print(f"Model saved: {path}")
+    
+    def export_fast_model(self, path='emotion_model_final.fast'):
+        """Export weights in the fast-loading format used by EmotionDetector"""
+        export_fast_model(self.model, path, emotions=self.emotions, variant=self.variant)
 
 
 def main():
@@ -260,7 +599,40 @@ def main():
     print("Dataset loading options:")
     print("1. Load from CSV file (Kaggle format)")
     print("2. Load from directory structure")
-    choice = input("Enter choice (1 or 2): ")
+    print("3. Train from shard directories (out-of-core, resumable)")
+    print("4. Convert CSV file or directory into shards")
+    print("5. Distributed training from shard directories (multiple worker processes)")
+    choice = input("Enter choice (1-5): ")
+    
+    if choice == '5':
+        from distributed_training import launch_local
+        shard_dir = input("Enter shard directory (containing train/ and val/, default shards): ") or "shards"
+        workers = int(input(f"Enter number of workers (default {os.cpu_count() // 4 or 1}): ")
+                      or str(os.cpu_count() // 4 or 1))
+        epochs = int(input("Enter number of epochs (default 50): ") or "50")
+        batch_size = int(input("Enter per-worker batch size (default 64): ") or "64")
+        use_augmentation = input("Use data augmentation? (y/n, default y): ").lower() != 'n'
+        result = launch_local(shard_dir, workers, epochs, batch_size, use_augmentation)
+        print(f"\nTraining complete on {result['workers']} workers "
+              f"({result['samples_per_second']:.1f} samples/s)")
+        print("For scaling efficiency run: python distributed_training.py <shard_dir> --scaling-test 200")
+        return
+    
+    if choice == '3':
+        train_sharded_main(trainer)
+        return
+    if choice == '4':
+        source = input("Enter path to CSV file or data directory: ")
+        output_dir = input("Enter output directory (default shards): ") or "shards"
+        if os.path.isdir(source):
+            shard_image_directory(source, output_dir, trainer.emotions)
+        elif os.path.exists(source):
+            shard_kaggle_csv(source, output_dir)
+        else:
+            print(f"Error: Not found: {source}")
+            return
+        print(f"Shards written to {output_dir}/train and {output_dir}/val")
+        return
     
     if choice == '1':
         csv_path = input("Enter path to CSV file: ")
@@ -273,7 +645,8 @@ def main():
         if not os.path.exists(data_dir):
             print(f"Error: Directory not found: {data_dir}")
             return
-        X, y = trainer.load_from_directory(data_dir)
+        raw_photos = input("Are these uncropped photos that need face detection? (y/n, default n): ").lower() == 'y'
+        X, y = trainer.load_from_directory(data_dir, detect_faces=raw_photos)
     else:
         print("Invalid choice")
         return
@@ -298,13 +671,41 @@ def main():
     
     # Save model
     trainer.save_model()
+    trainer.export_fast_model()
     
     print("\nTraining complete!")
     print("Model files saved:")
     print("  - emotion_model_best.h5 (best validation accuracy)")
     print("  - emotion_model_final.h5 (final model)")
+    print("  - emotion_model_final.fast/ (fast-loading weights)")
     print("  - training_history.png")
-    print("  - confusion_matrix.png")
+    print("  - confusion_matrix.png, confusion_matrix_normalized.png")
+    print("  - evaluation_metrics.json")
+
+
+def train_sharded_main(trainer):
+    """Interactive out-of-core training from shard directories"""
+    shard_dir = input("Enter shard directory (containing train/ and val/, default shards): ") or "shards"
+    train_dir = os.path.join(shard_dir, 'train')
+    val_dir = os.path.join(shard_dir, 'val')
+    for path in (train_dir, val_dir):
+        if not os.path.exists(path):
+            print(f"Error: Directory not found: {path}")
+            return
+    checkpoint_dir = input("Enter checkpoint directory (default checkpoints): ") or "checkpoints"
+    epochs = int(input("Enter number of epochs (default 50): ") or "50")
+    batch_size = int(input("Enter batch size (default 64): ") or "64")
+    use_augmentation = input("Use data augmentation? (y/n, default y): ").lower() != 'n'
+    
+    trainer.train_sharded(train_dir, val_dir, epochs=epochs, batch_size=batch_size,
+                          use_augmentation=use_augmentation, checkpoint_dir=checkpoint_dir)
+    trainer.plot_training_history()
+    trainer.evaluate_stream(ShardedDataset(val_dir).batches(256, shuffle=False))
+    trainer.save_model()
+    trainer.export_fast_model()
+    
+    print("\nTraining complete!")
+    print(f"Interrupted runs resume from {checkpoint_dir}/ when started again with the same settings")
 
 
 if __name__ == "__main__":
@@ -3,15 +3,26 @@ Web Interface for Face Emotion Detection
 Provides a modern, real-time web-based interface for emotion detection
 """
 
+import time
+PROCESS_START = time.time()
+
 import cv2
 import numpy as np
 import base64
+import itertools
 import json
-from flask import Flask, render_template, Response, jsonify
+import os
+import queue
+from functools import partial
+from flask import Flask, render_template, Response, jsonify, request
 from flask_socketio import SocketIO, emit
 import threading
-import time
-from emotion_detector import EmotionDetector
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from detector_pool import DetectorPool, PoolExhausted
+from face_tracker import EmotionTracker
+from frame_pipeline import FramePipeline
+from emotion_events import EmotionEventStream
+from emotion_statistics import EmotionStatistics
 from datetime import datetime
 
 app = Flask(__name__)
@@ -19,78 +30,424 @@ app.config['SECRET_KEY'] = 'emotion_detection_secret_key_2024'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Global variables
-detector = EmotionDetector()
+# Each stream and analysis job checks out its own detector (cascade + model);
+# the models are built by load_detector_model() after the server starts listening
+DETECTOR_POOL_SIZE = max(2, min(4, os.cpu_count() or 1))
+DETECTOR_CHECKOUT_TIMEOUT = 10  # Seconds to wait for a free detector
+detector_pool = DetectorPool(DETECTOR_POOL_SIZE)
+EMOTIONS = detector_pool.emotions
+model_ready = threading.Event()
+startup_times = {'first_request': None, 'model_ready': None, 'first_inference': None}
+# Debounced per-face transitions ('appear', 'change', 'disappear') for camera streams,
+# pushed as 'emotion_event' WebSocket messages and on /api/events (server-sent events)
+EVENT_HOLD_SECONDS = 1.0      # A new dominant emotion must persist this long to be reported
+EVENT_DISAPPEAR_SECONDS = 1.0 # A face unseen this long is reported gone
+EVENT_KEEPALIVE_SECONDS = 15  # Comment line sent to idle SSE clients
+EVENT_EXPIRY_INTERVAL = 0.5   # Seconds between checks for faces that are gone
+emotion_events = EmotionEventStream(hold_time=EVENT_HOLD_SECONDS,
+                                    disappear_after=EVENT_DISAPPEAR_SECONDS)
+emotion_events.add_callback(lambda event: socketio.emit('emotion_event', event))
+# Face ids shared by every stream and browser session so their events never collide
+face_ids = itertools.count(1)
+# Pipelined streaming: detect, infer and render/encode run as concurrent stages
+PIPELINED_STREAMING = True
+# Pipelines of the open server-drawn streams and trackers of every camera
+# stream, by stream id (for /api/stats and for ending a stream's faces)
+stream_pipelines = {}
+stream_trackers = {}
+stream_pipelines_lock = threading.Lock()
+stream_ids = itertools.count(1)
 camera = None
 camera_lock = threading.Lock()
 is_camera_running = False
-emotion_history = []
-emotion_stats = {emotion: 0 for emotion in detector.emotions}
-total_frames = 0
+overlay_mode = 'server'       # 'server' draws into the frame, 'client' sends boxes as JSON
+frame_seq = 0
+# Shared statistics; updated once per frame, read from lock-free snapshots
+statistics = EmotionStatistics(EMOTIONS)
+
+# Image analysis API settings
+ANALYZE_MAX_WORKERS = DETECTOR_POOL_SIZE  # Concurrent analysis jobs (one detector each)
+ANALYZE_MAX_PENDING = 8       # Jobs queued or running before rejecting with 503
+ANALYZE_MAX_IMAGES = 32       # Images accepted per request
+ANALYZE_TIMEOUT = 30          # Seconds to wait for a job to finish
+analyze_executor = ThreadPoolExecutor(max_workers=ANALYZE_MAX_WORKERS)
+analyze_slots = threading.BoundedSemaphore(ANALYZE_MAX_PENDING)
+
+
+# Browser capture mode settings
+CLIENT_MAX_FPS = 10           # Frames per second accepted from each browser session
+client_sessions = {}
+client_sessions_lock = threading.Lock()
+
+
+class ClientSession:
+    """Per-browser state for client-uploaded frames (latest frame wins)"""
+    
+    def __init__(self, sid):
+        self.sid = sid
+        self.lock = threading.Lock()
+        self.pending = None
+        self.busy = False
+        self.last_accepted = 0.0
+        self.dropped = 0
+        # Bound to a pooled detector for each frame; frames of a session are processed one at a time
+        self.tracker = EmotionTracker(None, ids=face_ids)
+    
+    def offer(self, frame):
+        """
+        Store a frame as the next one to process, replacing any unprocessed one
+        Returns True if a worker needs to be started for this session
+        """
+        with self.lock:
+            now = time.time()
+            if now - self.last_accepted < 1.0 / CLIENT_MAX_FPS:
+                self.dropped += 1
+                return False
+            self.last_accepted = now
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = frame
+            if self.busy:
+                return False
+            self.busy = True
+            return True
+    
+    def take(self):
+        """Take the pending frame, or mark the session idle if there is none"""
+        with self.lock:
+            frame, self.pending = self.pending, None
+            if frame is None:
+                self.busy = False
+            return frame
+
+
+def record_faces(faces):
+    """Update the statistics with every face of one frame (dicts with emotion/confidence)"""
+    statistics.update([face['emotion'] for face in faces], [face['confidence'] for face in faces],
+                      [[face['predictions'][emotion] for emotion in EMOTIONS] for face in faces])
+
+
+def emotion_update_message(faces):
+    """Payload of an 'emotion_update' WebSocket message"""
+    snapshot = statistics.snapshot()
+    return {
+        'emotions': faces,
+        'stats': snapshot.counts_dict(),
+        'total': snapshot.total,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def annotate_frame(detector, frame, faces):
+    """Render stage for the server-drawn stream: draw, publish and JPEG-encode"""
+    detected_emotions = []
+    drawn = []
+    for face_id, (x, y, w, h), emotion, predictions in faces:
+        confidence = np.max(predictions)
+        detected_emotions.append({
+            'face_id': face_id,
+            'emotion': emotion,
+            'confidence': float(confidence),
+            'predictions': {EMOTIONS[i]: float(predictions[i]) 
+                           for i in range(len(predictions))}
+        })
+        drawn.append((x, y, w, h, emotion, confidence, predictions))
+    
+    # Update statistics in one step for the whole frame
+    record_faces(detected_emotions)
+    emotion_events.update([(face_id, emotion, float(np.max(predictions)), box)
+                           for face_id, box, emotion, predictions in faces])
+    
+    # Draw all faces on frame in one pass
+    frame = detector.draw_emotions(frame, drawn)
+    
+    # Emit real-time data via WebSocket
+    if detected_emotions:
+        socketio.emit('emotion_update', emotion_update_message(detected_emotions))
+    
+    # Encode frame
+    ret, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+
+def register_stream(tracker, pipeline=None):
+    """Record an open camera stream and return its id"""
+    stream_id = next(stream_ids)
+    with stream_pipelines_lock:
+        stream_trackers[stream_id] = tracker
+        if pipeline is not None:
+            stream_pipelines[stream_id] = pipeline
+    return stream_id
+
+
+def end_stream(stream_id):
+    """Forget a camera stream and report its faces as gone"""
+    with stream_pipelines_lock:
+        tracker = stream_trackers.pop(stream_id, None)
+        stream_pipelines.pop(stream_id, None)
+    if tracker is not None:
+        emotion_events.clear([track.id for track in tracker.tracks])
+
+
+def expire_events():
+    """Background task: report faces whose source stopped sending frames"""
+    while True:
+        emotion_events.expire_stale()
+        socketio.sleep(EVENT_EXPIRY_INTERVAL)
 
 
 def generate_frames():
     """Generate frames from camera for video streaming"""
-    global camera, is_camera_running, emotion_history, emotion_stats, total_frames
+    with detector_pool.checkout(timeout=DETECTOR_CHECKOUT_TIMEOUT) as detector:
+        yield from stream_annotated_frames(detector)
+
+
+def stream_annotated_frames(detector):
+    """Server-drawn stream using one checked-out detector"""
+    # Each stream tracks its own faces with its own detector; detection,
+    # inference and drawing/encoding overlap across consecutive frames
+    tracker = EmotionTracker(detector, ids=face_ids)
+    pipeline = FramePipeline(detector, tracker=tracker, render=partial(annotate_frame, detector),
+                             threaded=PIPELINED_STREAMING).start()
+    stream_id = register_stream(tracker, pipeline)
     
-    while is_camera_running:
-        with camera_lock:
-            if camera is None or not camera.isOpened():
-                break
+    try:
+        while is_camera_running:
+            with camera_lock:
+                if camera is None or not camera.isOpened():
+                    break
                 
-            success, frame = camera.read()
-            if not success:
-                break
+                success, frame = camera.read()
+                if not success:
+                    break
             
-            # Detect faces and emotions
-            faces, gray = detector.detect_faces(frame)
+            pipeline.submit(frame)
+            for result in pipeline.drain():
+                # Send header, JPEG and trailer as separate chunks to avoid concatenating copies
+                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+                yield result.output
+                yield b'\r\n'
             
-            detected_emotions = []
-            for (x, y, w, h) in faces:
-                face_roi = gray[y:y+h, x:x+w]
-                emotion, predictions = detector.predict_emotion(face_roi)
+            time.sleep(0.03)  # ~30 FPS
+    finally:
+        pipeline.stop()
+        end_stream(stream_id)
+
+
+def is_jpeg_buffer(frame):
+    """Check whether a captured frame is an undecoded MJPEG buffer"""
+    if frame is None or not (frame.ndim == 1 or (frame.ndim == 2 and frame.shape[0] == 1)):
+        return False
+    return frame.size > 2 and frame.flat[0] == 0xFF and frame.flat[1] == 0xD8
+
+
+def generate_raw_frames():
+    """
+    Stream unannotated frames for client-side overlay rendering
+    Face boxes and probabilities are emitted separately as 'frame_overlay'
+    messages carrying the same sequence number as the frame part
+    """
+    with detector_pool.checkout(timeout=DETECTOR_CHECKOUT_TIMEOUT) as detector:
+        yield from stream_raw_frames(detector)
+
+
+def stream_raw_frames(detector):
+    """Client-overlay stream using one checked-out detector"""
+    global frame_seq
+    
+    tracker = EmotionTracker(detector, ids=face_ids)
+    stream_id = register_stream(tracker)
+    try:
+        while is_camera_running:
+            # Hold the camera only while reading; detection runs without the lock
+            with camera_lock:
+                if camera is None or not camera.isOpened():
+                    break
+                
+                success, frame = camera.read()
+                if not success:
+                    break
                 
-                if emotion:
-                    confidence = np.max(predictions)
-                    detected_emotions.append({
-                        'emotion': emotion,
-                        'confidence': float(confidence),
-                        'predictions': {detector.emotions[i]: float(predictions[i]) 
-                                       for i in range(len(predictions))}
-                    })
-                    
-                    # Draw on frame
-                    frame = detector.draw_emotion_info(frame, x, y, w, h, emotion, confidence, predictions)
-                    
-                    # Update statistics
-                    emotion_stats[emotion] += 1
-                    total_frames += 1
-                    
-                    # Add to history (keep last 100)
-                    emotion_history.append({
-                        'emotion': emotion,
-                        'confidence': float(confidence),
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    if len(emotion_history) > 100:
-                        emotion_history.pop(0)
+                frame_seq += 1
+                seq = frame_seq
             
-            # Emit real-time data via WebSocket
-            if detected_emotions:
-                socketio.emit('emotion_update', {
-                    'emotions': detected_emotions,
-                    'stats': emotion_stats,
-                    'total': total_frames,
-                    'timestamp': datetime.now().isoformat()
+            if is_jpeg_buffer(frame):
+                # Native MJPEG: forward the camera's bytes and decode a
+                # half-size grayscale copy only for detection
+                frame_bytes = frame.tobytes()
+                gray = cv2.imdecode(frame.reshape(-1), cv2.IMREAD_REDUCED_GRAYSCALE_2)
+                if gray is None:
+                    continue
+                scale = 2
+                faces = detector.detect_faces_gray(gray)
+            else:
+                ret, buffer = cv2.imencode('.jpg', frame)
+                frame_bytes = buffer.tobytes()
+                scale = 1
+                faces, gray = detector.detect_faces(frame)
+            
+            overlays = []
+            for track, emotion, predictions in tracker.update(faces, gray):
+                if emotion is None:
+                    continue
+                x, y, w, h = track.box
+                confidence = float(np.max(predictions))
+                overlays.append({
+                    'face_id': track.id,
+                    'box': {'x': int(x) * scale, 'y': int(y) * scale,
+                            'w': int(w) * scale, 'h': int(h) * scale},
+                    'emotion': emotion,
+                    'confidence': confidence,
+                    'predictions': {EMOTIONS[i]: float(predictions[i])
+                                    for i in range(len(predictions))}
                 })
             
-            # Encode frame
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
+            record_faces(overlays)
+            emotion_events.update([(face['face_id'], face['emotion'], face['confidence'],
+                                    tuple(face['box'].values())) for face in overlays])
+            
+            socketio.emit('frame_overlay', {
+                'seq': seq,
+                'width': gray.shape[1] * scale,
+                'height': gray.shape[0] * scale,
+                'faces': overlays
+            })
+            
+            if overlays:
+                socketio.emit('emotion_update', emotion_update_message(overlays))
             
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                   b'Content-Type: image/jpeg\r\n'
+                   b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n'
+                   b'X-Frame-Seq: ' + str(seq).encode() + b'\r\n\r\n' + frame_bytes + b'\r\n')
+            
+            time.sleep(0.03)  # ~30 FPS
+    finally:
+        end_stream(stream_id)
+
+
+def decode_image(data):
+    """Decode raw or base64 encoded image bytes into a BGR frame"""
+    if isinstance(data, str):
+        # Accept data URLs such as "data:image/jpeg;base64,..."
+        if data.startswith('data:') and ',' in data:
+            data = data.split(',', 1)[1]
+        data = base64.b64decode(data)
+    
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('Could not decode image')
+    return image
+
+
+def analyze_images(images):
+    """
+    Detect faces in each image and classify all of them in one batch
+    Returns a list with one result dictionary per input image
+    Raises PoolExhausted if no pooled detector becomes free in time
+    """
+    with detector_pool.checkout(timeout=DETECTOR_CHECKOUT_TIMEOUT) as detector:
+        return analyze_with_detector(detector, images)
+
+
+def analyze_with_detector(detector, images):
+    """analyze_images() with a checked-out detector"""
+    results = []
+    face_rois = []
+    face_refs = []
+    
+    for index, data in enumerate(images):
+        try:
+            frame = decode_image(data)
+        except Exception as e:
+            results.append({'index': index, 'error': str(e), 'faces': []})
+            continue
         
-        time.sleep(0.03)  # ~30 FPS
+        faces, gray = detector.detect_faces(frame)
+        result = {'index': index, 'width': frame.shape[1], 'height': frame.shape[0], 'faces': []}
+        for (x, y, w, h) in faces:
+            face_rois.append(gray[y:y+h, x:x+w])
+            face_refs.append((result, (int(x), int(y), int(w), int(h))))
+        results.append(result)
+    
+    # Batched inference over every face from every image
+    for (result, (x, y, w, h)), (emotion, predictions) in zip(
+            face_refs, detector.predict_emotions_batch(face_rois)):
+        if emotion is None:
+            continue
+        result['faces'].append({
+            'box': {'x': x, 'y': y, 'w': w, 'h': h},
+            'emotion': emotion,
+            'confidence': float(np.max(predictions)),
+            'predictions': {EMOTIONS[i]: float(predictions[i])
+                            for i in range(len(predictions))}
+        })
+    
+    return results
+
+
+def analyze_client_frame(session, image):
+    """
+    Detect, track and classify the faces of one browser-captured frame
+    Tracking gives faces stable ids across the session's frames for emotion events
+    Raises PoolExhausted if no pooled detector becomes free in time
+    """
+    frame = decode_image(image)
+    with detector_pool.checkout(timeout=DETECTOR_CHECKOUT_TIMEOUT) as detector:
+        faces, gray = detector.detect_faces(frame)
+        session.tracker.detector = detector
+        tracked = session.tracker.update(faces, gray)
+    
+    result = {'width': frame.shape[1], 'height': frame.shape[0], 'faces': []}
+    for track, emotion, predictions in tracked:
+        if emotion is None:
+            continue
+        x, y, w, h = track.box
+        result['faces'].append({
+            'face_id': track.id,
+            'box': {'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)},
+            'emotion': emotion,
+            'confidence': float(np.max(predictions)),
+            'predictions': {EMOTIONS[i]: float(predictions[i])
+                            for i in range(len(predictions))}
+        })
+    return result
+
+
+def read_analyze_request():
+    """Collect images from a multipart upload or a JSON body of base64 strings"""
+    if request.files:
+        return [f.read() for key in request.files for f in request.files.getlist(key)]
+    
+    payload = request.get_json(silent=True) or {}
+    images = payload.get('images')
+    if images is None and 'image' in payload:
+        images = [payload['image']]
+    if not isinstance(images, list):
+        return []
+    return images
+
+
+def load_detector_model():
+    """Build the pooled models in the background and warm each up with one inference"""
+    try:
+        detector_pool.initialize()
+        startup_times['model_ready'] = time.time() - PROCESS_START
+        
+        # The first predict call traces the graph; pay for it before real frames arrive
+        detector_pool.warm_up()
+        startup_times['first_inference'] = time.time() - PROCESS_START
+        model_ready.set()
+        print(f"Model ready after {startup_times['first_inference']:.2f}s")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+
+
+@app.before_request
+def record_first_request():
+    """Record how long after process start the first request was served"""
+    if startup_times['first_request'] is None:
+        startup_times['first_request'] = time.time() - PROCESS_START
 
 
 @app.route('/')
@@ -101,15 +458,33 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    """Video streaming route"""
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    """Video streaming route; 503 while the model loads or every pooled detector is busy"""
+    if not model_ready.is_set():
+        response = jsonify({'success': False, 'error': 'Model is still loading'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    # Check out before the response starts so a saturated pool can still be reported
+    try:
+        detector = detector_pool.acquire(timeout=DETECTOR_CHECKOUT_TIMEOUT)
+    except PoolExhausted:
+        response = jsonify({'success': False, 'error': 'All detectors busy, retry later'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    frames = stream_raw_frames(detector) if overlay_mode == 'client' else stream_annotated_frames(detector)
+    response = Response(frames, mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Runs when the client disconnects, after the stream generator is closed
+    response.call_on_close(lambda: detector_pool.release(detector))
+    return response
 
 
 @app.route('/api/start_camera', methods=['POST'])
 def start_camera():
     """Start the camera"""
-    global camera, is_camera_running
+    global camera, is_camera_running, overlay_mode
+    
+    options = request.get_json(silent=True) or {}
     
     with camera_lock:
         if not is_camera_running:
@@ -121,12 +496,25 @@ def start_camera():
             camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
             camera.set(cv2.CAP_PROP_FPS, 30)
             
+            overlay_mode = 'client' if options.get('overlay') == 'client' else 'server'
+            if overlay_mode == 'client':
+                # Ask for native MJPEG; when the backend honours CONVERT_RGB=0
+                # read() returns the compressed bytes for direct pass-through
+                mjpg = cv2.VideoWriter_fourcc(*'MJPG')
+                camera.set(cv2.CAP_PROP_FOURCC, mjpg)
+                if int(camera.get(cv2.CAP_PROP_FOURCC)) == mjpg:
+                    camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+                else:
+                    # YUYV-only cameras and backends ignoring FOURCC must keep
+                    # converting, or read() returns raw buffers; frames are re-encoded
+                    camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+            
             is_camera_running = True
             
             # Start frame generation in a separate thread
             threading.Thread(target=generate_frames, daemon=True).start()
             
-            return jsonify({'success': True, 'message': 'Camera started'})
+            return jsonify({'success': True, 'message': 'Camera started', 'overlay': overlay_mode})
         else:
             return jsonify({'success': False, 'error': 'Camera already running'}), 400
 
@@ -142,31 +530,124 @@ def stop_camera():
             camera.release()
             camera = None
         
+        # Faces of the camera streams are reported gone; browser sessions keep theirs
+        with stream_pipelines_lock:
+            face_ids = [track.id for tracker in stream_trackers.values() for track in tracker.tracks]
+        emotion_events.clear(face_ids)
+        
         return jsonify({'success': True, 'message': 'Camera stopped'})
 
 
 @app.route('/api/stats')
 def get_stats():
-    """Get emotion statistics"""
-    return jsonify({
-        'stats': emotion_stats,
-        'total': total_frames,
-        'history': emotion_history[-20:] if emotion_history else []
-    })
+    """Get emotion statistics; ?window=<seconds> sets the rolling window"""
+    window = request.args.get('window', type=float)
+    body = statistics.snapshot().as_dict(history=20, window=window)
+    with stream_pipelines_lock:
+        pipelines = list(stream_pipelines.items())
+    body['pipelines'] = {stream_id: pipeline.stats() for stream_id, pipeline in pipelines}
+    body['detector_pool'] = detector_pool.stats()
+    return jsonify(body)
 
 
 @app.route('/api/reset_stats', methods=['POST'])
 def reset_stats():
     """Reset statistics"""
-    global emotion_stats, emotion_history, total_frames
-    
-    emotion_stats = {emotion: 0 for emotion in detector.emotions}
-    emotion_history = []
-    total_frames = 0
+    statistics.reset()
     
     return jsonify({'success': True, 'message': 'Statistics reset'})
 
 
+def format_sse(event):
+    """Encode an emotion event as a server-sent event"""
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def generate_events(last_seq):
+    """Stream emotion events to one SSE client, replaying recent ones it missed"""
+    subscriber = emotion_events.subscribe()
+    try:
+        for event in emotion_events.events_since(last_seq):
+            last_seq = event['seq']
+            yield format_sse(event)
+        while True:
+            try:
+                event = subscriber.get(timeout=EVENT_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if event['seq'] > last_seq:
+                last_seq = event['seq']
+                yield format_sse(event)
+    finally:
+        emotion_events.unsubscribe(subscriber)
+
+
+@app.route('/api/events')
+def events():
+    """Server-sent events stream of debounced per-face emotion transitions"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        last_seq = int(last_event_id)
+    except ValueError:
+        last_seq = 0
+    response = Response(generate_events(last_seq), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/ready')
+def ready():
+    """Readiness probe: 200 once the model is loaded, 503 before that"""
+    body = {'ready': model_ready.is_set(), 'startup': startup_times}
+    return jsonify(body), (200 if model_ready.is_set() else 503)
+
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze():
+    """Analyze one or more uploaded images and return per-face emotions"""
+    if not model_ready.is_set():
+        response = jsonify({'success': False, 'error': 'Model is still loading'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    images = read_analyze_request()
+    if not images:
+        return jsonify({'success': False, 'error': 'No images provided'}), 400
+    if len(images) > ANALYZE_MAX_IMAGES:
+        return jsonify({'success': False,
+                        'error': f'Too many images (max {ANALYZE_MAX_IMAGES})'}), 413
+    
+    # Reject instead of queueing without bound when the pool is saturated
+    if not analyze_slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Server busy, retry later'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    try:
+        future = analyze_executor.submit(analyze_images, images)
+    except Exception:
+        analyze_slots.release()
+        raise
+    future.add_done_callback(lambda _: analyze_slots.release())
+    
+    try:
+        results = future.result(timeout=ANALYZE_TIMEOUT)
+    except PoolExhausted:
+        response = jsonify({'success': False, 'error': 'All detectors busy, retry later'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    except FutureTimeoutError:
+        return jsonify({'success': False, 'error': 'Analysis timed out'}), 504
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
@@ -178,6 +659,71 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     print('Client disconnected')
+    end_client_session(request.sid)
+
+
+def end_client_session(sid):
+    """Drop a browser session and report its faces as gone right away"""
+    with client_sessions_lock:
+        session = client_sessions.pop(sid, None)
+    if session is not None:
+        emotion_events.clear([track.id for track in session.tracker.tracks])
+
+
+def process_client_frames(session):
+    """Run detection on a session's latest frame until none is pending"""
+    while True:
+        frame = session.take()
+        if frame is None:
+            break
+        
+        try:
+            result = analyze_client_frame(session, frame['image'])
+        except Exception as e:
+            socketio.emit('client_results', {'seq': frame['seq'], 'error': str(e), 'faces': []},
+                          to=session.sid)
+            continue
+        
+        record_faces(result['faces'])
+        emotion_events.update([(face['face_id'], face['emotion'], face['confidence'],
+                                tuple(face['box'].values())) for face in result['faces']])
+        
+        # Only boxes and emotions go back; the browser draws the overlay itself
+        socketio.emit('client_results', {
+            'seq': frame['seq'],
+            'width': result.get('width'),
+            'height': result.get('height'),
+            'faces': result['faces'],
+            'error': result.get('error'),
+            'dropped': session.dropped
+        }, to=session.sid)
+        
+        if result['faces']:
+            socketio.emit('emotion_update', emotion_update_message(result['faces']), to=session.sid)
+
+
+@socketio.on('client_stop')
+def handle_client_stop():
+    """The browser stopped capturing"""
+    end_client_session(request.sid)
+
+
+@socketio.on('client_frame')
+def handle_client_frame(data):
+    """Receive a compressed, downscaled frame captured in the browser"""
+    if not isinstance(data, dict) or not data.get('image'):
+        return
+    if not model_ready.is_set():
+        emit('client_results', {'seq': data.get('seq', 0), 'error': 'Model is still loading', 'faces': []})
+        return
+    
+    with client_sessions_lock:
+        session = client_sessions.get(request.sid)
+        if session is None:
+            session = client_sessions[request.sid] = ClientSession(request.sid)
+    
+    if session.offer({'seq': data.get('seq', 0), 'image': data['image']}):
+        socketio.start_background_task(process_client_frames, session)
 
 
 def main():
@@ -190,6 +736,9 @@ def main():
     print("\nPress CTRL+C to stop the server")
     print("=" * 60)
     
+    socketio.start_background_task(load_detector_model)
+    socketio.start_background_task(expire_events)
+    
     try:
         socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt: